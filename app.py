@@ -3,10 +3,39 @@ import pandas as pd
 import plotly.express as px
 import numpy as np
 import json
-from otimizador import OtimizadorBancoCapacitores
-from pre_processamento import PreProcessamentoBancoCapacitores
+import time
+from cache_colunar import chave_conteudo
+from gerenciador_tarefas import STATUS_ATIVOS, GerenciadorTarefas
+from otimizador import TODOS_OS_RACKS, OtimizadorBancoCapacitores
+from pre_processamento import PreProcessamentoBancoCapacitores, parametros_pre_processamento
+from topologia import TopologiaBanco
 import io
 
+# Máximo de entradas de cada cache da sessão; as mais antigas são descartadas
+MAX_ENTRADAS_CACHE = 16
+
+@st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner='Pré-processando as medidas...')
+def preprocessar(chave_dados, _measures_file, _series_position_file, _config):
+    """Pré-processa as medidas; memoizado pela chave do conteúdo dos arquivos enviados e dos parâmetros do pré-processamento."""
+    preprocessador = PreProcessamentoBancoCapacitores(
+        measures_path=_measures_file,
+        series_and_position_path=_series_position_file,
+        config=_config
+    )
+    preprocessador.load_data()
+    preprocessador.process_data()
+    return preprocessador.df
+
+@st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)
+def calcular_estado_inicial(chave_dados, _df, _config, rack):
+    """Parâmetros do banco antes da otimização; memoizado por (dados, rack)."""
+    return OtimizadorBancoCapacitores(_df, _config, rack, 0, run_optimization=False, verbosidade=0).get_results()
+
+@st.cache_resource
+def obter_gerenciador():
+    """Pool de otimizações em segundo plano, compartilhado pelas sessões do servidor."""
+    return GerenciadorTarefas(max_workers=2, max_concluidas=MAX_ENTRADAS_CACHE)
+
 st.title('Otimização de Banco de Capacitores')
 
 st.sidebar.header('Configurações')
@@ -15,10 +44,6 @@ st.sidebar.header('Configurações')
 measures_file = st.sidebar.file_uploader('Carregar arquivo de medidas de capacitância', type=['txt'])
 series_position_file = st.sidebar.file_uploader('Carregar arquivo de série e posição', type=['csv'])
 
-# Seleção do rack e número máximo de permutações
-rack_to_optimize = st.sidebar.selectbox('Rack para otimizar', options=['R1', 'R2'])
-max_permutacoes = st.sidebar.number_input('Número máximo de permutações', min_value=1, value=10)
-
 config_default = 'data/config.json'
 config_file = st.sidebar.file_uploader('Carregar arquivo de configuração (config.json)', type=['json'])
 
@@ -28,17 +53,37 @@ else:
     with open(config_default, 'r') as file:
         config = json.load(file)
 
+topologia = TopologiaBanco.from_config(config)
+
+# Seleção do rack e número máximo de permutações
+rack_to_optimize = st.sidebar.selectbox(
+    'Rack para otimizar',
+    options=topologia.racks + [TODOS_OS_RACKS],
+    format_func=lambda rack: 'Todos os racks (otimização conjunta)' if rack == TODOS_OS_RACKS else rack
+)
+entre_racks = rack_to_optimize == TODOS_OS_RACKS and st.sidebar.checkbox('Permitir permutações entre racks')
+max_permutacoes = st.sidebar.number_input('Número máximo de permutações', min_value=1, value=10)
+estrategia = st.sidebar.selectbox(
+    'Estratégia de otimização',
+    options=['heuristica', 'todos_pares', 'exato', 'recozimento', 'tabu', 'milp', 'robusto', 'manuseio'],
+    format_func={
+        'heuristica': 'Heurística (menor x maior)',
+        'todos_pares': 'Todos os pares (descida mais íngreme)',
+        'exato': 'Exata (mínimo de permutações)',
+        'recozimento': 'Recozimento simulado',
+        'tabu': 'Busca tabu',
+        'milp': 'MILP (PuLP/CBC)',
+        'robusto': 'Robusta (incerteza de medição)',
+        'manuseio': 'Corrente + custo de manuseio'
+    }.get
+)
+
 if measures_file is not None and series_position_file is not None:
-    # Carregar os dados usando os arquivos enviados pelo usuário
-    preprocessador = PreProcessamentoBancoCapacitores(
-        measures_path=measures_file,
-        series_and_position_path=series_position_file,
-        config=config
-    )
-    
-    preprocessador.load_data()
-    preprocessador.process_data()
-    df_preprocessado = preprocessador.df
+    # Carregar os dados usando os arquivos enviados pelo usuário (refeito apenas se os arquivos ou os
+    # parâmetros do pré-processamento mudarem); os resultados do otimizador dependem também do restante do config
+    chave_pre_processamento = chave_conteudo([measures_file, series_position_file], parametros_pre_processamento(config))
+    df_preprocessado = preprocessar(chave_pre_processamento, measures_file, series_position_file, config)
+    chave_dados = (chave_pre_processamento, json.dumps(config, sort_keys=True))
     
     st.subheader('Dados Pré-processados')
     st.write(df_preprocessado.head())
@@ -54,10 +99,7 @@ if measures_file is not None and series_position_file is not None:
     
     # Exibir o status atual do sistema antes da otimização
     st.subheader('Status do Sistema Antes da Otimização')
-    otimizador_inicial = OtimizadorBancoCapacitores(
-        df_preprocessado, config, rack_to_optimize, max_permutacoes, run_optimization=False
-    )
-    resultados_iniciais = otimizador_inicial.get_results()
+    resultados_iniciais = calcular_estado_inicial(chave_dados, df_preprocessado, config, rack_to_optimize)
     st.write(f"**Corrente de desbalanceamento antes da otimização (A):** {resultados_iniciais['unbalanced_current']:.6f}")
     st.write(f"**Sistema balanceado:** {resultados_iniciais['is_balanced']}")
     
@@ -70,15 +112,10 @@ if measures_file is not None and series_position_file is not None:
         
         fase_included = False
         
-        rack_legs = {'R1': ['P1', 'P2'], 'R2': ['P3', 'P4']}
-        perna_ramos = {
-            'P1': ['A1', 'A2'],
-            'P2': ['B1', 'B2'],
-            'P3': ['A3', 'A4'],
-            'P4': ['B3', 'B4']
-        }
+        rack_legs = topologia.pernas_rack
+        perna_ramos = topologia.ramos_perna
         
-        for rack in ['R1', 'R2']:
+        for rack in topologia.racks:
             rack_cap = resultados['capacitancias_racks'][rack]
             rack_included = False
         
@@ -133,15 +170,10 @@ if measures_file is not None and series_position_file is not None:
         
         fase_included = False
         
-        rack_legs = {'R1': ['P1', 'P2'], 'R2': ['P3', 'P4']}
-        perna_ramos = {
-            'P1': ['A1', 'A2'],
-            'P2': ['B1', 'B2'],
-            'P3': ['A3', 'A4'],
-            'P4': ['B3', 'B4']
-        }
+        rack_legs = topologia.pernas_rack
+        perna_ramos = topologia.ramos_perna
         
-        for rack in ['R1', 'R2']:
+        for rack in topologia.racks:
             rack_reat = resultados['reatancias_racks'][rack]
             rack_included = False
         
@@ -218,13 +250,41 @@ if measures_file is not None and series_position_file is not None:
     exibir_reatancias(resultados_iniciais, 'Reatâncias')
     exibir_correntes_tensoes(resultados_iniciais, 'Tensões e Correntes')
     
-    # Botão para executar a otimização
+    # Botão para executar a otimização em segundo plano; resultados com a mesma chave são reaproveitados
+    gerenciador = obter_gerenciador()
     if st.button('Executar Otimização'):
-        # Otimização
-        otimizador = OtimizadorBancoCapacitores(
-            df_preprocessado, config, rack_to_optimize, max_permutacoes, run_optimization=True
+        config_otimizacao = {**config, 'constraints': {**config['constraints'], 'permitir_trocas_entre_racks': entre_racks}}
+        st.session_state['tarefa_id'] = gerenciador.submeter(
+            df_preprocessado, config_otimizacao, rack_to_optimize, max_permutacoes, estrategia=estrategia,
+            chave=(chave_dados, rack_to_optimize, max_permutacoes, estrategia, entre_racks)
         )
-        resultados = otimizador.get_results()
+    
+    tarefa = gerenciador.estado(st.session_state.get('tarefa_id'))
+    if tarefa is not None and tarefa['status'] in STATUS_ATIVOS:
+        # Acompanha o progresso; qualquer interação com a página interrompe este laço sem afetar a tarefa
+        st.subheader('Otimização em Andamento')
+        if st.button('Cancelar Otimização'):
+            gerenciador.cancelar(tarefa['id'])
+        status = st.empty()
+        grafico_progresso = st.empty()
+        while tarefa['status'] in STATUS_ATIVOS:
+            status.write(f"**Tarefa {tarefa['id']}:** {tarefa['status']} ({max(len(tarefa['progresso']) - 1, 0)} permutações)")
+            if tarefa['progresso']:
+                grafico_progresso.line_chart(
+                    pd.DataFrame(tarefa['progresso'], columns=['Permutação', 'Corrente de Desbalanceamento (A)']),
+                    x='Permutação', y='Corrente de Desbalanceamento (A)'
+                )
+            time.sleep(0.5)
+            tarefa = gerenciador.estado(tarefa['id'])
+        st.rerun()
+    
+    if tarefa is not None and tarefa['status'] == 'erro':
+        st.error(f"A otimização falhou: {tarefa['erro']}")
+    
+    if tarefa is not None and tarefa['resultados'] is not None:
+        resultados = tarefa['resultados']
+        if tarefa['status'] == 'cancelada':
+            st.warning('Otimização cancelada. Exibindo as permutações aplicadas até o cancelamento.')
         
         # Exibir os resultados após a otimização
         st.subheader('Resultados da Otimização')
@@ -234,6 +294,10 @@ if measures_file is not None and series_position_file is not None:
         if resultados['permutations']:
             st.write('**Detalhes das Permutações:**')
             st.table(pd.DataFrame(resultados['permutations']))
+            st.write(f"**Ordem de execução (custo de manuseio: {resultados['custo_manuseio']:.1f}):**")
+            st.table(pd.DataFrame(resultados['ordem_execucao'])[
+                ['ordem', 'permutacao', 'posicao_inicio', 'posicao_origem', 'posicao_destino']
+            ])
 
         # Exibir parâmetros após a otimização
         exibir_capacitancias(resultados, 'Capacitâncias Após a Otimização')
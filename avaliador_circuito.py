@@ -0,0 +1,405 @@
+import copy
+import numpy as np
+from topologia import TopologiaBanco
+
+class AvaliadorCircuito:
+    def __init__(self, capacitancias, ramos, constants: dict, topologia: TopologiaBanco = None):
+        """
+        Avaliador incremental do circuito do banco baseado em arrays NumPy.
+
+        Mantém, para cada ramo, a soma dos inversos das capacitâncias das unidades em série.
+        Uma permutação entre dois capacitores altera apenas os dois ramos envolvidos, de modo
+        que a atualização é O(1) e não exige recalcular o banco inteiro. Os demais níveis
+        (pernas, racks e fase) são reduções vetorizadas sobre a topologia.
+
+        Args:
+            capacitancias (array-like): Capacitância ajustada de cada unidade (uF), na ordem das linhas do DataFrame.
+            ramos (array-like): Ramo de cada unidade, na mesma ordem.
+            constants (dict): Constantes do sistema (config['constants']).
+            topologia (TopologiaBanco): Topologia do banco; usa a topologia padrão se None.
+        """
+        self.topologia = topologia if topologia is not None else TopologiaBanco.from_config({})
+        self.nomes_ramos = np.asarray(self.topologia.ramos)
+        self.indice_ramo = self.topologia.indices_ramos(ramos)
+        self.inversos = 1 / np.asarray(capacitancias, dtype=float)
+        self.soma_inversos = np.bincount(
+            self.indice_ramo, weights=self.inversos, minlength=len(self.nomes_ramos)
+        )
+
+        # Fator que converte soma de inversos (1/uF) em reatância (Ohms)
+        self.fator_reatancia = 1 / (2 * np.pi * constants['frequencia_Hz'] * 1e-6)
+        self.V_fase = constants['tensao_nom_kV'] * 1000 / np.sqrt(3)
+        # Número de estados avaliados por corrente_desbalanceamento; compartilhado com as cópias
+        self.estatisticas = {'avaliacoes': 0}
+
+    def copiar(self):
+        """Cópia independente do estado (somas por ramo e ramo de cada unidade), para buscas que exploram trocas."""
+        copia = copy.copy(self)
+        copia.soma_inversos = self.soma_inversos.copy()
+        copia.indice_ramo = self.indice_ramo.copy()
+        return copia
+
+    def capacitancias_ramos(self):
+        return 1 / self.soma_inversos
+
+    def parametros(self, soma_inversos=None):
+        """
+        Calcula capacitâncias, reatâncias, tensões e correntes de todos os níveis do banco.
+
+        Aceita arrays com dimensões extras à esquerda (..., n_ramos). Os valores por ramo, perna e
+        rack seguem a ordem de topologia.ramos, topologia.pernas e topologia.racks.
+
+        Returns:
+            dict: Arrays com os parâmetros do circuito, com as mesmas chaves de get_results().
+        """
+        if soma_inversos is None:
+            soma_inversos = self.soma_inversos
+        topologia = self.topologia
+
+        capacitancias_ramos = 1 / soma_inversos
+        capacitancias_pernas = capacitancias_ramos @ topologia.incidencia_ramo_perna
+        capacitancias_racks = capacitancias_pernas @ topologia.incidencia_perna_rack
+        capacitancia_fase = 1 / np.sum(1 / capacitancias_racks, axis=-1)
+
+        reatancias_ramos = soma_inversos * self.fator_reatancia
+        reatancias_pernas = self.fator_reatancia / capacitancias_pernas
+        reatancias_racks = self.fator_reatancia / capacitancias_racks
+        reatancia_fase = np.sum(reatancias_racks, axis=-1)
+
+        I_fase = self.V_fase / reatancia_fase
+        V_racks = I_fase[..., None] * reatancias_racks
+        I_pernas = V_racks[..., topologia.indice_rack_perna] / reatancias_pernas
+        # Mesmo cálculo de corrente_desbalanceamento, para que os dois caminhos dêem valores idênticos
+        unbalanced_current = self._corrente_desbalanceamento(capacitancias_pernas, capacitancias_racks)
+
+        return {
+            'capacitancias_ramos': capacitancias_ramos,
+            'capacitancias_pernas': capacitancias_pernas,
+            'capacitancias_racks': capacitancias_racks,
+            'capacitancia_fase': capacitancia_fase,
+            'reatancias_ramos': reatancias_ramos,
+            'reatancias_pernas': reatancias_pernas,
+            'reatancias_racks': reatancias_racks,
+            'reatancia_fase': reatancia_fase,
+            'V_fase': self.V_fase,
+            'I_fase': I_fase,
+            'V_racks': V_racks,
+            'I_pernas': I_pernas,
+            'unbalanced_current': unbalanced_current
+        }
+
+    def corrente_desbalanceamento(self, soma_inversos=None):
+        """
+        Calcula a corrente de desbalanceamento a partir das somas de inversos dos ramos.
+
+        Aceita arrays com dimensões extras à esquerda (..., n_ramos), permitindo avaliar
+        vários estados de uma só vez.
+        """
+        if soma_inversos is None:
+            soma_inversos = self.soma_inversos
+        topologia = self.topologia
+        self.estatisticas['avaliacoes'] += np.size(soma_inversos) // len(self.nomes_ramos)
+        capacitancias_pernas = (1 / soma_inversos) @ topologia.incidencia_ramo_perna
+        capacitancias_racks = capacitancias_pernas @ topologia.incidencia_perna_rack
+        return self._corrente_desbalanceamento(capacitancias_pernas, capacitancias_racks)
+
+    def metricas_fase(self, soma_inversos=None):
+        """
+        Corrente de desbalanceamento, capacitância e corrente da fase, sem as demais grandezas de parametros().
+
+        Reaproveita as capacitâncias das pernas e dos racks do cálculo da corrente de desbalanceamento; os
+        valores são idênticos aos de parametros(). Aceita dimensões extras à esquerda (..., n_ramos).
+
+        Returns:
+            dict: unbalanced_current, capacitancia_fase e I_fase.
+        """
+        if soma_inversos is None:
+            soma_inversos = self.soma_inversos
+        topologia = self.topologia
+        self.estatisticas['avaliacoes'] += np.size(soma_inversos) // len(self.nomes_ramos)
+        capacitancias_pernas = (1 / soma_inversos) @ topologia.incidencia_ramo_perna
+        capacitancias_racks = capacitancias_pernas @ topologia.incidencia_perna_rack
+        return {
+            'unbalanced_current': self._corrente_desbalanceamento(capacitancias_pernas, capacitancias_racks),
+            'capacitancia_fase': 1 / np.sum(1 / capacitancias_racks, axis=-1),
+            'I_fase': self.V_fase / np.sum(self.fator_reatancia / capacitancias_racks, axis=-1)
+        }
+
+    def _corrente_desbalanceamento(self, capacitancias_pernas, capacitancias_racks):
+        topologia = self.topologia
+        # I_perna = I_fase * C_perna / C_rack, com I_fase = V_fase / soma das reatâncias dos racks
+        I_fase = self.V_fase / (self.fator_reatancia * np.sum(1 / capacitancias_racks, axis=-1))
+        fracoes = capacitancias_pernas / capacitancias_racks[..., topologia.indice_rack_perna]
+        fracoes_pares = fracoes[..., topologia.pares_desbalanco]
+        return I_fase * np.max(np.abs(fracoes_pares[..., 0] - fracoes_pares[..., 1]), axis=-1)
+
+    def limite_inferior_desbalanceamento(self, Y_pernas_min, Y_pernas_max):
+        """
+        Limite inferior da corrente de desbalanceamento para qualquer estado cujas admitâncias das
+        pernas (soma das capacitâncias dos ramos, em uF) estejam entre Y_pernas_min e Y_pernas_max.
+
+        Usa a relação I_perna = I_fase * Y_perna / Y_rack: a fração de cada perna é crescente na
+        própria admitância e decrescente na das demais pernas do rack, e I_fase é crescente na
+        admitância dos racks. Aceita dimensões extras à esquerda (..., n_pernas).
+        """
+        topologia = self.topologia
+        Y_racks_min = Y_pernas_min @ topologia.incidencia_perna_rack
+        Y_racks_max = Y_pernas_max @ topologia.incidencia_perna_rack
+        outras_min = Y_racks_min[..., topologia.indice_rack_perna] - Y_pernas_min
+        outras_max = Y_racks_max[..., topologia.indice_rack_perna] - Y_pernas_max
+        fracao_min = Y_pernas_min / (Y_pernas_min + outras_max)
+        fracao_max = Y_pernas_max / (Y_pernas_max + outras_min)
+        I_fase_min = self.V_fase / (self.fator_reatancia * np.sum(1 / Y_racks_min, axis=-1))
+
+        a, b = topologia.pares_desbalanco.T
+        distancias = np.maximum(
+            0, np.maximum(fracao_min[..., a] - fracao_max[..., b], fracao_min[..., b] - fracao_max[..., a])
+        )
+        return I_fase_min * np.max(distancias, axis=-1)
+
+    def soma_inversos_apos_troca(self, i, j):
+        """Somas de inversos dos ramos caso as unidades nas linhas i e j fossem permutadas."""
+        ramo_i = self.indice_ramo[i]
+        ramo_j = self.indice_ramo[j]
+        delta = self.inversos[j] - self.inversos[i]
+        soma_inversos = self.soma_inversos.copy()
+        soma_inversos[ramo_i] += delta
+        soma_inversos[ramo_j] -= delta
+        return soma_inversos
+
+    def soma_inversos_apos_trocas(self, linhas_i, linhas_j):
+        """
+        Versão vetorizada de soma_inversos_apos_troca.
+
+        linhas_i e linhas_j são arrays de índices com formatos compatíveis por broadcast; o
+        resultado tem formato (..., n_ramos), com uma linha de somas para cada par candidato.
+        """
+        linhas_i, linhas_j = np.broadcast_arrays(np.asarray(linhas_i), np.asarray(linhas_j))
+        delta = self.inversos[linhas_j] - self.inversos[linhas_i]
+        identidade = np.eye(len(self.nomes_ramos))
+        incidencia = identidade[self.indice_ramo[linhas_i]] - identidade[self.indice_ramo[linhas_j]]
+        return self.soma_inversos + delta[..., None] * incidencia
+
+    def soma_inversos_planos(self, linhas_a, linhas_b, inversos=None):
+        """
+        Somas de inversos dos ramos após cada plano de permutações, sem alterar o estado.
+
+        Os planos são avaliados juntos sobre uma matriz (planos x unidades) com a unidade que ocupa cada
+        posição: as permutações do passo t de todos os planos são aplicadas de uma só vez. Como
+        permutações são sequenciais, uma mesma unidade pode ser movida mais de uma vez. Só as
+        posições envolvidas em algum plano entram na soma final.
+
+        Args:
+            linhas_a (np.ndarray): Matriz (n_planos, n_passos) com a primeira linha de cada permutação;
+                -1 indica passo vazio (planos mais curtos).
+            linhas_b (np.ndarray): Matriz de mesmo formato com a segunda linha de cada permutação.
+            inversos (np.ndarray): Inversos das capacitâncias com formato (..., n_unidades), para avaliar os
+                planos sob outras condições (ex.: temperaturas); os do estado atual se None.
+
+        Returns:
+            np.ndarray: Somas de inversos com formato (..., n_planos, n_ramos).
+        """
+        linhas_a = np.asarray(linhas_a)
+        linhas_b = np.asarray(linhas_b)
+        n_planos, n_passos = linhas_a.shape
+        alteradas = np.unique(np.concatenate([linhas_a[linhas_a >= 0], linhas_b[linhas_b >= 0]]))
+        # Ocupantes apenas das posições alteradas por algum plano (colunas da matriz planos x unidades)
+        coluna = np.full(len(self.inversos), -1)
+        coluna[alteradas] = np.arange(len(alteradas))
+        ocupante = np.tile(alteradas, (n_planos, 1))
+        planos = np.arange(n_planos)
+        for passo in range(n_passos):
+            validos = linhas_a[:, passo] >= 0
+            p = planos[validos]
+            a = coluna[linhas_a[validos, passo]]
+            b = coluna[linhas_b[validos, passo]]
+            ocupante[p, a], ocupante[p, b] = ocupante[p, b], ocupante[p, a]
+
+        if inversos is None:
+            inversos, soma_inversos = self.inversos, self.soma_inversos
+        else:
+            inversos = np.asarray(inversos)
+            soma_inversos = inversos @ np.eye(len(self.nomes_ramos))[self.indice_ramo]
+        incidencia = np.eye(len(self.nomes_ramos))[self.indice_ramo[alteradas]]
+        variacao = (inversos[..., ocupante] - inversos[..., None, alteradas]) @ incidencia
+        return soma_inversos[..., None, :] + variacao
+
+    def soma_inversos_capacitancias(self, capacitancias, indice_ramo=None):
+        """
+        Somas de inversos dos ramos para capacitâncias alternativas das unidades (ex.: amostras de Monte Carlo).
+
+        Args:
+            capacitancias (np.ndarray): Capacitâncias (uF) com formato (..., n_unidades), na ordem das linhas.
+            indice_ramo (np.ndarray): Ramo de cada unidade; o ramo atual se None.
+
+        Returns:
+            np.ndarray: Somas de inversos com formato (..., n_ramos).
+        """
+        if indice_ramo is None:
+            indice_ramo = self.indice_ramo
+        incidencia = np.eye(len(self.nomes_ramos))[indice_ramo]
+        return (1 / np.asarray(capacitancias)) @ incidencia
+
+    def avaliar_trocas(self, linhas_i, linhas_j, max_elementos: int = 1 << 22):
+        """
+        Corrente de desbalanceamento para cada par (i, j) candidato, em operações NumPy vetorizadas.
+
+        Vizinhanças grandes são avaliadas em blocos de pares, de modo que os arrays intermediários
+        (um estado por par) ficam limitados a cerca de max_elementos valores.
+        """
+        linhas_i, linhas_j = np.broadcast_arrays(np.asarray(linhas_i), np.asarray(linhas_j))
+        tamanho_bloco = max(1, max_elementos // self.soma_inversos.size)
+        if linhas_i.size <= tamanho_bloco:
+            return self.corrente_desbalanceamento(self.soma_inversos_apos_trocas(linhas_i, linhas_j))
+        pares_i, pares_j = linhas_i.ravel(), linhas_j.ravel()
+        blocos = [
+            self.corrente_desbalanceamento(
+                self.soma_inversos_apos_trocas(pares_i[inicio:inicio + tamanho_bloco], pares_j[inicio:inicio + tamanho_bloco])
+            )
+            for inicio in range(0, len(pares_i), tamanho_bloco)
+        ]
+        return np.concatenate(blocos).reshape(linhas_i.shape + blocos[0].shape[1:])
+
+    def melhor_troca(self, linhas_i, linhas_j):
+        """
+        Avalia todos os pares entre as linhas de linhas_i e as de linhas_j e retorna o melhor.
+
+        Returns:
+            tuple: (linha_i, linha_j, corrente de desbalanceamento após a troca).
+        """
+        linhas_i = np.asarray(linhas_i)
+        linhas_j = np.asarray(linhas_j)
+        correntes = self.avaliar_trocas(linhas_i[:, None], linhas_j[None, :])
+        a, b = np.unravel_index(np.argmin(correntes), correntes.shape)
+        return linhas_i[a], linhas_j[b], float(correntes[a, b])
+
+    def melhor_troca_permitida(self, linhas, ramos_permitidos, max_elementos: int = 1 << 22):
+        """
+        Avalia todos os pares de unidades de `linhas` cujos ramos podem trocar unidades entre si e retorna o melhor.
+
+        Os pares são enumerados no triângulo superior (cada par uma vez), em blocos de linhas, e apenas os
+        pares permitidos de cada bloco são avaliados, de modo que os arrays intermediários ficam limitados
+        a cerca de max_elementos valores mesmo em vizinhanças grandes (todas as pernas e racks).
+
+        Args:
+            linhas (array-like): Linhas (posicionais) das unidades candidatas.
+            ramos_permitidos (np.ndarray): Matriz booleana (n_ramos x n_ramos) dos pares de ramos permitidos.
+            max_elementos (int): Tamanho aproximado máximo dos arrays de cada bloco.
+
+        Returns:
+            tuple: (linha_i, linha_j, corrente de desbalanceamento após a troca); (None, None, inf) se não
+                houver par permitido.
+        """
+        linhas = np.asarray(linhas)
+        ramos = self.indice_ramo[linhas]
+        n = len(linhas)
+        tamanho_bloco = max(1, max_elementos // max(1, n * len(self.nomes_ramos)))
+        melhor = (None, None, np.inf)
+        for inicio in range(0, n, tamanho_bloco):
+            bloco = np.arange(inicio, min(n, inicio + tamanho_bloco))
+            permitidos = (np.arange(n)[None, :] > bloco[:, None]) & ramos_permitidos[ramos[bloco][:, None], ramos[None, :]]
+            a, b = np.nonzero(permitidos)
+            if len(a) == 0:
+                continue
+            correntes = self.avaliar_trocas(linhas[bloco[a]], linhas[b])
+            k = int(np.argmin(correntes))
+            if correntes[k] < melhor[2]:
+                melhor = (linhas[bloco[a[k]]], linhas[b[k]], float(correntes[k]))
+        return melhor
+
+    def avaliar_troca(self, i, j):
+        """Corrente de desbalanceamento resultante da permutação, sem alterar o estado."""
+        return float(self.corrente_desbalanceamento(self.soma_inversos_apos_troca(i, j)))
+
+    def trocar(self, i, j):
+        """Aplica a permutação entre as unidades das linhas i e j, atualizando apenas os dois ramos afetados."""
+        self.soma_inversos = self.soma_inversos_apos_troca(i, j)
+        self.indice_ramo[i], self.indice_ramo[j] = self.indice_ramo[j], self.indice_ramo[i]
+
+class AvaliadorCenarios(AvaliadorCircuito):
+    def __init__(self, capacitancias, ramos, constants: dict, topologia: TopologiaBanco = None,
+                 objetivo: str = 'esperanca', nivel_cvar: float = 0.9):
+        """
+        Avaliador do circuito sobre um lote de cenários de capacitância das unidades.
+
+        Cada cenário é um vetor de capacitâncias (ex.: amostras de AnaliseMonteCarlo) e as somas de
+        inversos têm formato (n_cenarios, n_ramos). Uma permutação continua alterando apenas dois ramos,
+        agora em todos os cenários de uma vez, e avaliar_trocas retorna a corrente de desbalanceamento
+        de cada par candidato em cada cenário (formato (..., n_cenarios)) em uma única operação. O
+        objetivo resume as correntes dos cenários pela esperança ou pelo CVaR (média dos
+        (1 - nivel_cvar) piores cenários).
+
+        Args:
+            capacitancias (np.ndarray): Capacitâncias (uF) com formato (n_cenarios, n_unidades).
+            ramos (array-like): Ramo de cada unidade.
+            constants (dict): Constantes do sistema (config['constants']).
+            topologia (TopologiaBanco): Topologia do banco; usa a topologia padrão se None.
+            objetivo (str): 'esperanca' ou 'cvar'.
+            nivel_cvar (float): Nível do CVaR, entre 0 e 1.
+        """
+        if objetivo not in ('esperanca', 'cvar'):
+            raise ValueError(f"Objetivo inválido: {objetivo}. Use 'esperanca' ou 'cvar'.")
+        capacitancias = np.atleast_2d(np.asarray(capacitancias, dtype=float))
+        super().__init__(capacitancias[0], ramos, constants, topologia)
+        self.inversos = 1 / capacitancias
+        self.soma_inversos = self.soma_inversos_capacitancias(capacitancias)
+        self.objetivo = objetivo
+        self.nivel_cvar = nivel_cvar
+
+    def resumir(self, correntes):
+        """Esperança ou CVaR das correntes ao longo do último eixo (cenários)."""
+        if self.objetivo == 'esperanca':
+            return np.mean(correntes, axis=-1)
+        n_cenarios = correntes.shape[-1]
+        piores = max(1, int(np.ceil((1 - self.nivel_cvar) * n_cenarios)))
+        return np.mean(np.partition(correntes, n_cenarios - piores, axis=-1)[..., n_cenarios - piores:], axis=-1)
+
+    def valor_objetivo(self):
+        """Objetivo (A) no estado atual."""
+        return float(self.resumir(self.corrente_desbalanceamento()))
+
+    def soma_inversos_apos_troca(self, i, j):
+        ramo_i = self.indice_ramo[i]
+        ramo_j = self.indice_ramo[j]
+        delta = self.inversos[:, j] - self.inversos[:, i]
+        soma_inversos = self.soma_inversos.copy()
+        soma_inversos[:, ramo_i] += delta
+        soma_inversos[:, ramo_j] -= delta
+        return soma_inversos
+
+    def soma_inversos_apos_trocas(self, linhas_i, linhas_j):
+        """Somas de inversos após cada par candidato em cada cenário, formato (..., n_cenarios, n_ramos)."""
+        linhas_i, linhas_j = np.broadcast_arrays(np.asarray(linhas_i), np.asarray(linhas_j))
+        delta = np.moveaxis(self.inversos[:, linhas_j] - self.inversos[:, linhas_i], 0, -1)
+        identidade = np.eye(len(self.nomes_ramos))
+        incidencia = identidade[self.indice_ramo[linhas_i]] - identidade[self.indice_ramo[linhas_j]]
+        return self.soma_inversos + delta[..., None] * incidencia[..., None, :]
+
+    def avaliar_troca(self, i, j):
+        """Correntes de desbalanceamento de cada cenário após a permutação, sem alterar o estado."""
+        return self.corrente_desbalanceamento(self.soma_inversos_apos_troca(i, j))
+
+    def melhor_troca(self, linhas_i, linhas_j, max_elementos: int = 1 << 23, cancelamento=None):
+        """
+        Avalia todos os pares entre as linhas de linhas_i e as de linhas_j e retorna o de menor objetivo.
+
+        Os pares são avaliados em blocos de linhas_i para limitar os arrays intermediários a cerca de
+        max_elementos valores; se cancelamento (objeto com is_set()) for acionado, retorna o melhor par
+        dos blocos já avaliados.
+
+        Returns:
+            tuple: (linha_i, linha_j, objetivo após a troca).
+        """
+        linhas_i = np.asarray(linhas_i)
+        linhas_j = np.asarray(linhas_j)
+        tamanho_bloco = max(1, max_elementos // (len(linhas_j) * self.soma_inversos.size))
+        melhor = (None, None, np.inf)
+        for inicio in range(0, len(linhas_i), tamanho_bloco):
+            if cancelamento is not None and cancelamento.is_set():
+                break
+            bloco = linhas_i[inicio:inicio + tamanho_bloco]
+            objetivos = self.resumir(self.avaliar_trocas(bloco[:, None], linhas_j[None, :]))
+            a, b = np.unravel_index(np.argmin(objetivos), objetivos.shape)
+            if objetivos[a, b] < melhor[2]:
+                melhor = (bloco[a], linhas_j[b], float(objetivos[a, b]))
+        return melhor
@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from avaliador_circuito import AvaliadorCircuito
+from gerador_bancos import GeradorBancos
+from otimizador import TODOS_OS_RACKS, OtimizadorBancoCapacitores
+from pre_processamento import PreProcessamentoBancoCapacitores
+
+# Fixture canônica: a campanha da fase A em data/
+MEASURES = 'data/MEDIDA_CAPACITANCIA_FASE_A.txt'
+SERIES_AND_POSITION = 'data/ramo_serie_posicao_fase_A.csv'
+CONFIG = 'data/config.json'
+
+ESTRATEGIAS_PADRAO = ('heuristica', 'todos_pares', 'exato', 'recozimento', 'tabu', 'milp', 'robusto', 'manuseio')
+
+# Reduções (%) candidatas da capacitância da perna desbalanceada dos bancos sintéticos
+REDUCOES_PCT = np.concatenate([[0.0], np.geomspace(0.01, 50, 401)])
+
+def gerar_banco_escalado(escala: int, pasta: str, config: dict, semente: int = 0, margem: float = 1.5):
+    """
+    Gera um banco sintético com `escala` vezes as unidades da fixture, na mesma topologia.
+
+    Cada ramo tem `escala` vezes as unidades em série do ramo correspondente da fixture; as
+    capacitâncias e leituras são sorteadas por GeradorBancos com os parâmetros padrão, calibrados na
+    fixture, e gravadas no formato dos arquivos de campo, de modo que o pré-processamento percorre o
+    mesmo caminho de código.
+
+    Sorteadas independentemente, as unidades se compensam e a corrente de desbalanceamento cai com a
+    escala, ficando abaixo do alarme e sem nada a otimizar. Por isso as unidades da primeira perna,
+    a de menor capacitância na fixture, têm a capacitância reduzida pela menor fração de REDUCOES_PCT
+    que leva a corrente, calculada com as capacitâncias sorteadas, a `margem` vezes
+    corrente_desbalanco_alarme_A, como na fixture (que parte acima do alarme).
+
+    Returns:
+        tuple: Caminhos (arquivo de medidas, arquivo de série e posição).
+
+    Raises:
+        RuntimeError: Se nenhuma redução de REDUCOES_PCT atingir a corrente desejada.
+    """
+    unidades_por_ramo = (pd.read_csv(SERIES_AND_POSITION)['ramo'].value_counts() * escala).to_dict()
+    gerador = GeradorBancos(config, unidades_por_ramo=unidades_por_ramo, semente=semente)
+    unidades = gerador.sortear()
+    topologia = gerador.topologia
+    perna = topologia.pernas[0]
+
+    # A redução é aplicada depois dos sorteios, de modo que o banco gerado com ele tem as mesmas unidades
+    avaliador = AvaliadorCircuito(
+        unidades['capacitancia_real_uF'].values, unidades['ramo'].values, config['constants'], topologia
+    )
+    na_perna = (unidades['ramo'].map(topologia.perna_do_ramo) == perna).values
+    capacitancias = unidades['capacitancia_real_uF'].values * (1 - np.outer(REDUCOES_PCT, na_perna) / 100)
+    correntes = avaliador.corrente_desbalanceamento(
+        avaliador.soma_inversos_capacitancias(capacitancias, avaliador.indice_ramo)
+    )
+    alvo = margem * config['constraints']['corrente_desbalanco_alarme_A']
+    acima = np.flatnonzero(correntes >= alvo)
+    if len(acima) == 0:
+        raise RuntimeError(f"Nenhuma redução da perna {perna} leva o banco {escala}x a {alvo:.3f} A.")
+
+    gerador = GeradorBancos(
+        config, unidades_por_ramo=unidades_por_ramo, vies_pernas_pct={perna: -REDUCOES_PCT[acima[0]]}, semente=semente
+    )
+    entrada, = gerador.escrever(pasta, prefixo=f'x{escala}')
+    return entrada['measures'], entrada['positions']
+
+def cronometrar(funcao, repeticoes: int = 3):
+    """Menor tempo (s) de `repeticoes` execuções de funcao()."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+def medir_escala(escala, measures, positions, config, estrategias, rack='R1', max_permutacoes=10,
+                 repeticoes=3, tempo_max_s=60.0):
+    """
+    Mede os caminhos críticos para um banco.
+
+    Returns:
+        list: Uma medida (dict) por caminho: pré-processamento, cálculo dos parâmetros, troca de teste
+            isolada, avaliação vetorizada de todos os pares entre as pernas do rack e otimização completa
+            de cada estratégia (e do modo conjunto de todos os racks). Otimizações que excedem
+            tempo_max_s são canceladas e marcadas como tal.
+    """
+    medidas = []
+    def registrar(medida, tempo_s, avaliacoes=None, **extras):
+        medidas.append({
+            'escala': escala,
+            'medida': medida,
+            'tempo_s': tempo_s,
+            'avaliacoes': avaliacoes,
+            'avaliacoes_por_s': avaliacoes / tempo_s if avaliacoes is not None and tempo_s > 0 else None,
+            **extras
+        })
+
+    preprocessador = PreProcessamentoBancoCapacitores(measures, positions, config)
+    def preprocessar():
+        preprocessador.load_data()
+        preprocessador.process_data()
+    tempo = cronometrar(preprocessar, repeticoes)
+    df = preprocessador.df
+    registrar('process_data', tempo, unidades=len(df), unidades_por_s=len(df) / tempo)
+
+    otimizador = OtimizadorBancoCapacitores(df, config, rack, max_permutacoes, run_optimization=False, verbosidade=0)
+    # Um banco abaixo do alarme encerraria as otimizações sem permutações, sem medir a busca
+    alarme = config['constraints']['corrente_desbalanco_alarme_A']
+    if not otimizador.unbalanced_current > alarme:
+        raise RuntimeError(
+            f"O banco {escala}x parte com {otimizador.unbalanced_current:.4f} A, abaixo do alarme ({alarme} A)."
+        )
+    registrar('calcular_parametros', cronometrar(otimizador.calcular_parametros, repeticoes), 1)
+
+    avaliador = otimizador.avaliador
+    pernas = otimizador.topologia.pernas_rack[rack]
+    linhas_1 = np.flatnonzero(df['ramo'].isin(otimizador.topologia.ramos_perna[pernas[0]]).values)
+    linhas_2 = np.flatnonzero(df['ramo'].isin(otimizador.topologia.ramos_perna[pernas[1]]).values)
+    chamadas = 1000
+    tempo = cronometrar(lambda: [avaliador.avaliar_troca(linhas_1[0], linhas_2[0]) for _ in range(chamadas)], repeticoes)
+    registrar('troca_isolada', tempo / chamadas, 1)
+    tempo = cronometrar(lambda: avaliador.avaliar_trocas(linhas_1[:, None], linhas_2[None, :]), repeticoes)
+    registrar('trocas_vetorizadas', tempo, len(linhas_1) * len(linhas_2))
+
+    execucoes = [(estrategia, rack) for estrategia in estrategias] + [('todos_pares', TODOS_OS_RACKS)]
+    for estrategia, rack_execucao in execucoes:
+        medida = f'otimizar/{estrategia}' if rack_execucao != TODOS_OS_RACKS else 'otimizar/todos_racks'
+        cancelamento = threading.Event()
+        limite = threading.Timer(tempo_max_s, cancelamento.set)
+        try:
+            otimizador = OtimizadorBancoCapacitores(
+                df, config, rack_execucao, max_permutacoes, run_optimization=False, estrategia=estrategia,
+                semente=0, cancelamento=cancelamento, verbosidade=0
+            )
+            avaliacoes_iniciais = otimizador.avaliador.estatisticas['avaliacoes']
+            limite.start()
+            inicio = time.perf_counter()
+            otimizador.otimizar()
+            tempo = time.perf_counter() - inicio
+        except Exception as erro:
+            registrar(medida, None, erro=f'{type(erro).__name__}: {erro}')
+            continue
+        finally:
+            limite.cancel()
+        registrar(
+            medida, tempo, otimizador.avaliador.estatisticas['avaliacoes'] - avaliacoes_iniciais,
+            num_permutacoes=len(otimizador.permutacoes_feitas),
+            corrente_final_A=float(otimizador.unbalanced_current),
+            cancelado=otimizador.cancelado
+        )
+    return medidas
+
+def executar(escalas=(1, 10, 100), estrategias=ESTRATEGIAS_PADRAO, repeticoes=3, tempo_max_s=60.0):
+    """
+    Executa o benchmark na fixture (escala 1) e em bancos sintéticos escalados.
+
+    Returns:
+        dict: Resultado serializável em JSON, com o commit, o ambiente e as medidas.
+    """
+    with open(CONFIG, 'r') as file:
+        config = json.load(file)
+    medidas = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for escala in escalas:
+            if escala == 1:
+                measures, positions = MEASURES, SERIES_AND_POSITION
+            else:
+                measures, positions = gerar_banco_escalado(escala, pasta, config)
+            print(f"Escala {escala}x...")
+            medidas += medir_escala(
+                escala, measures, positions, config, estrategias, repeticoes=repeticoes, tempo_max_s=tempo_max_s
+            )
+    return {
+        'commit': _commit_atual(),
+        'data_hora': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+            'processadores': os.cpu_count()
+        },
+        'medidas': medidas
+    }
+
+def comparar(atual: dict, referencia: dict):
+    """
+    Compara os tempos de duas execuções do benchmark, medida a medida.
+
+    Returns:
+        pd.DataFrame: Tempos de referência e atual e a razão atual / referência (> 1 indica regressão).
+    """
+    def tabela(resultado):
+        return pd.DataFrame(resultado['medidas']).set_index(['escala', 'medida'])['tempo_s']
+    comparacao = pd.concat({'referencia_s': tabela(referencia), 'atual_s': tabela(atual)}, axis=1)
+    comparacao['razao'] = comparacao['atual_s'] / comparacao['referencia_s']
+    return comparacao
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark do pré-processamento e do otimizador.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100],
+                        help='Múltiplos do número de unidades da fixture (1 = data/).')
+    parser.add_argument('--estrategias', nargs='+', default=list(ESTRATEGIAS_PADRAO))
+    parser.add_argument('--repeticoes', type=int, default=3, help='Repetições das medidas curtas (menor tempo).')
+    parser.add_argument('--tempo-max', type=float, default=60.0, help='Tempo máximo de cada otimização (s).')
+    parser.add_argument('--saida', help='Arquivo JSON de resultados (padrão: benchmarks/<commit>.json).')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparação.')
+    args = parser.parse_args()
+
+    resultado = executar(args.escalas, args.estrategias, args.repeticoes, args.tempo_max)
+    saida = args.saida or os.path.join('benchmarks', f"{resultado['commit'] or 'sem_commit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as file:
+        json.dump(resultado, file, indent=2, ensure_ascii=False)
+    print(pd.DataFrame(resultado['medidas']).to_string(index=False))
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as file:
+            print(comparar(resultado, json.load(file)).to_string())
@@ -0,0 +1,194 @@
+import numpy as np
+
+class BuscaExataTrocas:
+    def __init__(self, avaliador, linhas_1, linhas_2, tolerancia: float, tamanho_lote: int = 256,
+                 cancelamento=None, max_elementos: int = 1 << 22):
+        """
+        Busca exata (branch-and-bound) do menor conjunto de permutações que leva a corrente de
+        desbalanceamento a um valor menor ou igual à tolerância.
+
+        Os candidatos são todos os pares (i, j) com i em linhas_1 e j em linhas_2. Cada unidade é
+        movida no máximo uma vez, como no otimizador heurístico: os pares que compartilham uma unidade
+        com uma permutação já escolhida são descartados comparando as unidades de cada lado, sem
+        matriz de conflitos entre pares (quadrática no número de pares).
+
+        Args:
+            avaliador (AvaliadorCircuito): Avaliador com o estado atual do banco.
+            linhas_1 (array-like): Linhas (posicionais) das unidades da primeira perna.
+            linhas_2 (array-like): Linhas (posicionais) das unidades da segunda perna.
+            tolerancia (float): Corrente de desbalanceamento desejada (A).
+            tamanho_lote (int): Número máximo de nós avaliados por vez nos dois últimos níveis da busca.
+            cancelamento: Objeto com is_set() (ex.: threading.Event); quando ativado, a busca termina e
+                retorna a melhor solução avaliada até o momento.
+            max_elementos (int): Tamanho aproximado máximo dos arrays de cada lote do último nível e de
+                cada bloco do cálculo dos limites inferiores; reduz tamanho_lote em vizinhanças grandes.
+        """
+        self.avaliador = avaliador
+        self.linhas_1 = np.asarray(linhas_1)
+        self.linhas_2 = np.asarray(linhas_2)
+        self.tolerancia = tolerancia
+        self.cancelamento = cancelamento
+        self.max_elementos = max_elementos
+
+        pares_i, pares_j = np.meshgrid(self.linhas_1, self.linhas_2, indexing='ij')
+        self.pares_i = pares_i.ravel()
+        self.pares_j = pares_j.ravel()
+        # Variação das somas de inversos dos ramos provocada por cada par candidato
+        self.variacoes = avaliador.soma_inversos_apos_trocas(self.pares_i, self.pares_j) - avaliador.soma_inversos
+        # Cada lote do último nível avalia (lote x pares x ramos) estados
+        self.tamanho_lote = max(1, min(tamanho_lote, max_elementos // max(1, self.variacoes.size)))
+
+        self.ramos_1 = np.unique(avaliador.indice_ramo[self.linhas_1])
+        self.ramos_2 = np.unique(avaliador.indice_ramo[self.linhas_2])
+        self.nos_avaliados = 0
+
+    def buscar(self, max_trocas: int):
+        """
+        Procura, para k = 1..max_trocas, um conjunto de k permutações que atinja a tolerância.
+
+        O primeiro k viável é o mínimo, pois os valores menores foram explorados por completo. Entre
+        as soluções com k permutações retorna a de menor corrente de desbalanceamento.
+
+        Returns:
+            tuple: (lista de pares (i, j), corrente de desbalanceamento, True se a tolerância foi atingida).
+                Se nenhum k atinge a tolerância, retorna o conjunto de até max_trocas permutações com a
+                menor corrente de desbalanceamento.
+        """
+        self.melhor_trocas = []
+        self.melhor_corrente = float(self.avaliador.corrente_desbalanceamento())
+        if self.melhor_corrente <= self.tolerancia:
+            return [], self.melhor_corrente, True
+
+        livres = np.ones(len(self.pares_i), dtype=bool)
+        for k in range(1, max_trocas + 1):
+            self.solucao = None
+            self.limiar = self.tolerancia
+            if k == max_trocas:
+                # Último nível: sem solução viável até aqui, minimiza a corrente de desbalanceamento
+                self.limiar = max(self.tolerancia, self.melhor_corrente)
+            self._expandir(self.avaliador.soma_inversos, livres, 0, k, [])
+            if self.solucao is not None and self.limiar <= self.tolerancia:
+                return self.solucao, self.limiar, True
+            if self._cancelada():
+                break
+        return self.melhor_trocas, self.melhor_corrente, False
+
+    def _expandir(self, soma_inversos, livres, inicio, restantes, trocas):
+        # Pares com índice maior que o último escolhido e sem unidades já movidas
+        candidatos = inicio + np.flatnonzero(livres[inicio:])
+        if len(candidatos) == 0 or self._cancelada():
+            return
+        somas_filhos = soma_inversos + self.variacoes[candidatos]
+        correntes = self.avaliador.corrente_desbalanceamento(somas_filhos)
+        self.nos_avaliados += len(candidatos)
+        melhor = np.argmin(correntes)
+        self._registrar(float(correntes[melhor]), trocas + [self._par(candidatos[melhor])], restantes == 1)
+        if restantes == 1:
+            return
+
+        # Limites calculados em blocos, que limitam a memória e permitem interromper vizinhanças grandes
+        limites = np.empty(len(candidatos))
+        passo = max(1, self.max_elementos // (somas_filhos.shape[-1] * restantes))
+        for inicio_bloco in range(0, len(candidatos), passo):
+            if self._cancelada():
+                return
+            bloco = slice(inicio_bloco, inicio_bloco + passo)
+            limites[bloco] = self._limite_inferior(somas_filhos[bloco], livres, restantes - 1)
+        ordem = np.argsort(correntes)
+        if restantes == 2:
+            ordem = ordem[limites[ordem] <= self.limiar]
+            for inicio_lote in range(0, len(ordem), self.tamanho_lote):
+                if self._cancelada():
+                    return
+                lote = ordem[inicio_lote:inicio_lote + self.tamanho_lote]
+                self._expandir_folhas(somas_filhos[lote], candidatos[lote], livres, trocas)
+            return
+
+        for c in ordem:
+            if self._cancelada():
+                return
+            # O limiar diminui à medida que soluções melhores são encontradas
+            if limites[c] > self.limiar:
+                continue
+            par = candidatos[c]
+            self._expandir(somas_filhos[c], livres & self._sem_conflito(par), par + 1, restantes - 1,
+                           trocas + [self._par(par)])
+
+    def _expandir_folhas(self, somas_pais, pares_pais, livres, trocas):
+        """Avalia de uma só vez todas as permutações finais de um lote de nós do penúltimo nível."""
+        indices = np.arange(len(self.pares_i))
+        validos = livres & self._sem_conflito(pares_pais[:, None]) & (indices > pares_pais[:, None])
+        somas = somas_pais[:, None, :] + self.variacoes[None, :, :]
+        correntes = np.where(validos, self.avaliador.corrente_desbalanceamento(somas), np.inf)
+        self.nos_avaliados += int(validos.sum())
+
+        pai, folha = np.unravel_index(np.argmin(correntes), correntes.shape)
+        if np.isfinite(correntes[pai, folha]):
+            self._registrar(float(correntes[pai, folha]),
+                            trocas + [self._par(pares_pais[pai]), self._par(folha)], True)
+
+    def _registrar(self, corrente, trocas, completa):
+        """Atualiza a melhor solução avaliada e, para conjuntos completos, a solução viável."""
+        if corrente < self.melhor_corrente:
+            self.melhor_corrente = corrente
+            self.melhor_trocas = trocas
+        if completa and corrente <= self.limiar:
+            self.limiar = corrente
+            self.solucao = trocas
+
+    def _limite_inferior(self, somas, livres, restantes):
+        """
+        Limite inferior da corrente de desbalanceamento atingível a partir de cada estado em `somas`
+        com mais `restantes` permutações entre os pares ainda livres.
+        """
+        avaliador = self.avaliador
+        usados = np.ones(len(avaliador.inversos), dtype=bool)
+        usados[self.pares_i[livres]] = False
+        usados[self.pares_j[livres]] = False
+
+        # Para cada ramo, maior aumento e maior redução da soma de inversos com t = 0..restantes trocas
+        aumentos = np.zeros((len(avaliador.nomes_ramos), restantes + 1))
+        reducoes = np.zeros_like(aumentos)
+        livres_1 = self.linhas_1[~usados[self.linhas_1]]
+        livres_2 = self.linhas_2[~usados[self.linhas_2]]
+        for ramos_lado, livres_lado, entrada in ((self.ramos_1, livres_1, livres_2), (self.ramos_2, livres_2, livres_1)):
+            inversos_entrada = np.sort(avaliador.inversos[entrada])
+            for ramo in ramos_lado:
+                inversos_saida = np.sort(avaliador.inversos[livres_lado[avaliador.indice_ramo[livres_lado] == ramo]])
+                n = min(restantes, len(inversos_saida), len(inversos_entrada))
+                # Entram os maiores inversos e saem os menores (aumento), ou o contrário (redução)
+                aumentos[ramo, 1:n + 1] = np.cumsum(np.maximum(inversos_entrada[::-1][:n] - inversos_saida[:n], 0))
+                reducoes[ramo, 1:n + 1] = np.cumsum(np.minimum(inversos_entrada[:n] - inversos_saida[::-1][:n], 0))
+                aumentos[ramo, n + 1:] = aumentos[ramo, n]
+                reducoes[ramo, n + 1:] = reducoes[ramo, n]
+
+        Y_min = (1 / somas) @ avaliador.topologia.incidencia_ramo_perna
+        Y_max = Y_min.copy()
+        for perna, ramos in enumerate(avaliador.topologia.indice_ramos_perna):
+            if not np.any(aumentos[ramos] - reducoes[ramos]):
+                continue
+            # Distribui as `restantes` trocas entre os ramos da perna (programação dinâmica sobre t)
+            menor = 1 / (somas[..., ramos[0], None] + aumentos[ramos[0]])
+            maior = 1 / (somas[..., ramos[0], None] + reducoes[ramos[0]])
+            for ramo in ramos[1:]:
+                C_menor = 1 / (somas[..., ramo, None] + aumentos[ramo])
+                C_maior = 1 / (somas[..., ramo, None] + reducoes[ramo])
+                menor = np.stack([
+                    np.min(menor[..., :t + 1] + C_menor[..., t::-1], axis=-1) for t in range(restantes + 1)
+                ], axis=-1)
+                maior = np.stack([
+                    np.max(maior[..., :t + 1] + C_maior[..., t::-1], axis=-1) for t in range(restantes + 1)
+                ], axis=-1)
+            Y_min[..., perna] = menor[..., restantes]
+            Y_max[..., perna] = maior[..., restantes]
+        return avaliador.limite_inferior_desbalanceamento(Y_min, Y_max)
+
+    def _sem_conflito(self, pares):
+        """Máscara dos pares candidatos sem unidades em comum com cada um de `pares` (formato (..., n_pares))."""
+        return (self.pares_i != self.pares_i[pares]) & (self.pares_j != self.pares_j[pares])
+
+    def _cancelada(self):
+        return self.cancelamento is not None and self.cancelamento.is_set()
+
+    def _par(self, indice):
+        return int(self.pares_i[indice]), int(self.pares_j[indice])
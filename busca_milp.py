@@ -0,0 +1,181 @@
+import numpy as np
+
+try:
+    import pulp
+except ImportError:  # Dependência opcional, necessária apenas para a estratégia 'milp'
+    pulp = None
+
+class BuscaMILP:
+    def __init__(self, avaliador, linhas, tolerancia: float, max_trocas: int, constraints: dict = None,
+                 capacitancia_nominal_fase=None, limite_tempo_s=None):
+        """
+        Formulação do balanceamento como problema de atribuição inteiro-misto, resolvido com PuLP/CBC.
+
+        Cada unidade em `linhas` é atribuída a um ramo entre os ramos dessas unidades (x[u, r] binário).
+        As transferências entre dois ramos são simétricas, de modo que a solução é um conjunto de
+        permutações de pares e o número de permutações é metade do número de unidades movidas. As
+        correntes de desbalanceamento, as capacitâncias das pernas e a da fase são linearizadas em
+        torno do estado atual (diferenças finitas sobre as somas de inversos dos ramos).
+
+        Restrições de config['constraints'] usadas, quando presentes:
+            tolerancia_diferenca_pernas: diferença relativa máxima entre as capacitâncias das pernas
+                de um mesmo rack (ou a diferença atual, se já for maior).
+            tolerancia_var_capacit_fase: a capacitância da fase não pode superar
+                capacitancia_nominal_fase em mais de x% (ou o valor atual, se já for maior).
+
+        Args:
+            avaliador (AvaliadorCircuito): Avaliador com o estado atual do banco.
+            linhas (array-like): Linhas (posicionais) das unidades que podem ser movidas.
+            tolerancia (float): Corrente de desbalanceamento desejada (A).
+            max_trocas (int): Número máximo de permutações.
+            constraints (dict): Restrições do config.
+            capacitancia_nominal_fase (float): Capacitância nominal da fase (uF).
+            limite_tempo_s (float): Tempo máximo de cada resolução do CBC, em segundos.
+        """
+        if pulp is None:
+            raise ImportError("A estratégia 'milp' requer o pacote PuLP (pip install pulp).")
+        self.avaliador = avaliador
+        self.linhas = np.asarray(linhas)
+        self.tolerancia = tolerancia
+        self.max_trocas = max_trocas
+        self.constraints = constraints or {}
+        self.capacitancia_nominal_fase = capacitancia_nominal_fase
+        self.limite_tempo_s = limite_tempo_s
+
+        self.ramo_original = avaliador.indice_ramo[self.linhas]
+        self.ramos = np.unique(self.ramo_original)
+        self.status = None
+        self.otimo = False
+        self.corrente_linearizada = None
+
+    def buscar(self):
+        """
+        Resolve o modelo em duas etapas: primeiro o menor número de permutações cuja corrente linearizada
+        atinge a tolerância; se não houver ou se a corrente exata não atingir, a menor corrente com até
+        max_trocas permutações.
+
+        Returns:
+            tuple: (lista de pares (i, j), corrente de desbalanceamento exata, True se a tolerância foi atingida).
+                O status do CBC fica em self.status e self.otimo indica se a solução do modelo linearizado
+                tem certificado de otimalidade.
+        """
+        corrente = float(self.avaliador.corrente_desbalanceamento())
+        if corrente <= self.tolerancia:
+            return [], corrente, True
+
+        trocas = self._resolver(minimizar_trocas=True)
+        if trocas is not None:
+            corrente = self._corrente_exata(trocas)
+            if corrente <= self.tolerancia:
+                return trocas, corrente, True
+        trocas = self._resolver(minimizar_trocas=False) or []
+        corrente = self._corrente_exata(trocas)
+        return trocas, corrente, corrente <= self.tolerancia
+
+    def _funcoes(self, soma_inversos):
+        """Diferenças de corrente dos pares monitorados, capacitâncias das pernas e capacitância da fase."""
+        parametros = self.avaliador.parametros(soma_inversos)
+        pares = self.avaliador.topologia.pares_desbalanco
+        I_pernas = parametros['I_pernas']
+        return np.concatenate([
+            I_pernas[..., pares[:, 0]] - I_pernas[..., pares[:, 1]],
+            parametros['capacitancias_pernas'],
+            parametros['capacitancia_fase'][..., None]
+        ], axis=-1)
+
+    def _linearizar(self):
+        """Valor e jacobiano (n_ramos x n_funcoes) das funções em relação às somas de inversos dos ramos."""
+        soma_inversos = self.avaliador.soma_inversos
+        passos = 1e-7 * soma_inversos
+        valores = self._funcoes(np.vstack([soma_inversos, soma_inversos + np.diag(passos)]))
+        return valores[0], (valores[1:] - valores[0]) / passos[:, None]
+
+    def _resolver(self, minimizar_trocas: bool):
+        avaliador = self.avaliador
+        topologia = avaliador.topologia
+        valores, jacobiano = self._linearizar()
+        n_pares = len(topologia.pares_desbalanco)
+        n_pernas = len(topologia.pernas)
+
+        modelo = pulp.LpProblem('balanceamento_banco', pulp.LpMinimize)
+        x = {
+            (u, r): pulp.LpVariable(f'x_{u}_{r}', cat='Binary')
+            for u in range(len(self.linhas)) for r in self.ramos
+        }
+        for u in range(len(self.linhas)):
+            modelo += pulp.lpSum(x[u, r] for r in self.ramos) == 1
+        # Transferências simétricas entre cada par de ramos: a solução é um conjunto de permutações
+        for a, r in enumerate(self.ramos):
+            for s in self.ramos[a + 1:]:
+                modelo += (
+                    pulp.lpSum(x[u, s] for u in np.flatnonzero(self.ramo_original == r)) ==
+                    pulp.lpSum(x[u, r] for u in np.flatnonzero(self.ramo_original == s))
+                )
+        movidas = pulp.lpSum(1 - x[u, self.ramo_original[u]] for u in range(len(self.linhas)))
+        modelo += movidas <= 2 * self.max_trocas
+
+        # Variação da soma de inversos de cada ramo e modelo linear das funções
+        inversos = avaliador.inversos[self.linhas]
+        variacao = {
+            r: pulp.lpSum(inversos[u] * x[u, r] for u in range(len(self.linhas)))
+            - inversos[self.ramo_original == r].sum()
+            for r in self.ramos
+        }
+        def linear(k):
+            return valores[k] + pulp.lpSum(jacobiano[r, k] * variacao[r] for r in self.ramos)
+
+        # Corrente de desbalanceamento (em unidades da tolerância) limitada por t
+        t = pulp.LpVariable('t', lowBound=0)
+        for k in range(n_pares):
+            modelo += linear(k) <= self.tolerancia * t
+            modelo += -linear(k) <= self.tolerancia * t
+
+        tolerancia_pernas = self.constraints.get('tolerancia_diferenca_pernas')
+        if tolerancia_pernas is not None:
+            for rack in np.unique(topologia.indice_rack_perna[topologia.indice_perna_ramo[self.ramos]]):
+                pernas = np.flatnonzero(topologia.indice_rack_perna == rack)
+                for a, p in enumerate(pernas):
+                    for q in pernas[a + 1:]:
+                        C_p, C_q = valores[n_pares + p], valores[n_pares + q]
+                        limite = max(tolerancia_pernas * (C_p + C_q) / 2, abs(C_p - C_q))
+                        modelo += linear(n_pares + p) - linear(n_pares + q) <= limite
+                        modelo += linear(n_pares + q) - linear(n_pares + p) <= limite
+
+        tolerancia_fase = self.constraints.get('tolerancia_var_capacit_fase')
+        if tolerancia_fase is not None and self.capacitancia_nominal_fase is not None:
+            indice_fase = n_pares + n_pernas
+            nominal = self.capacitancia_nominal_fase
+            modelo += linear(indice_fase) <= max(nominal * (1 + tolerancia_fase / 100), valores[indice_fase])
+
+        if minimizar_trocas:
+            # Menor número de unidades movidas; entre empates, menor corrente (t <= 1 < 2 unidades por troca)
+            modelo += t <= 1
+            modelo += movidas + t
+        else:
+            modelo += t + 1e-3 * movidas
+
+        modelo.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=self.limite_tempo_s))
+        # Com limite de tempo, o CBC pode parar com uma solução viável sem certificado de otimalidade
+        self.status = pulp.LpSolution[modelo.sol_status]
+        self.otimo = modelo.sol_status == pulp.LpSolutionOptimal
+        if modelo.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+            return None
+        self.corrente_linearizada = self.tolerancia * t.value()
+
+        # Pareia as unidades que saíram de r para s com as que saíram de s para r
+        atribuicao = np.array([
+            next(r for r in self.ramos if x[u, r].value() > 0.5) for u in range(len(self.linhas))
+        ])
+        trocas = []
+        for a, r in enumerate(self.ramos):
+            for s in self.ramos[a + 1:]:
+                saidas_r = self.linhas[(self.ramo_original == r) & (atribuicao == s)]
+                saidas_s = self.linhas[(self.ramo_original == s) & (atribuicao == r)]
+                trocas += [(int(i), int(j)) for i, j in zip(saidas_r, saidas_s)]
+        return trocas
+
+    def _corrente_exata(self, trocas):
+        avaliador = self.avaliador.copiar()
+        for i, j in trocas:
+            avaliador.trocar(i, j)
+        return float(avaliador.corrente_desbalanceamento())
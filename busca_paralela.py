@@ -0,0 +1,175 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from otimizador import OtimizadorBancoCapacitores
+from topologia import TopologiaBanco
+
+# Estratégias cujo resultado depende da semente e que, portanto, se beneficiam de reinícios ('robusto'
+# sorteia os cenários de capacitância); as demais recebem apenas a primeira semente
+ESTRATEGIAS_ALEATORIAS = {'heuristica', 'recozimento', 'robusto'}
+
+# Colunas numéricas publicadas em memória compartilhada, quando presentes no DataFrame: a capacitância
+# ajustada, usada por todas as estratégias, e as usadas pela amostragem de cenários da estratégia 'robusto'
+# (AnaliseMonteCarlo)
+COLUNAS_NUMERICAS = (
+    'capacitancia_campo_ajustada_uF',
+    'capacitancia_campo_uF',
+    'temperatura_capacitor_C',
+    'desvio_leituras_uF',
+    'num_leituras'
+)
+
+def _criar_memoria_compartilhada(array):
+    memoria = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=memoria.buf)[:] = array
+    return memoria, (memoria.name, array.shape, array.dtype.str)
+
+def _ler_memoria_compartilhada(descricao):
+    nome, formato, dtype = descricao
+    memoria = shared_memory.SharedMemory(name=nome)
+    try:
+        return np.ndarray(formato, dtype=dtype, buffer=memoria.buf).copy()
+    finally:
+        memoria.close()
+
+def _executar_tarefa(vetores, categorias, colunas, config, rack, estrategia, semente, max_permutacoes):
+    """Executa uma otimização em um processo de trabalho a partir dos vetores em memória compartilhada."""
+    valores = _ler_memoria_compartilhada(vetores['valores'])
+    codigos = _ler_memoria_compartilhada(vetores['codigos'])
+    df = pd.DataFrame({
+        'rack': categorias['rack'][codigos[:, 0]],
+        'ramo': categorias['ramo'][codigos[:, 1]],
+        'perna': categorias['perna'][codigos[:, 2]],
+        'posicao': categorias['posicao'][codigos[:, 3]],
+        **{coluna: valores[:, k] for k, coluna in enumerate(colunas)}
+    })
+    otimizador = OtimizadorBancoCapacitores(
+        df, config, rack, max_permutacoes, estrategia=estrategia, semente=semente, verbosidade=0
+    )
+    return {
+        'rack': rack,
+        'estrategia': estrategia,
+        'semente': semente,
+        'corrente_desbalanco_A': otimizador.unbalanced_current,
+        'num_permutacoes': len(otimizador.permutacoes_feitas),
+        'permutacoes': otimizador.permutacoes_feitas,
+        'erro': None
+    }
+
+def otimizar_em_paralelo(df: pd.DataFrame, config: dict, max_permutacoes: int, racks=None,
+                         estrategias=('heuristica', 'todos_pares', 'exato'), sementes=(0, 1, 2, 3),
+                         max_workers=None):
+    """
+    Executa otimizações independentes em paralelo (racks x estratégias x sementes) e retorna a melhor.
+
+    As colunas de COLUNAS_NUMERICAS presentes no DataFrame e os códigos (pd.factorize) de
+    rack/ramo/perna/posição são publicados uma única vez em memória compartilhada, e as categorias
+    seguem com cada tarefa, de modo que cada processo reconstrói apenas as colunas que o otimizador
+    usa, sem serializar o DataFrame completo. Sementes só são variadas para estratégias de
+    ESTRATEGIAS_ALEATORIAS; as demais são executadas uma vez, com a primeira semente, de modo que
+    todas as execuções (inclusive a tabu) são reprodutíveis.
+
+    Uma execução que falha não interrompe as demais: o erro fica registrado na coluna 'erro' de
+    'execucoes'. A melhor execução, entre as concluídas, é a que atinge tolerancia_diferenca com o
+    menor número de permutações; se nenhuma atingir, a de menor corrente de desbalanceamento.
+
+    Args:
+        df (pd.DataFrame): DataFrame pré-processado.
+        config (dict): Dicionário de configuração.
+        max_permutacoes (int): Número máximo de permutações de cada execução.
+        racks (iterable): Racks a otimizar; todos os racks da topologia se None.
+        estrategias (iterable): Estratégias do otimizador a executar.
+        sementes (iterable): Sementes dos reinícios aleatórios.
+        max_workers (int): Número de processos; padrão do ProcessPoolExecutor se None.
+
+    Returns:
+        dict: Resultados do otimizador (get_results) para a melhor execução, acrescidos de 'rack',
+            'estrategia', 'semente' e 'execucoes' (DataFrame com o resumo de todas as execuções).
+
+    Raises:
+        RuntimeError: Se todas as execuções falharem.
+    """
+    if racks is None:
+        racks = TopologiaBanco.from_config(config).racks
+    categorias = {}
+    codigos = np.empty((len(df), 4), dtype=np.int64)
+    # Posições também são fatoradas, pois não são necessariamente inteiras (ex.: texto)
+    for k, coluna in enumerate(['rack', 'ramo', 'perna', 'posicao']):
+        codigos[:, k], categorias[coluna] = pd.factorize(df[coluna])
+        categorias[coluna] = np.asarray(categorias[coluna])
+    colunas = [coluna for coluna in COLUNAS_NUMERICAS if coluna in df]
+    valores = df[colunas].to_numpy(dtype=np.float64)
+
+    sementes = list(sementes)
+    tarefas = [
+        (rack, estrategia, semente)
+        for rack, estrategia in product(racks, estrategias)
+        for semente in (sementes if estrategia in ESTRATEGIAS_ALEATORIAS else sementes[:1] or [None])
+    ]
+
+    memoria_valores, descricao_valores = _criar_memoria_compartilhada(valores)
+    memoria_codigos, descricao_codigos = _criar_memoria_compartilhada(codigos)
+    vetores = {'valores': descricao_valores, 'codigos': descricao_codigos}
+    execucoes = []
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futuros = [
+                executor.submit(
+                    _executar_tarefa, vetores, categorias, colunas, config, rack, estrategia, semente, max_permutacoes
+                )
+                for rack, estrategia, semente in tarefas
+            ]
+            for (rack, estrategia, semente), futuro in zip(tarefas, futuros):
+                try:
+                    execucoes.append(futuro.result())
+                except Exception as erro:
+                    execucoes.append({
+                        'rack': rack,
+                        'estrategia': estrategia,
+                        'semente': semente,
+                        'corrente_desbalanco_A': np.nan,
+                        'num_permutacoes': 0,
+                        'permutacoes': [],
+                        'erro': f'{type(erro).__name__}: {erro}'
+                    })
+    finally:
+        for memoria in (memoria_valores, memoria_codigos):
+            memoria.close()
+            memoria.unlink()
+
+    concluidas = [e for e in execucoes if e['erro'] is None]
+    if not concluidas:
+        raise RuntimeError(f"Todas as execuções falharam; primeiro erro: {execucoes[0]['erro'] if execucoes else None}")
+    tolerancia_diferenca = config['constraints']['tolerancia_diferenca']
+    melhor = min(
+        concluidas,
+        key=lambda e: (
+            e['corrente_desbalanco_A'] > tolerancia_diferenca,
+            e['num_permutacoes'] if e['corrente_desbalanco_A'] <= tolerancia_diferenca else 0,
+            e['corrente_desbalanco_A']
+        )
+    )
+
+    # Reaplica as permutações vencedoras sobre o DataFrame completo
+    otimizador = OtimizadorBancoCapacitores(
+        df, config, melhor['rack'], max_permutacoes, run_optimization=False, estrategia=melhor['estrategia'],
+        verbosidade=0
+    )
+    otimizador.salvar_estado(permutacao=0)
+    for permutacao in melhor['permutacoes']:
+        posicoes = otimizador.result_df['posicao']
+        otimizador.registrar_permutacao(
+            posicoes.index[posicoes == permutacao['posicao_origem']][0],
+            posicoes.index[posicoes == permutacao['posicao_destino']][0]
+        )
+
+    results = otimizador.get_results()
+    results['rack'] = melhor['rack']
+    results['estrategia'] = melhor['estrategia']
+    results['semente'] = melhor['semente']
+    results['execucoes'] = pd.DataFrame(
+        [{k: v for k, v in e.items() if k != 'permutacoes'} for e in execucoes]
+    )
+    return results
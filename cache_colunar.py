@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Versão do formato e do pré-processamento; alterar invalida os caches existentes
+VERSAO_CACHE = 5
+
+# Colunas de texto com poucos valores distintos, guardadas como códigos inteiros + categorias e
+# decodificadas de volta para texto na leitura
+COLUNAS_CATEGORICAS = ['rack', 'ramo', 'perna', 'conformidade']
+
+def chave_conteudo(fontes, parametros: dict, tamanho_bloco: int = 1 << 20):
+    """
+    Calcula a chave do cache a partir do conteúdo dos arquivos de entrada e dos parâmetros informados.
+
+    Args:
+        fontes (iterable): Caminhos ou arquivos abertos em modo binário (lidos em blocos e rebobinados).
+        parametros (dict): Parâmetros serializáveis em JSON dos quais o resultado depende (ex.: os de
+            parametros_pre_processamento); passar o config completo faz qualquer alteração invalidar a chave.
+        tamanho_bloco (int): Tamanho dos blocos de leitura, em bytes.
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal.
+    """
+    resumo = hashlib.sha256(f'versao={VERSAO_CACHE}'.encode())
+    for fonte in fontes:
+        arquivo = open(fonte, 'rb') if isinstance(fonte, (str, os.PathLike)) else fonte
+        try:
+            if hasattr(arquivo, 'seek'):
+                arquivo.seek(0)
+            for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+                resumo.update(bloco)
+        finally:
+            if arquivo is fonte:
+                arquivo.seek(0)
+            else:
+                arquivo.close()
+    resumo.update(json.dumps(parametros, sort_keys=True).encode())
+    return resumo.hexdigest()
+
+def salvar_colunas(df: pd.DataFrame, pasta: str):
+    """
+    Salva o DataFrame como uma pasta com um arquivo .npy por coluna e um metadados.json.
+
+    Colunas de COLUNAS_CATEGORICAS são guardadas como códigos int16 e categorias; colunas de ponto
+    flutuante, em float64; demais textos, como strings de largura fixa. A
+    pasta é escrita em um diretório temporário e renomeada ao final, de modo que leitores nunca veem
+    um cache incompleto. Se outro processo gravar a mesma pasta antes (mesma chave), a entrada
+    existente é mantida e a cópia temporária é descartada.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(pasta)), exist_ok=True)
+    temporaria = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(pasta)))
+    metadados = {'versao': VERSAO_CACHE, 'colunas': []}
+    try:
+        for k, coluna in enumerate(df.columns):
+            serie = df[coluna]
+            descricao = {'nome': coluna, 'arquivo': f'{k}.npy'}
+            if coluna in COLUNAS_CATEGORICAS:
+                codigos, categorias = pd.factorize(serie)
+                valores = codigos.astype(np.int16)
+                descricao['categorias'] = [str(categoria) for categoria in categorias]
+            elif pd.api.types.is_float_dtype(serie):
+                valores = serie.to_numpy(np.float64)
+            elif pd.api.types.is_integer_dtype(serie):
+                valores = serie.to_numpy()
+            else:
+                valores = serie.astype(str).to_numpy().astype(str)
+            np.save(os.path.join(temporaria, descricao['arquivo']), valores)
+            metadados['colunas'].append(descricao)
+        with open(os.path.join(temporaria, 'metadados.json'), 'w', encoding='utf-8') as file:
+            json.dump(metadados, file, ensure_ascii=False)
+        try:
+            os.replace(temporaria, pasta)
+        except OSError:
+            # Renomear sobre uma pasta não vazia falha: outro processo concluiu a mesma entrada antes
+            if not os.path.isfile(os.path.join(pasta, 'metadados.json')):
+                raise
+            shutil.rmtree(temporaria, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(temporaria, ignore_errors=True)
+        raise
+
+def carregar_colunas(pasta: str):
+    """
+    Carrega um DataFrame salvo por salvar_colunas, com as colunas numéricas mapeadas em memória.
+
+    A compactação é restrita ao armazenamento: as colunas de COLUNAS_CATEGORICAS são decodificadas
+    para texto, de modo que o DataFrame tem os mesmos tipos que o de process_data.
+
+    Returns:
+        pd.DataFrame: DataFrame pré-processado.
+    """
+    with open(os.path.join(pasta, 'metadados.json'), 'r', encoding='utf-8') as file:
+        metadados = json.load(file)
+    colunas = {}
+    for descricao in metadados['colunas']:
+        valores = np.load(os.path.join(pasta, descricao['arquivo']), mmap_mode='r')
+        if 'categorias' in descricao:
+            colunas[descricao['nome']] = np.asarray(descricao['categorias'])[valores]
+        else:
+            colunas[descricao['nome']] = valores
+    return pd.DataFrame(colunas, copy=False)
@@ -1,5 +1,6 @@
 #%%
 import json
+import logging
 from otimizador import OtimizadorBancoCapacitores
 from pre_processamento import PreProcessamentoBancoCapacitores
 # %%
@@ -19,12 +20,8 @@ preprocessador = PreProcessamentoBancoCapacitores(
     config=config
 )
 # %%
-# Carrega os dados brutos
-preprocessador.load_data()
-
-# %%
-# Processa os dados
-preprocessador.process_data()
+# Carrega os dados pré-processados do cache em disco ou processa os dados brutos
+preprocessador.load_or_process()
 # %%
 # Acessa o DataFrame pré-processado
 df_preprocessado = preprocessador.df
@@ -34,8 +31,9 @@ df_preprocessado.info()
 # %%
 df_preprocessado.sample(3)
 # %%
-# Otimização do banco de capacitores
-otimizador = OtimizadorBancoCapacitores(df_preprocessado, config, rack_to_optimize='R1', max_permutacoes=10)
+# Otimização do banco de capacitores, relatando cada permutação no log
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+otimizador = OtimizadorBancoCapacitores(df_preprocessado, config, rack_to_optimize='R1', max_permutacoes=10, verbosidade=2)
 resultados = otimizador.get_results()
 
 # Acessando os resultados
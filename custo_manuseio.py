@@ -0,0 +1,352 @@
+import numpy as np
+import pandas as pd
+
+# Planos com até este número de grupos de permutações são ordenados de forma exata (Held-Karp)
+MAX_GRUPOS_ORDEM_EXATA = 10
+
+class CustoManuseio:
+    def __init__(self, coordenadas: dict, custo_por_metro: float = 1.0, custo_por_troca: float = 10.0, origem=None):
+        """
+        Modelo de custo de manuseio das permutações pela ponte rolante, baseado na geometria das posições.
+
+        Uma permutação entre as posições a e b começa e termina na mesma posição (a ou b): a ponte retira
+        uma unidade, leva-a até a outra posição, traz a outra unidade de volta e a instala. Seu custo é
+        custo_por_troca + 2 * custo_por_metro * d(a, b). Entre permutações consecutivas, a ponte se
+        desloca vazia do ponto de término de uma até o ponto de início da seguinte, o que depende da
+        ordem de execução.
+
+        Args:
+            coordenadas (dict): Coordenadas (x, y) em metros de cada posição.
+            custo_por_metro (float): Custo de deslocamento da ponte por metro.
+            custo_por_troca (float): Custo fixo de cada permutação (retirada e instalação das duas unidades).
+            origem (tuple): Coordenadas (x, y) do ponto de partida da ponte; a rota começa na primeira
+                permutação se None.
+        """
+        self.posicoes = pd.Index(list(coordenadas))
+        self.coordenadas = np.array([coordenadas[posicao] for posicao in self.posicoes], dtype=float).reshape(-1, 2)
+        self.custo_por_metro = custo_por_metro
+        self.custo_por_troca = custo_por_troca
+        self.origem = None if origem is None else np.asarray(origem, dtype=float)
+
+    @classmethod
+    def from_config(cls, config: dict, posicoes):
+        """
+        Cria o modelo a partir de config['geometria'] (opcional).
+
+        As coordenadas vêm de geometria['coordenadas'] ({posicao: [x, y]}) ou, se ausente, de uma grade com
+        as posições em ordem crescente preenchendo geometria['colunas'] colunas (todas em uma linha por
+        padrão) espaçadas de espacamento_x_m e espacamento_y_m (1 m por padrão).
+
+        Args:
+            config (dict): Dicionário de configuração.
+            posicoes (array-like): Posições do banco.
+        """
+        geometria = config.get('geometria', {})
+        posicoes = np.sort(np.asarray(posicoes))
+        if 'coordenadas' in geometria:
+            # Chaves JSON são strings; as posições do DataFrame podem ser inteiras
+            coordenadas = {posicao: geometria['coordenadas'][str(posicao)] for posicao in posicoes}
+        else:
+            colunas = geometria.get('colunas', len(posicoes))
+            k = np.arange(len(posicoes))
+            x = (k % colunas) * geometria.get('espacamento_x_m', 1.0)
+            y = (k // colunas) * geometria.get('espacamento_y_m', 1.0)
+            coordenadas = dict(zip(posicoes, zip(x, y)))
+        return cls(
+            coordenadas, geometria.get('custo_por_metro', 1.0), geometria.get('custo_por_troca', 10.0),
+            geometria.get('origem_m')
+        )
+
+    def coordenadas_posicoes(self, posicoes):
+        """Coordenadas das posições, formato (..., 2)."""
+        posicoes = np.asarray(posicoes)
+        indices = self.posicoes.get_indexer(posicoes.ravel())
+        if np.any(indices < 0):
+            raise ValueError(f"Posições sem geometria: {sorted(set(posicoes.ravel()[indices < 0].tolist()))}")
+        return self.coordenadas[indices].reshape(posicoes.shape + (2,))
+
+    def custo_troca(self, posicoes_a, posicoes_b):
+        """Custo de cada permutação, sem o deslocamento até ela (vetorizado)."""
+        distancia = _distancia(self.coordenadas_posicoes(posicoes_a), self.coordenadas_posicoes(posicoes_b))
+        return self.custo_por_troca + 2 * self.custo_por_metro * distancia
+
+    def custo_insercao(self, pontos, posicoes_a, posicoes_b):
+        """
+        Menor custo de acrescentar cada permutação candidata a uma rota, inserindo-a na melhor posição da
+        rota e executando-a a partir da melhor das duas posições (inserção mais barata, vetorizada).
+
+        Args:
+            pontos (list): Posições em que as permutações da rota são executadas, na ordem de execução.
+            posicoes_a (array-like): Primeira posição de cada candidata.
+            posicoes_b (array-like): Segunda posição de cada candidata, com formato compatível por broadcast.
+
+        Returns:
+            tuple: Arrays (custo adicional, 0 ou 1 indicando se a execução começa em a ou em b, índice da rota
+                em que a permutação deve ser inserida).
+        """
+        posicoes_a, posicoes_b = np.broadcast_arrays(np.asarray(posicoes_a), np.asarray(posicoes_b))
+        rota = self.coordenadas_posicoes(list(pontos)).reshape(-1, 2)
+        # Pontos antes e depois de cada ponto de inserção k (antes de rota[k]); ausentes têm peso 0
+        anteriores = np.vstack([self.origem if self.origem is not None else np.zeros(2), rota])
+        tem_anterior = np.r_[self.origem is not None, np.ones(len(rota), dtype=bool)]
+        posteriores = np.vstack([rota, np.zeros(2)])
+        tem_posterior = np.r_[np.ones(len(rota), dtype=bool), False]
+        removido = np.where(tem_anterior & tem_posterior, _distancia(anteriores, posteriores), 0)
+
+        extremidades = np.stack([self.coordenadas_posicoes(posicoes_a), self.coordenadas_posicoes(posicoes_b)], axis=-2)
+        extremidades = extremidades[..., None, :]  # (..., 2 extremidades, 1, 2)
+        adicionado = (
+            tem_anterior * _distancia(extremidades, anteriores) + tem_posterior * _distancia(extremidades, posteriores)
+            - removido
+        )
+        adicionado = adicionado.reshape(adicionado.shape[:-2] + (-1,))
+        melhor = np.argmin(adicionado, axis=-1)
+        deslocamento = np.take_along_axis(adicionado, melhor[..., None], axis=-1)[..., 0]
+        custo = self.custo_troca(posicoes_a, posicoes_b) + self.custo_por_metro * deslocamento
+        return custo, melhor // (len(rota) + 1), melhor % (len(rota) + 1)
+
+    def ordenar(self, trocas):
+        """
+        Ordem de execução de um plano que minimiza o deslocamento da ponte rolante.
+
+        Permutações que compartilham posições não comutam: são agrupadas e executadas em sequência, na
+        ordem original. Com até MAX_GRUPOS_ORDEM_EXATA grupos, a ordem e a posição de início de cada grupo
+        (a ou b da primeira permutação) são ótimas (programação dinâmica de Held-Karp). Acima disso, a
+        ordem é construída pelo vizinho mais próximo e melhorada com 2-opt e realocações, e as posições
+        de início são escolhidas por programação dinâmica sobre a ordem.
+
+        Args:
+            trocas (list): Pares (posicao_a, posicao_b) na ordem do plano.
+
+        Returns:
+            tuple: (índices das permutações na ordem de execução, posição em que cada uma é executada,
+                deslocamento total da ponte em metros, custo total).
+        """
+        trocas = [tuple(troca) for troca in trocas]
+        if not trocas:
+            return [], [], 0.0, 0.0
+        opcoes = [self._opcoes_grupo(trocas, grupo) for grupo in _grupos_dependentes(trocas)]
+        entradas = np.array([[opcao[0] for opcao in grupo] for grupo in opcoes])  # (grupos, 2, 2)
+        saidas = np.array([[opcao[1] for opcao in grupo] for grupo in opcoes])
+        internos = np.array([[opcao[2] for opcao in grupo] for grupo in opcoes])
+
+        if len(opcoes) <= MAX_GRUPOS_ORDEM_EXATA:
+            ordem, escolhas, deslocamento = self._ordem_exata(entradas, saidas, internos)
+        else:
+            ordem, escolhas, deslocamento = self._ordem_heuristica(entradas, saidas, internos)
+
+        indices, pontos = [], []
+        for grupo, escolha in zip(ordem, escolhas):
+            indices += opcoes[grupo][escolha][3]
+            pontos += opcoes[grupo][escolha][4]
+        posicoes_a, posicoes_b = zip(*trocas)
+        custo = self.custo_troca(list(posicoes_a), list(posicoes_b)).sum() + self.custo_por_metro * deslocamento
+        return indices, pontos, float(deslocamento), float(custo)
+
+    def _ordem_exata(self, entradas, saidas, internos):
+        """
+        Ordem e opções ótimas por Held-Karp: custo[conjunto, grupo, opção] é o menor deslocamento que
+        executa os grupos do conjunto terminando no grupo com a opção dada.
+
+        Returns:
+            tuple: (ordem dos grupos, opção de cada grupo na ordem, deslocamento).
+        """
+        n = len(entradas)
+        # distancias[h, o_h, g, o_g]: da saída de h (opção o_h) à entrada de g (opção o_g)
+        distancias = _distancia(saidas[:, :, None, None, :], entradas[None, None, :, :, :]).reshape(2 * n, n, 2)
+        custo = np.full((1 << n, n, 2), np.inf)
+        anterior = np.zeros((1 << n, n, 2), dtype=int)
+        grupos = np.arange(n)
+        custo[1 << grupos, grupos] = internos
+        if self.origem is not None:
+            custo[1 << grupos, grupos] += _distancia(self.origem, entradas)
+        for conjunto in range(1, 1 << n):
+            fora = grupos[(conjunto >> grupos) & 1 == 0]
+            if len(fora) == 0:
+                continue
+            totais = custo[conjunto].reshape(2 * n, 1, 1) + distancias[:, fora]
+            melhores = np.argmin(totais, axis=0)
+            valores = np.take_along_axis(totais, melhores[None], axis=0)[0] + internos[fora]
+            novos = conjunto | (1 << fora)
+            melhora = valores < custo[novos, fora]
+            custo[novos, fora] = np.where(melhora, valores, custo[novos, fora])
+            anterior[novos, fora] = np.where(melhora, melhores, anterior[novos, fora])
+
+        conjunto = (1 << n) - 1
+        grupo, escolha = np.unravel_index(np.argmin(custo[conjunto]), (n, 2))
+        deslocamento = float(custo[conjunto, grupo, escolha])
+        ordem, escolhas = [], []
+        while True:
+            ordem.append(int(grupo))
+            escolhas.append(int(escolha))
+            if conjunto == 1 << grupo:
+                break
+            grupo, escolha, conjunto = *divmod(anterior[conjunto, grupo, escolha], 2), conjunto & ~(1 << grupo)
+        return np.array(ordem[::-1]), np.array(escolhas[::-1]), deslocamento
+
+    def _ordem_heuristica(self, entradas, saidas, internos):
+        """Vizinho mais próximo seguido de 2-opt e realocações, reescolhendo as opções a cada melhoria."""
+        ordem = self._vizinho_mais_proximo(entradas, saidas, internos)
+        while True:
+            escolhas, deslocamento = self._melhores_opcoes(ordem, entradas, saidas, internos)
+            ganho, i, j = self._melhor_2opt(entradas[ordem, escolhas], saidas[ordem, escolhas])
+            if ganho < -1e-9:
+                ordem[i:j + 1] = ordem[i:j + 1][::-1]
+                continue
+            ganho, nova_ordem = self._melhor_realocacao(entradas[ordem, escolhas], saidas[ordem, escolhas])
+            if ganho >= -1e-9:
+                break
+            ordem = ordem[nova_ordem]
+        return ordem, escolhas, deslocamento
+
+    def _opcoes_grupo(self, trocas, grupo):
+        """
+        Duas formas de executar um grupo de permutações dependentes: começando em cada posição da primeira.
+        Nas seguintes, a ponte começa na posição mais próxima de onde terminou a anterior.
+
+        Returns:
+            list: Para cada opção, (entrada, saída, deslocamento interno, índices, pontos de execução).
+        """
+        opcoes = []
+        for inicio in trocas[grupo[0]]:
+            pontos = [inicio]
+            deslocamento = 0.0
+            for k in grupo[1:]:
+                atual = self.coordenadas_posicoes(pontos[-1])
+                distancias = _distancia(atual, self.coordenadas_posicoes(list(trocas[k])))
+                pontos.append(trocas[k][int(np.argmin(distancias))])
+                deslocamento += float(distancias.min())
+            opcoes.append((
+                self.coordenadas_posicoes(pontos[0]), self.coordenadas_posicoes(pontos[-1]), deslocamento,
+                list(grupo), pontos
+            ))
+        return opcoes
+
+    def _vizinho_mais_proximo(self, entradas, saidas, internos):
+        """Ordem dos grupos pelo vizinho mais próximo, partindo da origem ou do melhor grupo inicial."""
+        n = len(entradas)
+        inicios = [None] if self.origem is not None else range(n)
+        melhor_ordem, melhor_custo = None, np.inf
+        for inicio in inicios:
+            restantes = np.ones(n, dtype=bool)
+            ordem, custo = [], 0.0
+            atual = self.origem
+            if inicio is not None:
+                escolha = int(np.argmin(internos[inicio]))
+                ordem.append(inicio)
+                restantes[inicio] = False
+                custo += internos[inicio, escolha]
+                atual = saidas[inicio, escolha]
+            while restantes.any():
+                candidatos = np.flatnonzero(restantes)
+                custos = _distancia(atual, entradas[candidatos]) + internos[candidatos]
+                k, escolha = np.unravel_index(np.argmin(custos), custos.shape)
+                grupo = candidatos[k]
+                ordem.append(grupo)
+                restantes[grupo] = False
+                custo += custos[k, escolha]
+                atual = saidas[grupo, escolha]
+            if custo < melhor_custo:
+                melhor_ordem, melhor_custo = ordem, custo
+        return np.array(melhor_ordem)
+
+    def _melhores_opcoes(self, ordem, entradas, saidas, internos):
+        """Escolha da opção de cada grupo que minimiza o deslocamento na ordem dada (programação dinâmica)."""
+        custo = internos[ordem[0]].copy()
+        if self.origem is not None:
+            custo += _distancia(self.origem, entradas[ordem[0]])
+        anteriores = []
+        for anterior, grupo in zip(ordem[:-1], ordem[1:]):
+            # transicao[o_anterior, o] = custo até o anterior + deslocamento até a entrada do grupo
+            transicao = custo[:, None] + _distancia(saidas[anterior][:, None], entradas[grupo][None, :])
+            anteriores.append(np.argmin(transicao, axis=0))
+            custo = transicao.min(axis=0) + internos[grupo]
+        escolhas = [int(np.argmin(custo))]
+        for anterior in reversed(anteriores):
+            escolhas.append(int(anterior[escolhas[-1]]))
+        return np.array(escolhas[::-1]), float(custo.min())
+
+    def _melhor_2opt(self, entradas, saidas):
+        """
+        Melhor inversão de um trecho [i, j] da ordem (2-opt), com as opções fixas.
+
+        Invertido o trecho, as arestas internas passam a ir da saída de k+1 à entrada de k; a variação do
+        deslocamento é calculada para todos os pares (i, j) de uma vez com somas acumuladas.
+        """
+        n = len(entradas)
+        if n < 2:
+            return 0.0, 0, 0
+        diretas = np.r_[0, np.cumsum(_distancia(saidas[:-1], entradas[1:]))]
+        inversas = np.r_[0, np.cumsum(_distancia(saidas[1:], entradas[:-1]))]
+        i, j = np.triu_indices(n, k=1)
+        variacao = (inversas[j] - inversas[i]) - (diretas[j] - diretas[i])
+
+        # Aresta de entrada do trecho (da saída anterior, ou da origem, à entrada de i, que passa a ser j)
+        if self.origem is not None:
+            anteriores = np.vstack([self.origem, saidas[:-1]])
+            tem_anterior = np.ones(n, dtype=bool)
+        else:
+            anteriores = np.vstack([np.zeros(2), saidas[:-1]])
+            tem_anterior = np.arange(n) > 0
+        variacao += tem_anterior[i] * (
+            _distancia(anteriores[i], entradas[j]) - _distancia(anteriores[i], entradas[i])
+        )
+        # Aresta de saída do trecho (da saída de j, que passa a ser i, à entrada de j+1)
+        tem_posterior = j < n - 1
+        posteriores = entradas[np.minimum(j + 1, n - 1)]
+        variacao += tem_posterior * (_distancia(saidas[i], posteriores) - _distancia(saidas[j], posteriores))
+
+        melhor = int(np.argmin(variacao))
+        return float(variacao[melhor]), int(i[melhor]), int(j[melhor])
+
+    def _melhor_realocacao(self, entradas, saidas):
+        """
+        Melhor movimento de um único elemento da ordem para outra posição (or-opt), com as opções fixas.
+
+        Returns:
+            tuple: (variação do deslocamento, nova ordem como permutação dos índices atuais).
+        """
+        n = len(entradas)
+        if n < 3:
+            return 0.0, np.arange(n)
+        # Ordem candidata de cada par (k, p): o elemento k é retirado e reinserido na posição p
+        k, p = np.divmod(np.arange(n * n), n)
+        k, p, t = k[:, None], p[:, None], np.arange(n)[None, :]
+        ordens = np.where(
+            t == p, k,
+            np.where(p >= k, np.where((t >= k) & (t < p), t + 1, t), np.where((t > p) & (t <= k), t - 1, t))
+        )
+        distancias = _distancia(saidas[:, None], entradas[None, :])
+        deslocamentos = distancias[ordens[:, :-1], ordens[:, 1:]].sum(axis=1)
+        if self.origem is not None:
+            deslocamentos += _distancia(self.origem, entradas[ordens[:, 0]])
+        atual = distancias[np.arange(n - 1), np.arange(1, n)].sum()
+        if self.origem is not None:
+            atual += _distancia(self.origem, entradas[0])
+        melhor = int(np.argmin(deslocamentos))
+        return float(deslocamentos[melhor] - atual), ordens[melhor]
+
+def _distancia(a, b):
+    """Distância euclidiana entre coordenadas (..., 2), com broadcast."""
+    return np.sqrt(np.sum((np.asarray(a) - np.asarray(b)) ** 2, axis=-1))
+
+def _grupos_dependentes(trocas):
+    """Agrupa as permutações que compartilham posições (direta ou indiretamente), mantendo a ordem do plano."""
+    grupo_da_posicao = {}
+    grupos = []
+    for k, (a, b) in enumerate(trocas):
+        existentes = {grupo_da_posicao[p] for p in (a, b) if p in grupo_da_posicao}
+        if existentes:
+            destino = min(existentes)
+            for outro in existentes - {destino}:
+                grupos[destino] += grupos[outro]
+                grupos[outro] = []
+            for posicao, grupo in grupo_da_posicao.items():
+                if grupo in existentes:
+                    grupo_da_posicao[posicao] = destino
+        else:
+            destino = len(grupos)
+            grupos.append([])
+        grupos[destino].append(k)
+        grupo_da_posicao[a] = grupo_da_posicao[b] = destino
+    return [sorted(grupo) for grupo in grupos if grupo]
@@ -0,0 +1,314 @@
+import argparse
+import copy
+import csv
+import json
+import os
+import numpy as np
+import pandas as pd
+from pre_processamento import COEF_TEMPERATURA_PADRAO
+from topologia import TOPOLOGIA_PADRAO, TopologiaBanco
+
+DISTRIBUICOES = ('normal', 'uniforme', 'lognormal')
+
+# Byte de preenchimento das matrizes de texto, removido antes da escrita (permite campos de largura variável)
+_VAZIO = 0
+
+class GeradorBancos:
+    def __init__(self, config: dict, topologia: dict = None, unidades_por_ramo=16, distribuicao: str = 'normal',
+                 capacitancia_media_uF: float = 24.77, desvio_capacitancia_uF: float = 0.12,
+                 deriva_media_pct: float = -0.3, deriva_desvio_pct: float = 0.45, fracao_falhas: float = 0.0,
+                 variacao_falha_pct: float = -8.0, temperatura_media_C: float = 31.0,
+                 dispersao_temperatura_C: float = 2.5, num_leituras: int = 3, colunas_leitura: int = 5,
+                 ruido_leitura_uF: float = 0.045, inicio: str = '2020-12-22T08:00:00', intervalo_s: int = 54,
+                 vies_pernas_pct: dict = None, semente=None):
+        """
+        Gerador vetorizado de bancos sintéticos no formato dos arquivos de campo.
+
+        Cada unidade recebe uma capacitância de fábrica sorteada da distribuição escolhida, uma deriva
+        em campo, uma falha eventual (variação fixa da capacitância, que tipicamente a torna não
+        conforme) e uma temperatura no momento da medição. As leituras do medidor são a capacitância
+        de campo corrigida para essa temperatura com o coeficiente de config['constants'], mais ruído.
+        Os valores padrão reproduzem a campanha da fase A em data/.
+
+        Args:
+            config (dict): Dicionário de configuração (constantes e, se topologia for None, a topologia).
+            topologia (dict): Racks, pernas e pares_desbalanco no formato de config['topologia'].
+            unidades_por_ramo (int or dict): Unidades em série por ramo, iguais para todos ou por ramo.
+            distribuicao (str): Distribuição da capacitância de fábrica, uma de DISTRIBUICOES, com a
+                média e o desvio padrão dados.
+            deriva_media_pct, deriva_desvio_pct (float): Deriva normal da capacitância em campo (%).
+            fracao_falhas (float): Fração das unidades com falha.
+            variacao_falha_pct (float): Variação da capacitância das unidades com falha (%).
+            temperatura_media_C, dispersao_temperatura_C (float): Temperatura das unidades na medição
+                (normal, arredondada para graus inteiros como no medidor).
+            num_leituras (int): Leituras por unidade, nas primeiras colunas '(uF)'.
+            colunas_leitura (int): Colunas '(uF)' do arquivo; as excedentes são preenchidas com zeros.
+            ruido_leitura_uF (float): Desvio padrão do ruído de cada leitura.
+            inicio (str): Data e hora da primeira medição de cada banco.
+            intervalo_s (int): Intervalo entre medições consecutivas.
+            vies_pernas_pct (dict): Variação sistemática da capacitância das unidades de cada perna (%),
+                ex.: {'P1': 0.5}, para gerar bancos desbalanceados; as pernas ausentes não variam.
+            semente (int): Semente do gerador aleatório.
+        """
+        if distribuicao not in DISTRIBUICOES:
+            raise ValueError(f"Distribuição desconhecida: {distribuicao}. Use uma de {DISTRIBUICOES}.")
+        if not 1 <= num_leituras <= colunas_leitura:
+            raise ValueError("num_leituras deve estar entre 1 e colunas_leitura.")
+        self.config = copy.deepcopy(config)
+        self.config['topologia'] = copy.deepcopy(topologia or config.get('topologia', TOPOLOGIA_PADRAO))
+        self.topologia = TopologiaBanco.from_config(self.config)
+        if isinstance(unidades_por_ramo, dict):
+            self.unidades_por_ramo = np.array([unidades_por_ramo[ramo] for ramo in self.topologia.ramos])
+        else:
+            self.unidades_por_ramo = np.full(len(self.topologia.ramos), unidades_por_ramo)
+        self.distribuicao = distribuicao
+        self.capacitancia_media_uF = capacitancia_media_uF
+        self.desvio_capacitancia_uF = desvio_capacitancia_uF
+        self.deriva_media_pct = deriva_media_pct
+        self.deriva_desvio_pct = deriva_desvio_pct
+        self.fracao_falhas = fracao_falhas
+        self.variacao_falha_pct = variacao_falha_pct
+        self.temperatura_media_C = temperatura_media_C
+        self.dispersao_temperatura_C = dispersao_temperatura_C
+        self.num_leituras = num_leituras
+        self.colunas_leitura = colunas_leitura
+        self.ruido_leitura_uF = ruido_leitura_uF
+        self.inicio = np.datetime64(inicio, 's')
+        self.intervalo_s = intervalo_s
+        self.vies_pernas_pct = np.array([(vies_pernas_pct or {}).get(perna, 0.0) for perna in self.topologia.pernas])
+        self.rng = np.random.default_rng(semente)
+
+    @property
+    def unidades_por_banco(self):
+        return int(self.unidades_por_ramo.sum())
+
+    def sortear(self, n_bancos: int = 1):
+        """
+        Sorteia as unidades de n_bancos bancos, em ordem de banco e posição.
+
+        Returns:
+            pd.DataFrame: Colunas banco, rack, ramo, posicao, num_serie, capacitancia_fabrica_uF,
+                capacitancia_real_uF (na temperatura de referência), falha, temperatura_capacitor_C,
+                date_time e leitura_1..leitura_<colunas_leitura> (zeros além de num_leituras).
+        """
+        n = self.unidades_por_banco
+        total = n_bancos * n
+        constantes = self.config['constants']
+
+        indice_ramo = np.repeat(np.arange(len(self.topologia.ramos)), self.unidades_por_ramo)
+        indice_rack = self.topologia.indice_rack_perna[self.topologia.indice_perna_ramo[indice_ramo]]
+
+        media, desvio = self.capacitancia_media_uF, self.desvio_capacitancia_uF
+        if self.distribuicao == 'normal':
+            fabrica = self.rng.normal(media, desvio, total)
+        elif self.distribuicao == 'uniforme':
+            meia_largura = desvio * np.sqrt(3)
+            fabrica = self.rng.uniform(media - meia_largura, media + meia_largura, total)
+        else:
+            sigma2 = np.log1p((desvio / media) ** 2)
+            fabrica = self.rng.lognormal(np.log(media) - sigma2 / 2, np.sqrt(sigma2), total)
+        fabrica = np.round(fabrica, 2)
+
+        real = fabrica * (1 + self.rng.normal(self.deriva_media_pct, self.deriva_desvio_pct, total) / 100)
+        falha = self.rng.random(total) < self.fracao_falhas
+        real[falha] *= 1 + self.variacao_falha_pct / 100
+        real *= 1 + np.tile(self.vies_pernas_pct[self.topologia.indice_perna_ramo[indice_ramo]], n_bancos) / 100
+
+        temperatura = np.rint(
+            self.rng.normal(self.temperatura_media_C, self.dispersao_temperatura_C, total)
+        ).astype(np.int64)
+        alpha = constantes.get('coef_temperatura', COEF_TEMPERATURA_PADRAO)
+        medida = real * (1 + alpha * (temperatura - constantes['temp_ref_C']))
+        leituras = np.zeros((total, self.colunas_leitura))
+        leituras[:, :self.num_leituras] = np.maximum(np.round(
+            medida[:, None] + self.rng.normal(0, self.ruido_leitura_uF, (total, self.num_leituras)), 2
+        ), 0.01)
+
+        # Números de série: permutação aleatória por banco, sem relação com a posição
+        num_serie = np.argsort(self.rng.random((n_bancos, n)), axis=1).ravel() + 1
+        posicao = np.tile(np.arange(1, n + 1), n_bancos)
+
+        unidades = pd.DataFrame({
+            'banco': np.repeat(np.arange(1, n_bancos + 1), n),
+            'rack': pd.Categorical.from_codes(np.tile(indice_rack, n_bancos), self.topologia.racks),
+            'ramo': pd.Categorical.from_codes(np.tile(indice_ramo, n_bancos), self.topologia.ramos),
+            'posicao': posicao,
+            'num_serie': num_serie,
+            'capacitancia_fabrica_uF': fabrica,
+            'capacitancia_real_uF': real,
+            'falha': falha,
+            'temperatura_capacitor_C': temperatura,
+            'date_time': self.inicio + (posicao - 1) * np.timedelta64(self.intervalo_s, 's')
+        })
+        for k in range(self.colunas_leitura):
+            unidades[f'leitura_{k + 1}'] = leituras[:, k]
+        return unidades
+
+    def escrever(self, pasta: str, n_bancos: int = 1, prefixo: str = 'banco'):
+        """
+        Sorteia n_bancos bancos e grava, para cada um, o TXT do medidor e o CSV de série e posição.
+
+        Também grava em `pasta` o config.json (com a topologia gerada) e um manifest.csv no formato de
+        processamento_lote.ler_manifesto. O texto de todos os bancos é montado de uma vez como matriz de
+        bytes, de modo que o custo por banco se resume à escrita dos arquivos.
+
+        Returns:
+            list: Entradas do manifesto (dict com banco, measures, positions e config, caminhos absolutos).
+        """
+        os.makedirs(pasta, exist_ok=True)
+        unidades = self.sortear(n_bancos)
+        medidas, fim_medidas = self._texto_medidas(unidades)
+        posicoes, fim_posicoes = self._texto_posicoes(unidades)
+        cabecalho_medidas = '\t'.join(
+            ['Serial', 'Date Time', 'ref(uF)'] + ['(uF)'] * self.colunas_leitura + ['(C)']
+        ).encode() + b'\n'
+        cabecalho_posicoes = b'rack,ramo,posicao,num_serie,capacitancia_fabrica_uF\n'
+
+        caminho_config = os.path.join(pasta, 'config.json')
+        with open(caminho_config, 'w', encoding='utf-8') as file:
+            json.dump(self.config, file, indent=4, ensure_ascii=False)
+
+        entradas = []
+        n = self.unidades_por_banco
+        largura = len(str(n_bancos))
+        for k in range(n_bancos):
+            banco = f'{prefixo}_{k + 1:0{largura}d}'
+            caminho_medidas = os.path.join(pasta, f'{banco}_medidas.txt')
+            caminho_posicoes = os.path.join(pasta, f'{banco}_posicoes.csv')
+            for caminho, cabecalho, texto, fim in (
+                (caminho_medidas, cabecalho_medidas, medidas, fim_medidas),
+                (caminho_posicoes, cabecalho_posicoes, posicoes, fim_posicoes)
+            ):
+                inicio = fim[k * n - 1] if k else 0
+                with open(caminho, 'wb') as file:
+                    file.write(cabecalho)
+                    file.write(texto[inicio:fim[(k + 1) * n - 1]])
+            entradas.append({
+                'banco': banco,
+                'measures': os.path.abspath(caminho_medidas),
+                'positions': os.path.abspath(caminho_posicoes),
+                'config': os.path.abspath(caminho_config)
+            })
+
+        with open(os.path.join(pasta, 'manifest.csv'), 'w', newline='', encoding='utf-8') as file:
+            escritor = csv.DictWriter(file, fieldnames=['banco', 'measures', 'positions', 'config'])
+            escritor.writeheader()
+            for entrada in entradas:
+                escritor.writerow({
+                    chave: os.path.basename(valor) if chave != 'banco' else valor for chave, valor in entrada.items()
+                })
+        return entradas
+
+    def _texto_medidas(self, unidades):
+        """Linhas do TXT do medidor (tabulação, vírgula decimal), como em data/MEDIDA_CAPACITANCIA_FASE_A.txt."""
+        n = len(unidades)
+        leituras = unidades[[f'leitura_{k + 1}' for k in range(self.colunas_leitura)]].to_numpy()
+        campos = [
+            np.full((n, 10), ord(' '), dtype=np.uint8),  # Serial em branco, como exportado pelo medidor
+            _data_hora_ascii(unidades['date_time'].to_numpy()),
+            _decimal_ascii(np.zeros(n), ','),
+            *[_decimal_ascii(leituras[:, k], ',') for k in range(self.colunas_leitura)],
+            _inteiro_ascii(unidades['temperatura_capacitor_C'].to_numpy(), sinal=True)
+        ]
+        return _linhas_ascii(campos, '\t')
+
+    def _texto_posicoes(self, unidades):
+        """Linhas do CSV de série e posição, como em data/ramo_serie_posicao_fase_A.csv."""
+        campos = [
+            _rotulos_ascii(unidades['rack'].cat.codes.to_numpy(), self.topologia.racks),
+            _rotulos_ascii(unidades['ramo'].cat.codes.to_numpy(), self.topologia.ramos),
+            _inteiro_ascii(unidades['posicao'].to_numpy()),
+            _inteiro_ascii(unidades['num_serie'].to_numpy()),
+            _decimal_ascii(unidades['capacitancia_fabrica_uF'].to_numpy(), '.')
+        ]
+        return _linhas_ascii(campos, ',')
+
+def _digitos_ascii(valores, largura):
+    """Dígitos decimais de inteiros não negativos, com zeros à esquerda até `largura` colunas."""
+    potencias = 10 ** np.arange(largura - 1, -1, -1, dtype=np.int64)
+    return ((valores[:, None] // potencias) % 10 + ord('0')).astype(np.uint8)
+
+def _inteiro_ascii(valores, sinal: bool = False):
+    """Inteiros em texto, sem zeros à esquerda (preenchidos com _VAZIO); com sinal explícito se `sinal`."""
+    valores = np.asarray(valores, dtype=np.int64)
+    absolutos = np.abs(valores)
+    largura = len(str(int(absolutos.max()))) if len(valores) else 1
+    texto = _digitos_ascii(absolutos, largura)
+    potencias = 10 ** np.arange(largura - 1, -1, -1, dtype=np.int64)
+    texto[(absolutos[:, None] < potencias) & (potencias > 1)] = _VAZIO
+    if not sinal:
+        return texto
+    sinais = np.where(valores < 0, ord('-'), ord('+')).astype(np.uint8)
+    return np.concatenate([sinais[:, None], texto], axis=1)
+
+def _decimal_ascii(valores, separador: str):
+    """Valores não negativos com duas casas decimais e o separador decimal dado."""
+    centesimos = np.rint(np.asarray(valores) * 100).astype(np.int64)
+    virgula = np.full((len(centesimos), 1), ord(separador), dtype=np.uint8)
+    return np.concatenate([_inteiro_ascii(centesimos // 100), virgula, _digitos_ascii(centesimos % 100, 2)], axis=1)
+
+def _rotulos_ascii(codigos, rotulos):
+    """Rótulos de texto a partir de códigos inteiros, preenchidos com _VAZIO até o maior rótulo."""
+    largura = max(len(rotulo) for rotulo in rotulos)
+    tabela = np.full((len(rotulos), largura), _VAZIO, dtype=np.uint8)
+    for k, rotulo in enumerate(rotulos):
+        tabela[k, :len(rotulo)] = np.frombuffer(rotulo.encode(), dtype=np.uint8)
+    return tabela[codigos]
+
+def _data_hora_ascii(datas):
+    """Datas no formato do medidor, 'dd/mm/aaaa hh:mm:ss'."""
+    datas = datas.astype('datetime64[s]')
+    dias = datas.astype('datetime64[D]')
+    meses = dias.astype('datetime64[M]')
+    anos = meses.astype('datetime64[Y]')
+    segundos = (datas - dias).astype(np.int64)
+    partes = [
+        (dias - meses).astype(np.int64) + 1, (meses - anos).astype(np.int64) + 1, anos.astype(np.int64) + 1970,
+        segundos // 3600, segundos // 60 % 60, segundos % 60
+    ]
+    larguras = [2, 2, 4, 2, 2, 2]
+    separadores = '// ::'
+    campos = []
+    for k, (parte, largura) in enumerate(zip(partes, larguras)):
+        campos.append(_digitos_ascii(parte, largura))
+        if k < len(separadores):
+            campos.append(np.full((len(datas), 1), ord(separadores[k]), dtype=np.uint8))
+    return np.concatenate(campos, axis=1)
+
+def _linhas_ascii(campos, separador: str):
+    """
+    Junta as matrizes de bytes dos campos em linhas separadas por `separador` e terminadas em '\\n'.
+
+    Returns:
+        tuple: Texto (bytes) de todas as linhas e o deslocamento do fim de cada linha no texto.
+    """
+    n = len(campos[0])
+    coluna_separador = np.full((n, 1), ord(separador), dtype=np.uint8)
+    partes = []
+    for campo in campos:
+        partes += [campo, coluna_separador]
+    partes[-1] = np.full((n, 1), ord('\n'), dtype=np.uint8)
+    matriz = np.concatenate(partes, axis=1)
+    validos = matriz != _VAZIO
+    return matriz[validos].tobytes(), np.cumsum(validos.sum(axis=1))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera bancos sintéticos no formato dos arquivos de campo.')
+    parser.add_argument('pasta', help='Pasta de saída (arquivos, config.json e manifest.csv).')
+    parser.add_argument('--config', default='data/config.json', help='Config base (constantes e topologia).')
+    parser.add_argument('--bancos', type=int, default=1)
+    parser.add_argument('--unidades-por-ramo', type=int, default=16)
+    parser.add_argument('--distribuicao', choices=DISTRIBUICOES, default='normal')
+    parser.add_argument('--fracao-falhas', type=float, default=0.0)
+    parser.add_argument('--dispersao-temperatura', type=float, default=2.5, help='Desvio padrão da temperatura (°C).')
+    parser.add_argument('--semente', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as file:
+        config = json.load(file)
+    gerador = GeradorBancos(
+        config, unidades_por_ramo=args.unidades_por_ramo, distribuicao=args.distribuicao,
+        fracao_falhas=args.fracao_falhas, dispersao_temperatura_C=args.dispersao_temperatura, semente=args.semente
+    )
+    entradas = gerador.escrever(args.pasta, args.bancos)
+    print(f"{len(entradas)} bancos com {gerador.unidades_por_banco} unidades gravados em {args.pasta}.")
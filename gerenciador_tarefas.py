@@ -0,0 +1,126 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from otimizador import OtimizadorBancoCapacitores
+
+# Estados de uma tarefa; as duas primeiras ainda podem produzir progresso
+STATUS_ATIVOS = ('na_fila', 'executando')
+
+class TarefaOtimizacao:
+    def __init__(self, chave):
+        """Estado de uma otimização submetida ao GerenciadorTarefas."""
+        self.id = uuid.uuid4().hex[:12]
+        self.chave = chave
+        self.status = 'na_fila'
+        self.progresso = []  # (permutacao, corrente de desbalanceamento) a cada estado salvo
+        self.resultados = None
+        self.erro = None
+        self.cancelamento = threading.Event()
+        self.lock = threading.Lock()
+
+    def registrar_progresso(self, permutacao, corrente):
+        with self.lock:
+            self.progresso.append((permutacao, float(corrente)))
+
+    def resumo(self):
+        """Cópia consistente do estado da tarefa, para ser lida por outra thread."""
+        with self.lock:
+            return {
+                'id': self.id,
+                'status': self.status,
+                'progresso': list(self.progresso),
+                'resultados': self.resultados,
+                'erro': self.erro
+            }
+
+class GerenciadorTarefas:
+    def __init__(self, max_workers: int = 2, max_concluidas: int = 16):
+        """
+        Executa otimizações em segundo plano (pool de threads), identificadas por um id.
+
+        O progresso de cada permutação é recebido pelo callback do otimizador e fica disponível em
+        estado(id) enquanto a tarefa executa; cancelar(id) interrompe a otimização no próximo ponto de
+        verificação (entre permutações ou durante a busca exata/metaheurística) e mantém as
+        permutações já aplicadas. Tarefas concluídas com a mesma chave são reaproveitadas; as mais
+        antigas além de max_concluidas são descartadas.
+
+        Args:
+            max_workers (int): Número de otimizações simultâneas.
+            max_concluidas (int): Número máximo de tarefas finalizadas mantidas em memória.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='otimizacao')
+        self.max_concluidas = max_concluidas
+        self.tarefas = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submeter(self, df, config, rack, max_permutacoes, estrategia='heuristica', chave=None, **kwargs):
+        """
+        Submete uma otimização e retorna o id da tarefa.
+
+        Args:
+            df (pd.DataFrame): DataFrame pré-processado.
+            config (dict): Dicionário de configuração.
+            rack (str): Rack a otimizar.
+            max_permutacoes (int): Número máximo de permutações.
+            estrategia (str): Estratégia do otimizador.
+            chave (hashable): Identifica os dados/parâmetros; se uma tarefa com a mesma chave terminou com
+                sucesso ou ainda está ativa, seu id é retornado sem nova execução.
+            **kwargs: Demais argumentos de OtimizadorBancoCapacitores (semente, limite_tempo_s, ...).
+
+        Returns:
+            str: Id da tarefa.
+        """
+        with self.lock:
+            if chave is not None:
+                for tarefa in self.tarefas.values():
+                    if tarefa.chave == chave and tarefa.status in STATUS_ATIVOS + ('concluida',):
+                        self.tarefas.move_to_end(tarefa.id)
+                        return tarefa.id
+            tarefa = TarefaOtimizacao(chave)
+            self.tarefas[tarefa.id] = tarefa
+            self._descartar_antigas()
+        self.executor.submit(self._executar, tarefa, df, config, rack, max_permutacoes, estrategia, kwargs)
+        return tarefa.id
+
+    def estado(self, tarefa_id):
+        """Resumo da tarefa (status, progresso, resultados, erro), ou None se o id não existir."""
+        tarefa = self.tarefas.get(tarefa_id)
+        return tarefa.resumo() if tarefa is not None else None
+
+    def cancelar(self, tarefa_id):
+        """Solicita o cancelamento da tarefa."""
+        tarefa = self.tarefas.get(tarefa_id)
+        if tarefa is not None:
+            tarefa.cancelamento.set()
+
+    def encerrar(self):
+        """Cancela as tarefas ativas e encerra o pool."""
+        for tarefa in list(self.tarefas.values()):
+            tarefa.cancelamento.set()
+        self.executor.shutdown(wait=True)
+
+    def _executar(self, tarefa, df, config, rack, max_permutacoes, estrategia, kwargs):
+        with tarefa.lock:
+            if tarefa.cancelamento.is_set():
+                tarefa.status = 'cancelada'
+                return
+            tarefa.status = 'executando'
+        try:
+            otimizador = OtimizadorBancoCapacitores(
+                df, config, rack, max_permutacoes, estrategia=estrategia,
+                callback_progresso=tarefa.registrar_progresso, cancelamento=tarefa.cancelamento, **kwargs
+            )
+            resultados = otimizador.get_results()
+            with tarefa.lock:
+                tarefa.resultados = resultados
+                tarefa.status = 'cancelada' if otimizador.cancelado else 'concluida'
+        except Exception as erro:
+            with tarefa.lock:
+                tarefa.erro = f'{type(erro).__name__}: {erro}'
+                tarefa.status = 'erro'
+
+    def _descartar_antigas(self):
+        finalizadas = [t.id for t in self.tarefas.values() if t.status not in STATUS_ATIVOS]
+        for tarefa_id in finalizadas[:max(0, len(finalizadas) - self.max_concluidas)]:
+            del self.tarefas[tarefa_id]
@@ -0,0 +1,48 @@
+import numpy as np
+
+class IndiceCandidatos:
+    def __init__(self, capacitancias, indice_ramo, n_ramos: int, disponiveis=None):
+        """
+        Índice das unidades disponíveis de cada ramo, ordenadas pela capacitância ajustada.
+
+        Para cada ramo são mantidos dois arrays ordenados (crescente e decrescente, com empates pela
+        ordem das linhas, como idxmin/idxmax) e um ponteiro para o início de cada um. Unidades
+        removidas são apenas marcadas como indisponíveis e puladas quando chegam ao início (remoção
+        preguiçosa), de modo que a consulta da menor ou da maior unidade disponível custa O(1)
+        amortizado. Como unidades removidas não voltam a ficar disponíveis, os ponteiros só avançam.
+
+        Args:
+            capacitancias (array-like): Capacitância ajustada de cada unidade (uF), na ordem das linhas.
+            indice_ramo (array-like): Índice do ramo de cada unidade.
+            n_ramos (int): Número de ramos.
+            disponiveis (array-like): Máscara booleana das unidades disponíveis; todas se None.
+        """
+        capacitancias = np.asarray(capacitancias, dtype=float)
+        indice_ramo = np.asarray(indice_ramo)
+        linhas = np.arange(len(capacitancias))
+        crescente = np.lexsort((linhas, capacitancias))
+        decrescente = np.lexsort((linhas, -capacitancias))
+        self.crescente = [crescente[indice_ramo[crescente] == ramo] for ramo in range(n_ramos)]
+        self.decrescente = [decrescente[indice_ramo[decrescente] == ramo] for ramo in range(n_ramos)]
+        self.inicio_crescente = np.zeros(n_ramos, dtype=int)
+        self.inicio_decrescente = np.zeros(n_ramos, dtype=int)
+        self.disponivel = np.ones(len(capacitancias), dtype=bool) if disponiveis is None else np.array(disponiveis, dtype=bool)
+
+    def menor(self, ramo: int):
+        """Linha da unidade disponível de menor capacitância do ramo, ou None se não houver."""
+        return self._primeira_disponivel(self.crescente[ramo], self.inicio_crescente, ramo)
+
+    def maior(self, ramo: int):
+        """Linha da unidade disponível de maior capacitância do ramo, ou None se não houver."""
+        return self._primeira_disponivel(self.decrescente[ramo], self.inicio_decrescente, ramo)
+
+    def remover(self, *linhas):
+        """Marca as unidades das linhas como indisponíveis."""
+        self.disponivel[list(linhas)] = False
+
+    def _primeira_disponivel(self, ordem, inicios, ramo):
+        inicio = inicios[ramo]
+        while inicio < len(ordem) and not self.disponivel[ordem[inicio]]:
+            inicio += 1
+        inicios[ramo] = inicio
+        return int(ordem[inicio]) if inicio < len(ordem) else None
@@ -0,0 +1,157 @@
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+
+class Instrumentacao:
+    ativa = True
+
+    def __init__(self, destino=None, perfil: bool = False, contexto: dict = None):
+        """
+        Contadores, cronômetros e eventos estruturados de uma ou mais execuções do otimizador.
+
+        Os eventos são gravados como JSON Lines ({"t_s": segundos desde a criação, "evento": tipo, ...})
+        em `destino`, se informado, e mantidos em `eventos`. Com `perfil`, perfilar() executa o trecho
+        sob cProfile e guarda as estatísticas em `estatisticas_perfil`.
+
+        Args:
+            destino (str or file-like): Caminho do arquivo JSON Lines (aberto em modo de acréscimo) ou
+                arquivo de texto aberto; None mantém os eventos apenas em memória.
+            perfil (bool): Habilita o cProfile em perfilar().
+            contexto (dict): Campos incluídos em todos os eventos (ex.: {'banco': ..., 'rack': ...}).
+        """
+        self.contadores = {}
+        self.tempos = {}  # nome -> [tempo total (s), número de medições]
+        self.eventos = []
+        self.perfil = perfil
+        self.contexto = dict(contexto or {})
+        self.estatisticas_perfil = None
+        self.inicio = time.perf_counter()
+        if isinstance(destino, (str, os.PathLike)):
+            self.arquivo = open(destino, 'a', encoding='utf-8')
+            self._fechar_arquivo = True
+        else:
+            self.arquivo = destino
+            self._fechar_arquivo = False
+
+    def contar(self, nome: str, quantidade: int = 1):
+        """Soma `quantidade` ao contador `nome`."""
+        self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def registrar_tempo(self, nome: str, duracao_s: float):
+        """Acumula uma medição de `duracao_s` segundos no cronômetro `nome`."""
+        tempo = self.tempos.setdefault(nome, [0.0, 0])
+        tempo[0] += duracao_s
+        tempo[1] += 1
+
+    @contextlib.contextmanager
+    def cronometrar(self, nome: str):
+        """Acumula no cronômetro `nome` o tempo do bloco `with`."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_tempo(nome, time.perf_counter() - inicio)
+
+    def evento(self, tipo: str, **dados):
+        """Registra um evento estruturado e o grava como uma linha JSON no destino."""
+        registro = {'t_s': round(time.perf_counter() - self.inicio, 6), **self.contexto, 'evento': tipo, **dados}
+        self.eventos.append(registro)
+        if self.arquivo is not None:
+            gravar_eventos(self.arquivo, [registro])
+
+    @contextlib.contextmanager
+    def perfilar(self):
+        """Executa o bloco `with` sob cProfile, se habilitado, acumulando em estatisticas_perfil."""
+        if not self.perfil:
+            yield
+            return
+        perfilador = cProfile.Profile()
+        perfilador.enable()
+        try:
+            yield
+        finally:
+            perfilador.disable()
+            if self.estatisticas_perfil is None:
+                self.estatisticas_perfil = pstats.Stats(perfilador)
+            else:
+                self.estatisticas_perfil.add(perfilador)
+
+    def relatorio_perfil(self, ordenar_por: str = 'cumulative', limite: int = 25):
+        """Texto das `limite` funções mais custosas do perfil (vazio se o perfil não foi coletado)."""
+        if self.estatisticas_perfil is None:
+            return ''
+        saida = io.StringIO()
+        self.estatisticas_perfil.stream = saida
+        self.estatisticas_perfil.sort_stats(ordenar_por).print_stats(limite)
+        return saida.getvalue()
+
+    def resumo(self):
+        """
+        Returns:
+            dict: Contadores e, por cronômetro, tempo total, número de medições e tempo médio (s).
+        """
+        return {
+            'contadores': dict(self.contadores),
+            'tempos': {
+                nome: {'total_s': total, 'medicoes': medicoes, 'media_s': total / medicoes}
+                for nome, (total, medicoes) in self.tempos.items()
+            }
+        }
+
+    def fechar(self):
+        """Fecha o arquivo de eventos, se aberto por esta instância."""
+        if self._fechar_arquivo and self.arquivo is not None:
+            self.arquivo.close()
+            self.arquivo = None
+
+class InstrumentacaoDesativada:
+    """Instrumentação sem efeito: todos os métodos retornam imediatamente, sem alocar nem medir tempo."""
+    ativa = False
+    _contexto_nulo = contextlib.nullcontext()
+
+    def contar(self, nome, quantidade=1):
+        pass
+
+    def registrar_tempo(self, nome, duracao_s):
+        pass
+
+    def cronometrar(self, nome):
+        return self._contexto_nulo
+
+    def evento(self, tipo, **dados):
+        pass
+
+    def perfilar(self):
+        return self._contexto_nulo
+
+    def relatorio_perfil(self, ordenar_por='cumulative', limite=25):
+        return ''
+
+    def resumo(self):
+        return {}
+
+    def fechar(self):
+        pass
+
+# Instância compartilhada usada quando nenhuma instrumentação é informada
+INSTRUMENTACAO_DESATIVADA = InstrumentacaoDesativada()
+
+def gravar_eventos(arquivo, eventos):
+    """
+    Grava eventos (ex.: Instrumentacao.eventos) como JSON Lines em um arquivo de texto aberto.
+
+    Usada também pelo processo principal do processamento em lote, único escritor do arquivo de eventos
+    de todos os processos de trabalho.
+    """
+    arquivo.writelines(json.dumps(registro, ensure_ascii=False, default=_json_padrao) + '\n' for registro in eventos)
+    arquivo.flush()
+
+def _json_padrao(valor):
+    """Converte escalares do NumPy (e outros objetos) para tipos serializáveis em JSON."""
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return str(valor)
@@ -0,0 +1,252 @@
+import time
+from itertools import permutations
+import numpy as np
+
+def ciclos_transferencias(transferencias):
+    """
+    Decompõe as transferências entre ramos em ciclos, começando pelos mais curtos.
+
+    Args:
+        transferencias (np.ndarray): Matriz (n_ramos x n_ramos) com o número de unidades que saíram do
+            ramo da linha para o ramo da coluna.
+
+    Returns:
+        list: Ciclos de ramos; um ciclo de tamanho k é executado com k - 1 permutações.
+    """
+    restantes = transferencias.copy()
+    ativos = np.flatnonzero(restantes.sum(axis=0) + restantes.sum(axis=1))
+    ciclos = []
+    for tamanho in range(2, len(ativos) + 1):
+        for caminho in permutations(ativos, tamanho):
+            # Cada ciclo é considerado uma única vez, a partir do seu menor ramo
+            if min(caminho) != caminho[0]:
+                continue
+            arestas = (list(caminho), list(caminho[1:]) + [caminho[0]])
+            quantidade = restantes[arestas].min()
+            if quantidade > 0:
+                restantes[arestas] -= quantidade
+                ciclos += [list(caminho)] * int(quantidade)
+    return ciclos
+
+class BuscaMetaheuristica:
+    def __init__(self, avaliador, linhas_1, linhas_2, tolerancia: float, max_trocas: int,
+                 limite_tempo_s: float = 2.0, semente=None, cancelamento=None):
+        """
+        Busca local com orçamento de permutações e de tempo (recozimento simulado ou busca tabu).
+
+        Ao contrário do otimizador heurístico, uma unidade pode ser movida mais de uma vez. O número de
+        permutações de um estado é o das trocas necessárias para levar cada unidade da posição original
+        à atual (unidades movidas menos ciclos da permutação das posições), e estados acima de max_trocas
+        nunca são aceitos. Ele é mantido a cada movimento em O(1): uma troca entre unidades do mesmo
+        ciclo o divide (uma permutação a menos) e entre ciclos diferentes os une (uma a mais); os
+        ciclos só são percorridos para atualizar seus rótulos nos movimentos aceitos.
+
+        Args:
+            avaliador (AvaliadorCircuito): Avaliador com o estado inicial do banco (não é alterado).
+            linhas_1 (array-like): Linhas (posicionais) das unidades da primeira perna.
+            linhas_2 (array-like): Linhas (posicionais) das unidades da segunda perna.
+            tolerancia (float): Corrente de desbalanceamento desejada (A).
+            max_trocas (int): Orçamento de permutações.
+            limite_tempo_s (float): Orçamento de tempo da busca, em segundos.
+            semente (int): Semente do gerador aleatório.
+            cancelamento: Objeto com is_set() (ex.: threading.Event) que encerra a busca antes do prazo.
+        """
+        self.avaliador = avaliador.copiar()
+        self.membros_1 = np.array(linhas_1)
+        self.membros_2 = np.array(linhas_2)
+        self.tolerancia = tolerancia
+        self.max_trocas = max_trocas
+        self.limite_tempo_s = limite_tempo_s
+        self.rng = np.random.default_rng(semente)
+        self.cancelamento = cancelamento
+
+        self.ramo_original = avaliador.indice_ramo.copy()
+        # Posição original (linha) da unidade que ocupa hoje a posição original de cada linha, e rótulo do
+        # ciclo da permutação a que cada linha pertence
+        self.posicao = np.arange(len(self.ramo_original))
+        self.ciclo = np.arange(len(self.ramo_original))
+        self.proximo_ciclo = len(self.ramo_original)
+        self.num_trocas = 0
+        self.corrente = float(self.avaliador.corrente_desbalanceamento())
+        self.avaliacoes = 0
+        self.movimentos_aceitos = 0
+        self.movimentos_rejeitados = 0
+        self._guardar_melhor()
+
+    def recozimento_simulado(self, temperatura_inicial=None, temperatura_final=None):
+        """
+        Recozimento simulado com aprofundamento do orçamento: para k = 1..max_trocas, uma fase de
+        resfriamento geométrico limitada a k permutações, com uma fração igual do orçamento de tempo.
+        A busca termina na primeira fase que atinge a tolerância, como na busca exata. A energia é a
+        corrente de desbalanceamento (limitada inferiormente pela tolerância) mais uma pequena
+        penalidade por permutação.
+
+        Returns:
+            tuple: (lista de pares (i, j) que leva ao melhor estado, corrente de desbalanceamento).
+        """
+        if temperatura_inicial is None:
+            temperatura_inicial = 0.25 * self.corrente
+        if temperatura_final is None:
+            temperatura_final = 0.01 * self.tolerancia
+        razao = temperatura_final / temperatura_inicial
+        inicio = time.perf_counter()
+        duracao_fase = self.limite_tempo_s / max(self.max_trocas, 1)
+
+        for limite_trocas in range(1, self.max_trocas + 1):
+            if self.melhor_corrente <= self.tolerancia or self._cancelada():
+                break
+            inicio_fase = inicio + (limite_trocas - 1) * duracao_fase
+            while True:
+                fracao = (time.perf_counter() - inicio_fase) / duracao_fase
+                if fracao >= 1 or self._cancelada():
+                    break
+                temperatura = temperatura_inicial * razao ** fracao
+                a, b = self._proposta()
+                corrente = self.avaliador.avaliar_troca(self.membros_1[a], self.membros_2[b])
+                self.avaliacoes += 1
+                num_trocas = self._trocas_apos(a, b)
+                if num_trocas > limite_trocas:
+                    self.movimentos_rejeitados += 1
+                    continue
+                delta = self._energia(corrente, num_trocas) - self._energia(self.corrente, self.num_trocas)
+                if delta < 0 or self.rng.random() < np.exp(-delta / temperatura):
+                    self._aplicar(a, b, corrente, num_trocas)
+                    self.movimentos_aceitos += 1
+                else:
+                    self.movimentos_rejeitados += 1
+        return self._melhor_resultado()
+
+    def busca_tabu(self, permanencia: int = 7):
+        """
+        Busca tabu: a cada iteração avalia todos os pares entre as pernas de forma vetorizada e aplica o
+        melhor movimento permitido, mesmo que piore a corrente. Unidades movidas ficam proibidas por
+        `permanencia` iterações, exceto se o movimento superar a melhor solução encontrada.
+
+        Returns:
+            tuple: (lista de pares (i, j) que leva ao melhor estado, corrente de desbalanceamento).
+        """
+        inicio = time.perf_counter()
+        tabu_ate = np.zeros(len(self.ramo_original), dtype=int)
+        iteracao = 0
+        while time.perf_counter() - inicio < self.limite_tempo_s and not self._cancelada():
+            iteracao += 1
+            correntes = self.avaliador.avaliar_trocas(self.membros_1[:, None], self.membros_2[None, :])
+            self.avaliacoes += correntes.size
+            proibido = (tabu_ate[self.membros_1][:, None] > iteracao) | (tabu_ate[self.membros_2][None, :] > iteracao)
+            aspiracao = self._chave(correntes, 0)[0] < self._chave(self.melhor_corrente, 0)[0]
+            num_trocas = self._trocas_apos(np.arange(len(self.membros_1))[:, None], np.arange(len(self.membros_2))[None, :])
+            # Melhor movimento permitido que respeita o orçamento de permutações
+            correntes = np.where((~proibido | aspiracao) & (num_trocas <= self.max_trocas), correntes, np.inf)
+            a, b = np.unravel_index(np.argmin(correntes), correntes.shape)
+            if not np.isfinite(correntes[a, b]):
+                break
+            tabu_ate[[self.membros_1[a], self.membros_2[b]]] = iteracao + permanencia
+            self._aplicar(a, b, float(correntes[a, b]), int(num_trocas[a, b]))
+            self.movimentos_aceitos += 1
+        return self._melhor_resultado()
+
+    def _cancelada(self):
+        return self.cancelamento is not None and self.cancelamento.is_set()
+
+    def _proposta(self):
+        """
+        Sorteia um par (a, b) de posições em membros_1 e membros_2. Em metade das propostas, se houver
+        unidades fora da posição original, uma delas é trocada com uma unidade do mesmo ciclo na outra
+        perna, o que desfaz uma permutação e permite à busca voltar atrás.
+        """
+        a = self.rng.integers(len(self.membros_1))
+        b = self.rng.integers(len(self.membros_2))
+        if self.num_trocas == 0 or self.rng.random() < 0.5:
+            return a, b
+        ciclos_1 = self.ciclo[self.membros_1]
+        ciclos_2 = self.ciclo[self.membros_2]
+        movidas_1 = np.flatnonzero(self.posicao[self.membros_1] != self.membros_1)
+        movidas_2 = np.flatnonzero(self.posicao[self.membros_2] != self.membros_2)
+        if self.rng.random() < len(movidas_1) / max(len(movidas_1) + len(movidas_2), 1):
+            a = self.rng.choice(movidas_1)
+            destino = np.flatnonzero(ciclos_2 == ciclos_1[a])
+            return a, (self.rng.choice(destino) if len(destino) else b)
+        if len(movidas_2) == 0:
+            return a, b
+        b = self.rng.choice(movidas_2)
+        destino = np.flatnonzero(ciclos_1 == ciclos_2[b])
+        return (self.rng.choice(destino) if len(destino) else a), b
+
+    def _trocas_apos(self, a, b):
+        """
+        Número de permutações caso as unidades a (de membros_1) e b (de membros_2) sejam trocadas: uma a
+        menos se estão no mesmo ciclo, uma a mais se não. Aceita arrays de índices (broadcast).
+        """
+        mesmo_ciclo = self.ciclo[self.membros_1[a]] == self.ciclo[self.membros_2[b]]
+        return self.num_trocas + np.where(mesmo_ciclo, -1, 1)
+
+    def _aplicar(self, a, b, corrente, num_trocas):
+        i, j = self.membros_1[a], self.membros_2[b]
+        self.avaliador.trocar(i, j)
+        self.membros_1[a], self.membros_2[b] = j, i
+        self.posicao[i], self.posicao[j] = self.posicao[j], self.posicao[i]
+        # Os ciclos de i e j foram unidos ou divididos: renomeia o(s) ciclo(s) resultante(s)
+        self._rotular_ciclo(i)
+        if self.ciclo[j] != self.ciclo[i]:
+            self._rotular_ciclo(j)
+        self.corrente = corrente
+        self.num_trocas = int(num_trocas)
+        # Abaixo da tolerância, estados com menos permutações são preferidos
+        if self._chave(self.corrente, self.num_trocas) < self._chave(self.melhor_corrente, self.melhor_num_trocas):
+            self._guardar_melhor()
+
+    def _rotular_ciclo(self, linha):
+        """Atribui um novo rótulo às linhas do ciclo de `linha` (no máximo max_trocas + 1 linhas)."""
+        rotulo = self.proximo_ciclo
+        self.proximo_ciclo += 1
+        self.ciclo[linha] = rotulo
+        atual = self.posicao[linha]
+        while atual != linha:
+            self.ciclo[atual] = rotulo
+            atual = self.posicao[atual]
+
+    def _energia(self, corrente, num_trocas):
+        # Abaixo da tolerância, cada permutação custa 10% da tolerância, o que leva a busca a desfazer trocas
+        return max(corrente, self.tolerancia) + 0.1 * self.tolerancia * num_trocas
+
+    def _chave(self, corrente, num_trocas):
+        return np.maximum(corrente, self.tolerancia), num_trocas, corrente
+
+    def _guardar_melhor(self):
+        self.melhor_corrente = self.corrente
+        self.melhor_num_trocas = self.num_trocas
+        self.melhor_ramo = self.avaliador.indice_ramo.copy()
+        self.melhor_posicao = self.posicao.copy()
+
+    def _melhor_resultado(self):
+        """
+        Converte o melhor estado encontrado na sequência de trocas que o produz a partir do inicial.
+
+        Como unidades de um mesmo ramo são equivalentes, os ciclos de transferência entre ramos podem
+        exigir menos trocas que os ciclos da permutação das posições; usa a menor das duas sequências.
+        """
+        # Ciclos da permutação das posições: a unidade u ocupa a posição original de posicao[u]
+        trocas_posicoes = []
+        visitadas = np.zeros(len(self.melhor_posicao), dtype=bool)
+        for linha in np.flatnonzero(self.melhor_posicao != np.arange(len(self.melhor_posicao))):
+            unidades = []
+            while not visitadas[linha]:
+                visitadas[linha] = True
+                unidades.append(int(linha))
+                linha = self.melhor_posicao[linha]
+            trocas_posicoes += list(zip(unidades[:-1], unidades[1:]))
+
+        movidas = {}
+        for linha in np.flatnonzero(self.melhor_ramo != self.ramo_original):
+            movidas.setdefault((self.ramo_original[linha], self.melhor_ramo[linha]), []).append(int(linha))
+        n_ramos = len(self.avaliador.nomes_ramos)
+        transferencias = np.zeros((n_ramos, n_ramos), dtype=int)
+        for (origem, destino), linhas in movidas.items():
+            transferencias[origem, destino] = len(linhas)
+
+        # Um ciclo u1 -> u2 -> ... -> uk é executado com as trocas (u1, u2), (u2, u3), ..., (uk-1, uk)
+        trocas = []
+        for ciclo in ciclos_transferencias(transferencias):
+            unidades = [movidas[(origem, destino)].pop() for origem, destino in zip(ciclo, ciclo[1:] + ciclo[:1])]
+            trocas += list(zip(unidades[:-1], unidades[1:]))
+        return min(trocas, trocas_posicoes, key=len), self.melhor_corrente
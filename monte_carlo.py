@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+from avaliador_circuito import AvaliadorCircuito
+from pre_processamento import COEF_TEMPERATURA_PADRAO
+from topologia import TopologiaBanco
+
+# Percentis da corrente de desbalanceamento reportados por avaliar_plano
+PERCENTIS = (5, 50, 95, 99)
+
+class AnaliseMonteCarlo:
+    def __init__(self, df: pd.DataFrame, config: dict, incerteza_coef_temperatura: float = 1e-4,
+                 resolucao_medidor_uF: float = 0.01, semente=None):
+        """
+        Análise de Monte Carlo da corrente de desbalanceamento sob incerteza de medição.
+
+        A capacitância de campo de cada unidade é amostrada com distribuição normal em torno da média das
+        leituras, com desvio padrão igual ao erro padrão da média (desvio_leituras_uF / raiz de
+        num_leituras) combinado com o erro de quantização do medidor (resolução / raiz de 12). O
+        coeficiente de temperatura de cada unidade é amostrado em torno de constants['coef_temperatura']
+        e a correção de temperatura é refeita para cada amostra, como em process_data.
+
+        Args:
+            df (pd.DataFrame): DataFrame pré-processado (no estado a partir do qual os planos são aplicados).
+            config (dict): Dicionário de configuração.
+            incerteza_coef_temperatura (float): Desvio padrão do coeficiente de temperatura (1/°C).
+            resolucao_medidor_uF (float): Resolução do medidor (uF).
+            semente (int): Semente do gerador aleatório.
+        """
+        self.config = config
+        self.constraints = config['constraints']
+        self.rng = np.random.default_rng(semente)
+        self.posicoes = pd.Index(df['posicao'].values)
+        self.avaliador = AvaliadorCircuito(
+            df['capacitancia_campo_ajustada_uF'].values, df['ramo'].values, config['constants'],
+            TopologiaBanco.from_config(config)
+        )
+
+        # Incerteza da média das leituras; sem desvio (ex.: leitura única), apenas a quantização
+        desvio = df['desvio_leituras_uF'].values if 'desvio_leituras_uF' in df else np.zeros(len(df))
+        num_leituras = df['num_leituras'].values if 'num_leituras' in df else np.ones(len(df))
+        erro_media = np.nan_to_num(np.asarray(desvio, dtype=float) / np.sqrt(num_leituras))
+        self.desvio_medida = np.sqrt(erro_media ** 2 + resolucao_medidor_uF ** 2 / 12)
+        self.capacitancia_campo = df['capacitancia_campo_uF'].values.astype(float)
+        # Sem temperatura registrada (NaN), a unidade não é corrigida, como em process_data
+        self.delta_temperatura = np.nan_to_num((
+            df['temperatura_capacitor_C'].values - config['constants']['temp_ref_C']
+        ).astype(float))
+        self.coef_temperatura = config['constants'].get('coef_temperatura', COEF_TEMPERATURA_PADRAO)
+        self.incerteza_coef_temperatura = incerteza_coef_temperatura
+
+    def amostrar_capacitancias(self, n_amostras: int):
+        """Capacitâncias ajustadas amostradas, formato (n_amostras, n_unidades)."""
+        formato = (n_amostras, len(self.capacitancia_campo))
+        capacitancia_campo = self.capacitancia_campo + self.desvio_medida * self.rng.standard_normal(formato)
+        coef = self.coef_temperatura + self.incerteza_coef_temperatura * self.rng.standard_normal(formato)
+        return capacitancia_campo / (1 + coef * self.delta_temperatura)
+
+    def avaliar_plano(self, plano=(), n_amostras: int = 20000, tamanho_lote: int = 4096):
+        """
+        Distribuição da corrente de desbalanceamento após aplicar um plano de permutações.
+
+        Args:
+            plano (iterable): Permutações aplicadas em sequência, como pares (posicao_a, posicao_b) ou dicts
+                no formato de permutacoes_feitas; vazio avalia o estado atual.
+            n_amostras (int): Número de amostras.
+            tamanho_lote (int): Número de amostras avaliadas por vez.
+
+        Returns:
+            dict: Estatísticas da corrente de desbalanceamento (A): média, desvio padrão, percentis,
+                probabilidades de atingir tolerancia_diferenca e de ficar abaixo do alarme, a corrente
+                nominal (sem incerteza) e as correntes amostradas ('correntes', float32).
+        """
+        trocas = [
+            (p['posicao_origem'], p['posicao_destino']) if isinstance(p, dict) else tuple(p) for p in plano
+        ]
+        linhas = self.posicoes.get_indexer(np.ravel(trocas)).reshape(-1, 2) if trocas else np.empty((0, 2), int)
+        if np.any(linhas < 0):
+            raise ValueError(f"Posições inexistentes no plano: {sorted(set(np.ravel(trocas)[np.ravel(linhas) < 0].tolist()))}")
+        indice_ramo = self.avaliador.indice_ramo.copy()
+        for i, j in linhas:
+            indice_ramo[i], indice_ramo[j] = indice_ramo[j], indice_ramo[i]
+
+        correntes = np.empty(n_amostras, dtype=np.float32)
+        for inicio in range(0, n_amostras, tamanho_lote):
+            n = min(tamanho_lote, n_amostras - inicio)
+            somas = self.avaliador.soma_inversos_capacitancias(self.amostrar_capacitancias(n), indice_ramo)
+            correntes[inicio:inicio + n] = self.avaliador.corrente_desbalanceamento(somas)
+
+        nominal = self.avaliador.corrente_desbalanceamento(
+            self.avaliador.soma_inversos_capacitancias(1 / self.avaliador.inversos, indice_ramo)
+        )
+        resultado = {
+            'amostras': n_amostras,
+            'corrente_nominal_A': float(nominal),
+            'media_A': float(correntes.mean()),
+            'desvio_A': float(correntes.std()),
+            'prob_tolerancia': float(np.mean(correntes <= self.constraints['tolerancia_diferenca'])),
+            'prob_abaixo_alarme': float(np.mean(correntes < self.constraints['corrente_desbalanco_alarme_A']))
+        }
+        for percentil, valor in zip(PERCENTIS, np.percentile(correntes, PERCENTIS)):
+            resultado[f'p{percentil:02d}_A'] = float(valor)
+        resultado['correntes'] = correntes
+        return resultado
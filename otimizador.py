@@ -1,20 +1,104 @@
+import functools
+import logging
+import time
 import pandas as pd
 import numpy as np
+from avaliador_circuito import AvaliadorCenarios, AvaliadorCircuito
+from busca_exata import BuscaExataTrocas
+from busca_milp import BuscaMILP
+from custo_manuseio import CustoManuseio
+from indice_candidatos import IndiceCandidatos
+from instrumentacao import INSTRUMENTACAO_DESATIVADA
+from metaheuristicas import BuscaMetaheuristica
+from monte_carlo import AnaliseMonteCarlo
+from pre_processamento import COEF_TEMPERATURA_PADRAO
+from resultados import ResultadosOtimizacao
+from topologia import TopologiaBanco
+from trajetoria import TrajetoriaOtimizacao
+from varredura_temperatura import VarreduraTemperatura
+
+# Valor de rack_to_optimize que otimiza todos os racks em conjunto
+TODOS_OS_RACKS = 'todos'
+
+# Verbosidade do relato no log: 0 = silencioso, 1 = situação inicial, resultado e avisos, 2 = também cada permutação
+VERBOSIDADE_PADRAO = 1
+
+logger = logging.getLogger(__name__)
+
+# Grandezas do circuito calculadas sob demanda (chave de AvaliadorCircuito.parametros -> atributo da topologia
+# com os nomes dos elementos, para dicts por ramo, perna ou rack; None para valores da fase)
+GRANDEZAS_DERIVADAS = {
+    'capacitancias_ramos': 'ramos',
+    'capacitancias_pernas': 'pernas',
+    'capacitancias_racks': 'racks',
+    'capacitancia_fase': None,
+    'reatancias_ramos': 'ramos',
+    'reatancias_pernas': 'pernas',
+    'reatancias_racks': 'racks',
+    'reatancia_fase': None,
+    'V_fase': None,
+    'I_fase': None,
+    'V_racks': 'racks',
+    'I_pernas': 'pernas'
+}
+
+def _grandeza(topologia, parametros: dict, chave: str):
+    """Grandeza `chave` de parametros, como dict por elemento da topologia ou valor da fase."""
+    nivel = GRANDEZAS_DERIVADAS[chave]
+    return parametros[chave] if nivel is None else dict(zip(getattr(topologia, nivel), parametros[chave]))
+
+def _grandeza_derivada(chave: str):
+    """Propriedade somente leitura com a grandeza `chave` do estado atual do otimizador."""
+    return property(lambda self: _grandeza(self.topologia, self.parametros, chave))
 
 class OtimizadorBancoCapacitores:
-    def __init__(self, df: pd.DataFrame, config: dict, rack_to_optimize: str, max_permutacoes: int, run_optimization=True):
+    capacitancias_ramos = _grandeza_derivada('capacitancias_ramos')
+    capacitancias_pernas = _grandeza_derivada('capacitancias_pernas')
+    capacitancias_racks = _grandeza_derivada('capacitancias_racks')
+    capacitancia_fase = _grandeza_derivada('capacitancia_fase')
+    reatancias_ramos = _grandeza_derivada('reatancias_ramos')
+    reatancias_pernas = _grandeza_derivada('reatancias_pernas')
+    reatancias_racks = _grandeza_derivada('reatancias_racks')
+    reatancia_fase = _grandeza_derivada('reatancia_fase')
+    V_fase = _grandeza_derivada('V_fase')
+    I_fase = _grandeza_derivada('I_fase')
+    V_racks = _grandeza_derivada('V_racks')
+    I_pernas = _grandeza_derivada('I_pernas')
+    
+    def __init__(self, df: pd.DataFrame, config: dict, rack_to_optimize: str, max_permutacoes: int, run_optimization=True, estrategia='heuristica', semente=None, limite_tempo_s=2.0, callback_progresso=None, cancelamento=None, instrumentacao=None, verbosidade=VERBOSIDADE_PADRAO):
         self.df = df.copy()
         self.config = config
         self.rack_to_optimize = rack_to_optimize
         self.max_permutacoes = max_permutacoes
+        self.estrategia = estrategia
+        self.semente = semente
+        self.rng = np.random.default_rng(semente)
+        self.limite_tempo_s = limite_tempo_s
+        self.callback_progresso = callback_progresso  # Chamado com (permutacao, corrente) a cada estado salvo
+        self.cancelamento = cancelamento  # Objeto com is_set() (ex.: threading.Event) que interrompe a otimização
+        self.cancelado = False
+        # Contadores, cronômetros e eventos (instrumentacao.Instrumentacao); sem efeito se None
+        self.instrumentacao = INSTRUMENTACAO_DESATIVADA if instrumentacao is None else instrumentacao
+        self._inicio_iteracao = None  # Início da iteração corrente da otimização (time.perf_counter)
+        self.verbosidade = verbosidade
+        self.eventos = []  # Registros estruturados do que foi relatado (ver relatar)
         self.permutacoes_feitas = []
         self.swapped_capacitors = set()
         self.unbalanced_current = None  # Será calculada
+        self._metricas = None  # AvaliadorCircuito.metricas_fase() do estado atual
+        self._parametros = None  # Cache de AvaliadorCircuito.parametros() do estado atual
         self.is_balanced = None
         self.result_df = self.df.copy()
         self.constants = config['constants']
         self.constraints = config['constraints']
-        self.estados_por_permutacao = []
+        self.topologia = TopologiaBanco.from_config(config)
+        self.avaliador = AvaliadorCircuito(
+            self.result_df['capacitancia_campo_ajustada_uF'].values,
+            self.result_df['ramo'].values,
+            self.constants,
+            self.topologia
+        )
+        self.estados_por_permutacao = TrajetoriaOtimizacao(self.avaliador)
         
         # Cálculos iniciais
         self.calcular_parametros()
@@ -25,24 +109,28 @@ class OtimizadorBancoCapacitores:
             self.otimizar()
     
     def calcular_parametros(self):
-        # Calcular capacitâncias
-        self.capacitancias_ramos = self.get_capacitancia_ramo()
-        self.capacitancias_pernas = self.get_capacitancia_perna()
-        self.capacitancias_racks = self.get_capacitancia_racks()
-        self.capacitancia_fase = self.get_capacitancia_fase()
-        
-        # Calcular reatâncias
-        self.reatancias_ramos = self.get_reatancia_capacitiva_ramos()
-        self.reatancias_pernas = self.get_reatancia_capacitiva_pernas()
-        self.reatancias_racks = self.get_reatancia_capacitiva_racks()
-        self.reatancia_fase = self.get_reatancia_capacitiva_fase()
-        
-        # Calcular correntes e tensões
-        self.V_fase = self.constants['tensao_nom_kV'] * 1000 / np.sqrt(3)
-        self.I_fase = self.get_corrente_fase()
-        self.V_racks = self.get_tensao_racks()
-        self.I_pernas = self.get_corrente_pernas()
-        self.unbalanced_current = self.get_corrente_desbalanceamento()
+        """
+        Atualiza a corrente de desbalanceamento do estado atual e as métricas da fase guardadas na trajetória.
+
+        Capacitâncias, reatâncias, tensões e correntes (GRANDEZAS_DERIVADAS, disponíveis como atributos)
+        são calculadas apenas na primeira consulta após cada permutação.
+        """
+        with self.instrumentacao.cronometrar('recalculo'):
+            self._metricas = self.avaliador.metricas_fase()
+        self.unbalanced_current = self._metricas['unbalanced_current']
+        self._parametros = None
+    
+    @functools.cached_property
+    def custo_manuseio(self):
+        """Modelo de custo de manuseio (CustoManuseio), criado no primeiro uso pela estratégia 'manuseio' ou por ordem_execucao."""
+        return CustoManuseio.from_config(self.config, self.df['posicao'].values)
+    
+    @property
+    def parametros(self):
+        """Parâmetros do circuito no estado atual (AvaliadorCircuito.parametros), calculados sob demanda."""
+        if self._parametros is None:
+            self._parametros = self.avaliador.parametros()
+        return self._parametros
     
     def verificar_balanceamento_inicial(self):
         tolerancia_diferenca = self.constraints['tolerancia_diferenca']
@@ -50,249 +138,656 @@ class OtimizadorBancoCapacitores:
         
         if self.unbalanced_current < corrente_desbalanco_alarme:
             self.is_balanced = True
-            print("O sistema já está balanceado.")
         else:
             self.is_balanced = False
-            print("O sistema não está balanceado e requer otimização.")
-    
-    def get_capacitancia_ramo(self):
-        branches = self.df['ramo'].unique()
-        branches = np.sort(branches)
-        
-        capacitancias_ramos = {}
-        
-        for ramo in branches:
-            ramo_data = self.result_df[self.result_df['ramo'] == ramo]
-            soma_inversos = np.sum(1 / ramo_data['capacitancia_campo_ajustada_uF'].values)
-            capacitancias_ramos[ramo] = 1 / soma_inversos
-        
-        return capacitancias_ramos
-    
-    def get_capacitancia_perna(self):
-        capacitancias_pernas = {
-            'P1': self.capacitancias_ramos['A1'] + self.capacitancias_ramos['A2'],
-            'P2': self.capacitancias_ramos['B1'] + self.capacitancias_ramos['B2'],
-            'P3': self.capacitancias_ramos['A3'] + self.capacitancias_ramos['B4'],
-            'P4': self.capacitancias_ramos['B3'] + self.capacitancias_ramos['B4']
-        }
-        return capacitancias_pernas
-    
-    def get_capacitancia_racks(self):
-        capacitancias_racks = {
-            'R1': self.capacitancias_pernas['P1'] + self.capacitancias_pernas['P2'],
-            'R2': self.capacitancias_pernas['P3'] + self.capacitancias_pernas['P4']
-        }
-        return capacitancias_racks
-    
-    def get_capacitancia_fase(self):
-        C_R1 = self.capacitancias_racks['R1']
-        C_R2 = self.capacitancias_racks['R2']
-        capacitancia_fase = (C_R1 * C_R2) / (C_R1 + C_R2)
-        return capacitancia_fase
-    
-    def get_reatancia_capacitiva_ramos(self):
-        frequencia = self.constants['frequencia_Hz']
-        phi = 1e-6
-        reatancias_ramos = {}
-        for ramo, capacitancia in self.capacitancias_ramos.items():
-            capacitancia_farad = capacitancia * phi
-            reatancia = 1 / (2 * np.pi * frequencia * capacitancia_farad)
-            reatancias_ramos[ramo] = reatancia
-        return reatancias_ramos
-    
-    def get_reatancia_capacitiva_pernas(self):
-        reatancias_pernas = {}
-        for perna in self.capacitancias_pernas:
-            if perna == 'P1':
-                ramo1, ramo2 = 'A1', 'A2'
-            elif perna == 'P2':
-                ramo1, ramo2 = 'B1', 'B2'
-            elif perna == 'P3':
-                ramo1, ramo2 = 'A3', 'A4'
-            elif perna == 'P4':
-                ramo1, ramo2 = 'B3', 'B4'
-            else:
-                continue
-            Xc_ramo1 = self.reatancias_ramos[ramo1]
-            Xc_ramo2 = self.reatancias_ramos[ramo2]
-            Xc_perna = (Xc_ramo1 * Xc_ramo2) / (Xc_ramo1 + Xc_ramo2)
-            reatancias_pernas[perna] = Xc_perna
-        return reatancias_pernas
-    
-    def get_reatancia_capacitiva_racks(self):
-        reatancias_racks = {}
-        Xc_P1 = self.reatancias_pernas['P1']
-        Xc_P2 = self.reatancias_pernas['P2']
-        Xc_R1 = (Xc_P1 * Xc_P2) / (Xc_P1 + Xc_P2)
-        reatancias_racks['R1'] = Xc_R1
-        Xc_P3 = self.reatancias_pernas['P3']
-        Xc_P4 = self.reatancias_pernas['P4']
-        Xc_R2 = (Xc_P3 * Xc_P4) / (Xc_P3 + Xc_P4)
-        reatancias_racks['R2'] = Xc_R2
-        return reatancias_racks
-    
-    def get_reatancia_capacitiva_fase(self):
-        Xc_R1 = self.reatancias_racks['R1']
-        Xc_R2 = self.reatancias_racks['R2']
-        Xc_fase = Xc_R1 + Xc_R2
-        return Xc_fase
-    
-    def get_corrente_fase(self):
-        I_fase = self.V_fase / self.reatancia_fase
-        return I_fase
-    
-    def get_tensao_racks(self):
-        V_racks = {}
-        V_racks['R1'] = self.I_fase * self.reatancias_racks['R1']
-        V_racks['R2'] = self.I_fase * self.reatancias_racks['R2']
-        return V_racks
-    
-    def get_corrente_pernas(self):
-        I_pernas = {}
-        V_R1 = self.V_racks['R1']
-        Xc_P1 = self.reatancias_pernas['P1']
-        Xc_P2 = self.reatancias_pernas['P2']
-        I_P1 = V_R1 / Xc_P1
-        I_P2 = V_R1 / Xc_P2
-        V_R2 = self.V_racks['R2']
-        Xc_P3 = self.reatancias_pernas['P3']
-        Xc_P4 = self.reatancias_pernas['P4']
-        I_P3 = V_R2 / Xc_P3
-        I_P4 = V_R2 / Xc_P4
-        I_pernas['P1'] = I_P1
-        I_pernas['P2'] = I_P2
-        I_pernas['P3'] = I_P3
-        I_pernas['P4'] = I_P4
-        return I_pernas
-    
-    def get_corrente_desbalanceamento(self):
-        I_P1 = self.I_pernas['P1']
-        I_P2 = self.I_pernas['P2']
-        I_P3 = self.I_pernas['P3']
-        I_P4 = self.I_pernas['P4']
-        I_desb_R1 = np.abs(I_P4 - I_P2)
-        I_desb_R2 = np.abs(I_P3 - I_P1)
-        I_desbalanceamento = max(I_desb_R1, I_desb_R2)
-        return I_desbalanceamento
+        self.relatar(
+            'balanceamento_inicial',
+            "O sistema já está balanceado." if self.is_balanced else "O sistema não está balanceado e requer otimização.",
+            corrente_desbalanco_A=self.unbalanced_current, balanceado=self.is_balanced
+        )
     
     def otimizar(self):
-        num_permutations = 0
-        max_permutacoes = self.max_permutacoes
-        tolerancia_diferenca = self.constraints['tolerancia_diferenca']
-        corrente_desbalanco_alarme = self.constraints['corrente_desbalanco_alarme_A']
         rack = self.rack_to_optimize
-        if rack == 'R1':
-            legs = ['P1', 'P2']
-        elif rack == 'R2':
-            legs = ['P3', 'P4']
-        else:
-            print("Rack inválido.")
+        if rack == TODOS_OS_RACKS:
+            with self.instrumentacao.perfilar():
+                self.iniciar_otimizacao()
+                self.otimizar_todos_racks()
+                self.finalizar_otimizacao()
+            return
+        if rack not in self.topologia.pernas_rack:
+            self.relatar('rack_invalido', "Rack inválido: %s.", rack, nivel=logging.ERROR, rack=rack)
             return
         
-        leg_branches = {
-            'P1': ['A1', 'A2'],
-            'P2': ['B1', 'B2'],
-            'P3': ['A3', 'A4'],
-            'P4': ['B3', 'B4']
-        }
+        # As trocas são feitas entre as duas primeiras pernas do rack
+        legs = self.topologia.pernas_rack[rack]
+        leg1_branches = self.topologia.ramos_perna[legs[0]]
+        leg2_branches = self.topologia.ramos_perna[legs[1]]
         
-        leg1_branches = leg_branches[legs[0]]
-        leg2_branches = leg_branches[legs[1]]
+        estrategias = {
+            'heuristica': self.otimizar_heuristica,
+            'todos_pares': self.otimizar_todos_pares,
+            'exato': self.otimizar_exato,
+            'recozimento': self.otimizar_metaheuristica,
+            'tabu': self.otimizar_metaheuristica,
+            'milp': self.otimizar_milp,
+            'robusto': self.otimizar_robusto,
+            'manuseio': self.otimizar_manuseio
+        }
+        if self.estrategia not in estrategias:
+            self.relatar(
+                'estrategia_invalida', "Estratégia inválida: %s.", self.estrategia, nivel=logging.ERROR,
+                estrategia=self.estrategia
+            )
+            return
         
+        with self.instrumentacao.perfilar():
+            self.iniciar_otimizacao()
+            estrategias[self.estrategia](leg1_branches, leg2_branches)
+            self.finalizar_otimizacao()
+    
+    def iniciar_otimizacao(self):
         self.salvar_estado(permutacao=0)
+        self._inicio_otimizacao = self._inicio_iteracao = time.perf_counter()
+        self._avaliacoes_inicio = self._avaliacoes_iteracao = self.avaliador.estatisticas['avaliacoes']
+        self.relatar(
+            'inicio_otimizacao', "Otimização do rack %s com a estratégia %s.", self.rack_to_optimize, self.estrategia,
+            detalhe=2, rack=self.rack_to_optimize, estrategia=self.estrategia, unidades=len(self.result_df),
+            corrente_desbalanco_A=self.unbalanced_current
+        )
+    
+    def finalizar_otimizacao(self):
+        tolerancia_diferenca = self.constraints['tolerancia_diferenca']
+        if self.cancelar_solicitado():
+            self.cancelado = True
+            self.relatar('cancelamento', "Otimização cancelada.", nivel=logging.WARNING)
+        duracao = time.perf_counter() - self._inicio_otimizacao
+        avaliacoes = self.avaliador.estatisticas['avaliacoes'] - self._avaliacoes_inicio
+        self.instrumentacao.contar('avaliacoes_candidatos', avaliacoes)
+        self.instrumentacao.registrar_tempo('otimizacao', duracao)
+        balanceado = self.unbalanced_current <= tolerancia_diferenca
+        self.relatar(
+            'fim_otimizacao', "Otimização concluída com %d permutações. %s", len(self.permutacoes_feitas),
+            "O sistema está balanceado após otimização." if balanceado else
+            "Não foi possível balancear o sistema dentro das tolerâncias com o número máximo de permutações.",
+            num_permutacoes=len(self.permutacoes_feitas), corrente_desbalanco_A=self.unbalanced_current,
+            balanceado=balanceado, cancelado=self.cancelado, duracao_s=duracao, avaliacoes=avaliacoes,
+            **self.instrumentacao.resumo()
+        )
+    
+    def otimizar_todos_racks(self):
+        """
+        Otimização conjunta de todos os racks (rack_to_optimize = TODOS_OS_RACKS): descida mais íngreme com
+        um único objetivo, a corrente de desbalanceamento de todos os pares monitorados, sobre permutações
+        entre ramos de uma mesma perna, entre pernas de um mesmo rack e, se
+        config['constraints']['permitir_trocas_entre_racks'], entre racks.
+        """
+        if self.estrategia not in ('heuristica', 'todos_pares'):
+            self.relatar(
+                'estrategia_substituida',
+                "A estratégia '%s' otimiza um rack por vez; usando a descida mais íngreme para todos os racks.",
+                self.estrategia, nivel=logging.WARNING, estrategia=self.estrategia
+            )
+        tolerancia_diferenca = self.constraints['tolerancia_diferenca']
+        topologia = self.topologia
+        rack_do_ramo = topologia.indice_rack_perna[topologia.indice_perna_ramo]
+        ramos_permitidos = rack_do_ramo[:, None] == rack_do_ramo[None, :]
+        if self.constraints.get('permitir_trocas_entre_racks', False):
+            ramos_permitidos[:] = True
+        np.fill_diagonal(ramos_permitidos, False)  # Trocas dentro de um ramo não alteram o circuito
         
-        while self.unbalanced_current > tolerancia_diferenca and num_permutations < max_permutacoes:
-            swap_made = False            
+        while self.unbalanced_current > tolerancia_diferenca and len(self.permutacoes_feitas) < self.max_permutacoes:
+            if self.cancelar_solicitado():
+                break
+            linhas = np.flatnonzero(~self.result_df['posicao'].isin(self.swapped_capacitors).values)
+            i, j, corrente = self.avaliador.melhor_troca_permitida(linhas, ramos_permitidos)
+            if i is None or corrente >= self.unbalanced_current:
+                self.relatar(
+                    'sem_melhoria', "Nenhuma permutação adicional reduz a corrente de desbalanceamento.",
+                    corrente_desbalanco_A=self.unbalanced_current
+                )
+                self.instrumentacao.contar('trocas_rejeitadas')
+                break
+            self.registrar_permutacao(self.result_df.index[i], self.result_df.index[j])
+    
+    def otimizar_heuristica(self, leg1_branches, leg2_branches):
+        """Troca o capacitor de menor capacitância de um ramo da primeira perna pelo de maior de um ramo da segunda."""
+        tolerancia_diferenca = self.constraints['tolerancia_diferenca']
+        # Unidades disponíveis de cada ramo ordenadas por capacitância, com remoção preguiçosa das já trocadas
+        indice = IndiceCandidatos(
+            self.result_df['capacitancia_campo_ajustada_uF'].values,
+            self.avaliador.indice_ramo,
+            len(self.topologia.ramos),
+            ~self.result_df['posicao'].isin(self.swapped_capacitors).values
+        )
+        
+        while self.unbalanced_current > tolerancia_diferenca and len(self.permutacoes_feitas) < self.max_permutacoes:
+            if self.cancelar_solicitado():
+                break
+            swap_made = False
+            if self.semente is not None:
+                # Reinícios aleatórios: varia a ordem em que as combinações de ramos são testadas
+                leg1_branches = list(self.rng.permutation(leg1_branches))
+                leg2_branches = list(self.rng.permutation(leg2_branches))
             for branch1 in leg1_branches:
-                capacitors_branch1 = self.result_df[
-                    (self.result_df['ramo'] == branch1) &
-                    (~self.result_df['posicao'].isin(self.swapped_capacitors))
-                ]
-                if capacitors_branch1.empty:
+                i = indice.menor(self.topologia.ramos.index(branch1))
+                if i is None:
                     continue
-                cap1 = capacitors_branch1.loc[capacitors_branch1['capacitancia_campo_ajustada_uF'].idxmin()]
                 for branch2 in leg2_branches:
-                    capacitors_branch2 = self.result_df[
-                        (self.result_df['ramo'] == branch2) &
-                        (~self.result_df['posicao'].isin(self.swapped_capacitors))
-                    ]
-                    if capacitors_branch2.empty:
+                    j = indice.maior(self.topologia.ramos.index(branch2))
+                    if j is None:
                         continue
-                    cap2 = capacitors_branch2.loc[capacitors_branch2['capacitancia_campo_ajustada_uF'].idxmax()]
-                    idx1 = cap1.name
-                    idx2 = cap2.name
-                    pos1 = cap1['posicao']
-                    pos2 = cap2['posicao']
-                    unbalanced_current_before = self.unbalanced_current
-                    temp = self.result_df.loc[idx1, ['perna', 'ramo', 'posicao']]
-                    self.result_df.loc[idx1, ['perna', 'ramo', 'posicao']] = self.result_df.loc[idx2, ['perna', 'ramo', 'posicao']]
-                    self.result_df.loc[idx2, ['perna', 'ramo', 'posicao']] = temp
-                    self.calcular_parametros()
-                    if self.unbalanced_current < unbalanced_current_before:
-                        self.swapped_capacitors.update([pos1, pos2])
-                        self.permutacoes_feitas.append(
-                            {
-                                'ramo_origem': branch1,
-                                'posicao_origem': pos1,
-                                'ramo_destino': branch2,
-                                'posicao_destino': pos2,
-                                'corrente_desbalanco_A': self.unbalanced_current,
-                                'permutacao': num_permutations+1
-                            }
-                        )
-                        num_permutations +=1
-                        print(f"Permutação {num_permutations}: trocou capacitor {pos1} (ramo {branch1}) com {pos2} (ramo {branch2}). Corrente de desbalanceamento reduziu para {self.unbalanced_current:.6f} A")
+                    if self.avaliador.avaliar_troca(i, j) < self.unbalanced_current:
+                        self.registrar_permutacao(self.result_df.index[i], self.result_df.index[j])
+                        indice.remover(i, j)
                         swap_made = True
                         break
-                    else:
-                        temp = self.result_df.loc[idx1, ['perna', 'ramo', 'posicao']]
-                        self.result_df.loc[idx1, ['perna', 'ramo', 'posicao']] = self.result_df.loc[idx2, ['perna', 'ramo', 'posicao']]
-                        self.result_df.loc[idx2, ['perna', 'ramo', 'posicao']] = temp
-                        self.calcular_parametros()
+                    self.instrumentacao.contar('trocas_rejeitadas')
                 if swap_made:
-                    self.salvar_estado(permutacao=num_permutations)
                     break
             if not swap_made:
-                print("Nenhuma permutação adicional reduz a corrente de desbalanceamento.")
+                self.relatar(
+                    'sem_melhoria', "Nenhuma permutação adicional reduz a corrente de desbalanceamento.",
+                    corrente_desbalanco_A=self.unbalanced_current
+                )
                 break
-        print(f"Otimização concluída com {num_permutations} permutações.")
-        if self.unbalanced_current <= tolerancia_diferenca:
-            print("O sistema está balanceado após otimização.")
+    
+    def otimizar_todos_pares(self, leg1_branches, leg2_branches):
+        """
+        Descida mais íngreme: a cada iteração avalia, de forma vetorizada, todos os pares de capacitores
+        disponíveis entre as duas pernas do rack e aplica a troca que mais reduz a corrente de desbalanceamento.
+        """
+        tolerancia_diferenca = self.constraints['tolerancia_diferenca']
+        
+        while self.unbalanced_current > tolerancia_diferenca and len(self.permutacoes_feitas) < self.max_permutacoes:
+            if self.cancelar_solicitado():
+                break
+            disponiveis = ~self.result_df['posicao'].isin(self.swapped_capacitors).values
+            linhas_1 = np.flatnonzero(self.result_df['ramo'].isin(leg1_branches).values & disponiveis)
+            linhas_2 = np.flatnonzero(self.result_df['ramo'].isin(leg2_branches).values & disponiveis)
+            if len(linhas_1) == 0 or len(linhas_2) == 0:
+                self.relatar(
+                    'sem_melhoria', "Nenhuma permutação adicional reduz a corrente de desbalanceamento.",
+                    corrente_desbalanco_A=self.unbalanced_current
+                )
+                self.instrumentacao.contar('trocas_rejeitadas')
+                break
+            i, j, corrente = self.avaliador.melhor_troca(linhas_1, linhas_2)
+            if corrente >= self.unbalanced_current:
+                self.relatar(
+                    'sem_melhoria', "Nenhuma permutação adicional reduz a corrente de desbalanceamento.",
+                    corrente_desbalanco_A=self.unbalanced_current
+                )
+                self.instrumentacao.contar('trocas_rejeitadas')
+                break
+            self.registrar_permutacao(self.result_df.index[i], self.result_df.index[j])
+    
+    def otimizar_exato(self, leg1_branches, leg2_branches):
+        """
+        Busca exata (branch-and-bound) do menor número de permutações entre as pernas do rack que leva a
+        corrente de desbalanceamento abaixo de tolerancia_diferenca, limitado a max_permutacoes.
+        """
+        tolerancia_diferenca = self.constraints['tolerancia_diferenca']
+        disponiveis = ~self.result_df['posicao'].isin(self.swapped_capacitors).values
+        linhas_1 = np.flatnonzero(self.result_df['ramo'].isin(leg1_branches).values & disponiveis)
+        linhas_2 = np.flatnonzero(self.result_df['ramo'].isin(leg2_branches).values & disponiveis)
+        
+        busca = BuscaExataTrocas(self.avaliador, linhas_1, linhas_2, tolerancia_diferenca, cancelamento=self.cancelamento)
+        trocas, corrente, atingiu_tolerancia = busca.buscar(self.max_permutacoes - len(self.permutacoes_feitas))
+        self.instrumentacao.contar('nos_busca_exata', busca.nos_avaliados)
+        if not atingiu_tolerancia:
+            self.relatar(
+                'tolerancia_nao_atingida',
+                "Nenhum conjunto com até %d permutações atinge a tolerância. Aplicando o melhor conjunto encontrado.",
+                self.max_permutacoes, nivel=logging.WARNING, corrente_desbalanco_A=corrente
+            )
+        
+        # Aplica as trocas na ordem que mantém a menor corrente de desbalanceamento a cada passo
+        pendentes = list(trocas)
+        while pendentes:
+            correntes = [self.avaliador.avaliar_troca(i, j) for i, j in pendentes]
+            i, j = pendentes.pop(int(np.argmin(correntes)))
+            self.registrar_permutacao(self.result_df.index[i], self.result_df.index[j])
+    
+    def otimizar_milp(self, leg1_branches, leg2_branches):
+        """
+        Modelo inteiro-misto (PuLP/CBC) de atribuição das unidades das pernas do rack aos seus ramos, com
+        as correntes linearizadas em torno do estado atual. Requer o pacote opcional PuLP.
+        """
+        tolerancia_diferenca = self.constraints['tolerancia_diferenca']
+        disponiveis = ~self.result_df['posicao'].isin(self.swapped_capacitors).values
+        linhas = np.flatnonzero(self.result_df['ramo'].isin(leg1_branches + leg2_branches).values & disponiveis)
+        
+        busca = BuscaMILP(
+            self.avaliador, linhas, tolerancia_diferenca, self.max_permutacoes - len(self.permutacoes_feitas),
+            self.constraints, self.constants.get('capacit_nom_fase_uF'), self.limite_tempo_s
+        )
+        trocas, corrente, atingiu_tolerancia = busca.buscar()
+        self.relatar(
+            'status_milp', "Status do solver MILP: %s.", busca.status, status=busca.status, corrente_desbalanco_A=corrente
+        )
+        if not atingiu_tolerancia:
+            self.relatar(
+                'tolerancia_nao_atingida',
+                "Nenhum conjunto com até %d permutações atinge a tolerância. Aplicando o melhor conjunto encontrado.",
+                self.max_permutacoes, nivel=logging.WARNING, corrente_desbalanco_A=corrente
+            )
+        
+        for i, j in trocas:
+            self.registrar_permutacao(self.result_df.index[i], self.result_df.index[j])
+    
+    def otimizar_metaheuristica(self, leg1_branches, leg2_branches):
+        """
+        Recozimento simulado ('recozimento') ou busca tabu ('tabu') entre as pernas do rack, com orçamento
+        de max_permutacoes permutações e de limite_tempo_s segundos. Aplica o melhor estado encontrado.
+        """
+        linhas_1 = np.flatnonzero(self.result_df['ramo'].isin(leg1_branches).values)
+        linhas_2 = np.flatnonzero(self.result_df['ramo'].isin(leg2_branches).values)
+        busca = BuscaMetaheuristica(
+            self.avaliador, linhas_1, linhas_2, self.constraints['tolerancia_diferenca'],
+            self.max_permutacoes - len(self.permutacoes_feitas), self.limite_tempo_s, self.semente,
+            cancelamento=self.cancelamento
+        )
+        if self.estrategia == 'recozimento':
+            trocas, corrente = busca.recozimento_simulado()
         else:
-            print("Não foi possível balancear o sistema dentro das tolerâncias com o número máximo de permutações.")
-    
-    def salvar_estado(self, permutacao=None):
-        """Salvar o estado atual do sistema após uma permutação."""
-        estado_atual = {
-            'permutacao': permutacao,
-            'unbalanced_current': self.unbalanced_current,
-            'capacitancias_ramos': self.capacitancias_ramos.copy(),
-            'capacitancias_racks': self.capacitancias_racks.copy(),
-            'capacitancia_fase': self.capacitancia_fase,
-        }
+            trocas, corrente = busca.busca_tabu()
+        self.instrumentacao.contar('movimentos_aceitos', busca.movimentos_aceitos)
+        self.instrumentacao.contar('movimentos_rejeitados', busca.movimentos_rejeitados)
         
-        self.estados_por_permutacao.append(estado_atual)
+        for i, j in trocas:
+            self.registrar_permutacao(self.result_df.index[i], self.result_df.index[j])
+        # A sequência reaplicada deve reproduzir o melhor estado encontrado pela busca
+        if not np.isclose(self.unbalanced_current, corrente, rtol=1e-9, atol=1e-12):
+            raise RuntimeError(
+                f"As permutações de '{self.estrategia}' levam a {self.unbalanced_current:.9f} A, "
+                f"e não à corrente do melhor estado da busca ({corrente:.9f} A)."
+            )
+    
+    def otimizar_robusto(self, leg1_branches, leg2_branches):
+        """
+        Descida mais íngreme entre as pernas do rack minimizando a esperança ou o CVaR da corrente de
+        desbalanceamento sobre cenários de capacitância amostrados (AnaliseMonteCarlo) a partir do
+        desvio das leituras e da incerteza do coeficiente de temperatura. Cada iteração avalia todos os
+        pares em todos os cenários de uma vez e para quando nenhuma troca melhora o objetivo.
+
+        Opções em config['robusto'], todas opcionais: objetivo ('esperanca' ou 'cvar'), nivel_cvar,
+        n_cenarios, incerteza_coef_temperatura e resolucao_medidor_uF.
+        """
+        opcoes = self.config.get('robusto', {})
+        analise = AnaliseMonteCarlo(
+            self.result_df, self.config,
+            incerteza_coef_temperatura=opcoes.get('incerteza_coef_temperatura', 1e-4),
+            resolucao_medidor_uF=opcoes.get('resolucao_medidor_uF', 0.01),
+            semente=self.semente
+        )
+        cenarios = AvaliadorCenarios(
+            analise.amostrar_capacitancias(opcoes.get('n_cenarios', 1000)), self.result_df['ramo'].values,
+            self.constants, self.topologia, opcoes.get('objetivo', 'esperanca'), opcoes.get('nivel_cvar', 0.9)
+        )
+        cenarios.estatisticas = self.avaliador.estatisticas  # Contabiliza as avaliações por cenário no otimizador
+        objetivo = cenarios.valor_objetivo()
+        self.relatar(
+            'objetivo_robusto', "Objetivo robusto (%s) inicial: %.6f A", cenarios.objetivo, objetivo,
+            fase='inicial', objetivo=cenarios.objetivo, valor_A=objetivo
+        )
+        
+        while len(self.permutacoes_feitas) < self.max_permutacoes:
+            if self.cancelar_solicitado():
+                break
+            disponiveis = ~self.result_df['posicao'].isin(self.swapped_capacitors).values
+            linhas_1 = np.flatnonzero(self.result_df['ramo'].isin(leg1_branches).values & disponiveis)
+            linhas_2 = np.flatnonzero(self.result_df['ramo'].isin(leg2_branches).values & disponiveis)
+            if len(linhas_1) == 0 or len(linhas_2) == 0:
+                break
+            i, j, novo_objetivo = cenarios.melhor_troca(linhas_1, linhas_2, cancelamento=self.cancelamento)
+            if self.cancelar_solicitado():
+                break
+            if novo_objetivo >= objetivo:
+                self.relatar(
+                    'sem_melhoria', "Nenhuma permutação adicional reduz o objetivo robusto.",
+                    corrente_desbalanco_A=self.unbalanced_current, objetivo_robusto_A=objetivo
+                )
+                self.instrumentacao.contar('trocas_rejeitadas')
+                break
+            cenarios.trocar(i, j)
+            objetivo = novo_objetivo
+            self.registrar_permutacao(self.result_df.index[i], self.result_df.index[j])
+        self.relatar(
+            'objetivo_robusto', "Objetivo robusto (%s) final: %.6f A", cenarios.objetivo, objetivo,
+            fase='final', objetivo=cenarios.objetivo, valor_A=objetivo
+        )
+    
+    def otimizar_manuseio(self, leg1_branches, leg2_branches):
+        """
+        Descida mais íngreme entre as pernas do rack com objetivo conjunto de corrente e custo de manuseio:
+        max(corrente, tolerancia_diferenca) + peso_custo_A * custo da rota da ponte rolante (CustoManuseio).
+        O custo de cada par candidato é avaliado de forma incremental, pela inserção mais barata da troca
+        na rota atual; para quando nenhuma troca reduz o objetivo. O peso fica em
+        config['geometria']['peso_custo_A'] (corrente equivalente, em A, por unidade de custo).
+        """
+        tolerancia_diferenca = self.constraints['tolerancia_diferenca']
+        peso_custo = self.config.get('geometria', {}).get('peso_custo_A', 1e-4)
+        rota = []  # Posições em que a ponte executa as trocas, na ordem de execução
+        custo_rota = 0.0
+        objetivo = max(self.unbalanced_current, tolerancia_diferenca)
+        
+        while len(self.permutacoes_feitas) < self.max_permutacoes:
+            if self.cancelar_solicitado():
+                break
+            disponiveis = ~self.result_df['posicao'].isin(self.swapped_capacitors).values
+            linhas_1 = np.flatnonzero(self.result_df['ramo'].isin(leg1_branches).values & disponiveis)
+            linhas_2 = np.flatnonzero(self.result_df['ramo'].isin(leg2_branches).values & disponiveis)
+            if len(linhas_1) == 0 or len(linhas_2) == 0:
+                break
+            posicoes = self.result_df['posicao'].values
+            correntes = self.avaliador.avaliar_trocas(linhas_1[:, None], linhas_2[None, :])
+            custos, extremidades, insercoes = self.custo_manuseio.custo_insercao(
+                rota, posicoes[linhas_1][:, None], posicoes[linhas_2][None, :]
+            )
+            objetivos = np.maximum(correntes, tolerancia_diferenca) + peso_custo * (custo_rota + custos)
+            a, b = np.unravel_index(np.argmin(objetivos), objetivos.shape)
+            if objetivos[a, b] >= objetivo:
+                self.relatar(
+                    'sem_melhoria', "Nenhuma permutação adicional reduz o objetivo conjunto de corrente e custo de manuseio.",
+                    corrente_desbalanco_A=self.unbalanced_current, objetivo_A=float(objetivo)
+                )
+                self.instrumentacao.contar('trocas_rejeitadas')
+                break
+            i, j = linhas_1[a], linhas_2[b]
+            rota.insert(insercoes[a, b], posicoes[j] if extremidades[a, b] else posicoes[i])
+            custo_rota += custos[a, b]
+            objetivo = objetivos[a, b]
+            self.registrar_permutacao(self.result_df.index[i], self.result_df.index[j])
+    
+    def ordem_execucao(self, permutacoes=None):
+        """
+        Permutações feitas (ou `permutacoes`) na ordem de execução que minimiza o deslocamento da ponte rolante.
+
+        Returns:
+            tuple: (lista de dicts de permutacoes_feitas acrescidos de 'ordem' (1, 2, ...) e 'posicao_inicio'
+                (posição em que a ponte inicia e termina a troca), custo total de manuseio).
+        """
+        if permutacoes is None:
+            permutacoes = self.permutacoes_feitas
+        if not permutacoes:
+            # Sem permutações não há rota; o modelo de custo nem é criado
+            return [], 0.0
+        trocas = [(p['posicao_origem'], p['posicao_destino']) for p in permutacoes]
+        indices, pontos, _, custo = self.custo_manuseio.ordenar(trocas)
+        ordem = [
+            {**permutacoes[k], 'ordem': ordem, 'posicao_inicio': ponto}
+            for ordem, (k, ponto) in enumerate(zip(indices, pontos), start=1)
+        ]
+        return ordem, custo
+    
+    def evaluate_plans(self, plans, tamanho_lote=4096):
+        """
+        Avalia planos de permutações propostos (ex.: pela equipe de campo) sem alterar o estado do otimizador.
+
+        Os planos partem sempre do banco como medido (o DataFrame original, self.df), como em
+        avaliar_robustez e rank_plans_by_temperature, e não das permutações já feitas; assim,
+        permutacoes_feitas é um plano válido mesmo após a otimização.
+
+        Args:
+            plans (iterable): Cada plano é uma lista de permutações aplicadas em sequência sobre o banco como
+                medido; cada permutação é um par (posicao_a, posicao_b) ou um dict no formato de
+                permutacoes_feitas (chaves 'posicao_origem' e 'posicao_destino').
+            tamanho_lote (int): Número de planos avaliados por vez.
+
+        Returns:
+            pd.DataFrame: Uma linha por plano, com o número de permutações, a corrente de desbalanceamento
+                e as capacitâncias das pernas, dos racks e da fase.
+        """
+        planos = self._normalizar_planos(plans)
+        avaliador = self._avaliador_medido()
+        
+        blocos = []
+        for inicio in range(0, len(planos), tamanho_lote):
+            lote = planos[inicio:inicio + tamanho_lote]
+            tamanhos, linhas = self._linhas_planos(lote)
+            parametros = avaliador.parametros(avaliador.soma_inversos_planos(linhas[..., 0], linhas[..., 1]))
+            bloco = pd.DataFrame({
+                'num_permutacoes': tamanhos,
+                'corrente_desbalanco_A': parametros['unbalanced_current'],
+                'capacitancia_fase_uF': parametros['capacitancia_fase']
+            })
+            for k, perna in enumerate(self.topologia.pernas):
+                bloco[f'capacitancia_{perna}_uF'] = parametros['capacitancias_pernas'][:, k]
+            for k, rack in enumerate(self.topologia.racks):
+                bloco[f'capacitancia_{rack}_uF'] = parametros['capacitancias_racks'][:, k]
+            blocos.append(bloco)
+        return pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame()
+    
+    def avaliar_temperaturas(self, temperaturas, deslocamentos=None):
+        """
+        Avalia o estado atual do banco em uma grade de temperaturas de operação e de perfis de deslocamento
+        de temperatura por unidade (ver VarreduraTemperatura), em uma única passagem vetorizada.
+
+        Args:
+            temperaturas (array-like): Temperaturas ambiente (°C).
+            deslocamentos (array-like): Deslocamentos (°C) de cada unidade (linha), formato (n_unidades,) ou
+                (n_perfis, n_unidades).
+
+        Returns:
+            pd.DataFrame: Uma linha por temperatura e perfil, com a corrente de desbalanceamento, a corrente
+                e a capacitância da fase e se a corrente atinge corrente_desbalanco_alarme_A.
+        """
+        varredura = self._varredura_temperatura(temperaturas, deslocamentos)
+        parametros = self.avaliador.parametros(varredura.somas_inversos(self.avaliador))
+        resultado = varredura.grade()
+        resultado['corrente_desbalanco_A'] = parametros['unbalanced_current'].ravel()
+        resultado['I_fase'] = parametros['I_fase'].ravel()
+        resultado['capacitancia_fase_uF'] = parametros['capacitancia_fase'].ravel()
+        resultado['alarme'] = resultado['corrente_desbalanco_A'] >= self.constraints['corrente_desbalanco_alarme_A']
+        return resultado
+    
+    def rank_plans_by_temperature(self, plans, temperaturas, deslocamentos=None, tamanho_lote=1024):
+        """
+        Classifica planos de permutações pela maior corrente de desbalanceamento no envelope de operação
+        (todas as temperaturas e perfis de deslocamento), sem alterar o estado do otimizador.
+
+        Args:
+            plans (iterable): Planos no formato de evaluate_plans, aplicados sobre o banco como medido.
+            temperaturas (array-like): Temperaturas ambiente (°C).
+            deslocamentos (array-like): Deslocamentos (°C) de cada unidade, como em avaliar_temperaturas.
+            tamanho_lote (int): Número de planos avaliados por vez.
+
+        Returns:
+            pd.DataFrame: Uma linha por plano (índice = posição do plano na entrada), ordenada pela corrente
+                máxima, com o número de permutações, a corrente na temperatura de referência, a corrente
+                máxima e a temperatura e o perfil em que ocorre, e a fração do envelope em alarme.
+        """
+        varredura = self._varredura_temperatura(temperaturas, deslocamentos)
+        planos = self._normalizar_planos(plans)
+        avaliador = self._avaliador_medido()
+        n_temperaturas, n_perfis = varredura.inversos.shape[:2]
+        
+        blocos = []
+        for inicio in range(0, len(planos), tamanho_lote):
+            lote = planos[inicio:inicio + tamanho_lote]
+            tamanhos, linhas = self._linhas_planos(lote)
+            somas = varredura.somas_inversos_planos(avaliador, linhas[..., 0], linhas[..., 1])
+            # Uma coluna por (temperatura, perfil), com os perfis variando mais rápido
+            correntes = avaliador.corrente_desbalanceamento(somas).reshape(len(lote), n_temperaturas * n_perfis)
+            referencia = avaliador.corrente_desbalanceamento(
+                avaliador.soma_inversos_planos(linhas[..., 0], linhas[..., 1])
+            )
+            pior = np.argmax(correntes, axis=1)
+            temperatura_pior, perfil_pior = np.unravel_index(pior, (n_temperaturas, n_perfis))
+            blocos.append(pd.DataFrame({
+                'num_permutacoes': tamanhos,
+                'corrente_referencia_A': referencia,
+                'corrente_max_A': correntes[np.arange(len(lote)), pior],
+                'temperatura_pior_C': varredura.temperaturas[temperatura_pior],
+                'perfil_pior': perfil_pior,
+                'fracao_alarme': np.mean(correntes >= self.constraints['corrente_desbalanco_alarme_A'], axis=1)
+            }, index=np.arange(inicio, inicio + len(lote))))
+        if not blocos:
+            return pd.DataFrame()
+        return pd.concat(blocos).sort_values(['corrente_max_A', 'num_permutacoes'], kind='stable')
+    
+    def _varredura_temperatura(self, temperaturas, deslocamentos):
+        return VarreduraTemperatura(
+            self.result_df['capacitancia_campo_ajustada_uF'].values, temperaturas, deslocamentos,
+            self.constants.get('coef_temperatura', COEF_TEMPERATURA_PADRAO), self.constants['temp_ref_C']
+        )
+    
+    def _avaliador_medido(self):
+        """AvaliadorCircuito do banco como medido (self.df), ponto de partida dos planos avaliados."""
+        avaliador = AvaliadorCircuito(
+            self.df['capacitancia_campo_ajustada_uF'].values, self.df['ramo'].values, self.constants, self.topologia
+        )
+        avaliador.estatisticas = self.avaliador.estatisticas  # Contabiliza as avaliações no otimizador
+        return avaliador
+    
+    def _normalizar_planos(self, plans):
+        """Planos como listas de pares (posicao_a, posicao_b)."""
+        return [
+            [(p['posicao_origem'], p['posicao_destino']) if isinstance(p, dict) else tuple(p) for p in plano]
+            for plano in plans
+        ]
+    
+    def _linhas_planos(self, planos):
+        """
+        Tamanho de cada plano e matriz (planos x passos x 2) com as linhas posicionais de cada permutação
+        sobre o banco como medido, completada com -1 nos planos mais curtos.
+        """
+        posicoes = pd.Index(self.df['posicao'].values)
+        tamanhos = np.array([len(plano) for plano in planos])
+        trocas = np.array([troca for plano in planos for troca in plano]).reshape(-1, 2)
+        linhas_trocas = posicoes.get_indexer(trocas.ravel()).reshape(-1, 2)
+        if np.any(linhas_trocas < 0):
+            raise ValueError(f"Posições inexistentes nos planos: {sorted(set(trocas[linhas_trocas < 0].tolist()))}")
+        linhas = np.full((len(planos), max(tamanhos.max(initial=0), 1), 2), -1)
+        passos = np.arange(len(trocas)) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+        linhas[np.repeat(np.arange(len(planos)), tamanhos), passos] = linhas_trocas
+        return tamanhos, linhas
+    
+    def avaliar_robustez(self, plano=None, n_amostras=20000, semente=None, **kwargs):
+        """
+        Distribuição de Monte Carlo da corrente de desbalanceamento de um plano sob incerteza de medição.
+
+        Args:
+            plano (iterable): Permutações aplicadas sobre o banco como medido (self.df), como em evaluate_plans;
+                as permutações feitas se None.
+            n_amostras (int): Número de amostras.
+            semente (int): Semente do gerador aleatório.
+            **kwargs: Demais argumentos de AnaliseMonteCarlo (incerteza_coef_temperatura, resolucao_medidor_uF).
+
+        Returns:
+            dict: Estatísticas de AnaliseMonteCarlo.avaliar_plano.
+        """
+        analise = AnaliseMonteCarlo(self.df, self.config, semente=semente, **kwargs)
+        return analise.avaliar_plano(self.permutacoes_feitas if plano is None else plano, n_amostras)
+    
+    def registrar_permutacao(self, idx1, idx2):
+        """Aplica a permutação entre as linhas idx1 e idx2 e a registra em permutacoes_feitas."""
+        branch1, pos1 = self.result_df.loc[idx1, ['ramo', 'posicao']]
+        branch2, pos2 = self.result_df.loc[idx2, ['ramo', 'posicao']]
+        corrente_anterior = self.unbalanced_current
+        self.trocar_capacitores(idx1, idx2)
+        self.swapped_capacitors.update([pos1, pos2])
+        num_permutations = len(self.permutacoes_feitas) + 1
+        self.permutacoes_feitas.append(
+            {
+                'ramo_origem': branch1,
+                'posicao_origem': pos1,
+                'ramo_destino': branch2,
+                'posicao_destino': pos2,
+                'corrente_desbalanco_A': self.unbalanced_current,
+                'permutacao': num_permutations
+            }
+        )
+        # Passos intermediários do recozimento e da busca tabu podem aumentar a corrente
+        self.relatar(
+            'permutacao',
+            "Permutação %d: trocou capacitor %s (ramo %s) com %s (ramo %s). Corrente de desbalanceamento: %.6f A → %.6f A",
+            num_permutations, pos1, branch1, pos2, branch2, corrente_anterior, self.unbalanced_current, detalhe=2,
+            **self.permutacoes_feitas[-1], corrente_anterior_A=corrente_anterior, **self.medir_iteracao()
+        )
+        self.salvar_estado(
+            permutacao=num_permutations,
+            troca=(self.result_df.index.get_loc(idx1), self.result_df.index.get_loc(idx2))
+        )
+    
+    def medir_iteracao(self):
+        """
+        Contabiliza na instrumentação a permutação aceita, o tempo e as avaliações desde a anterior.
+
+        Returns:
+            dict: duracao_s e avaliacoes da iteração (vazio sem instrumentação).
+        """
+        if not self.instrumentacao.ativa or self._inicio_iteracao is None:
+            return {}
+        agora = time.perf_counter()
+        avaliacoes = self.avaliador.estatisticas['avaliacoes']
+        medida = {'duracao_s': agora - self._inicio_iteracao, 'avaliacoes': avaliacoes - self._avaliacoes_iteracao}
+        self.instrumentacao.contar('trocas_aceitas')
+        self.instrumentacao.registrar_tempo('iteracao', medida['duracao_s'])
+        self._inicio_iteracao, self._avaliacoes_iteracao = agora, avaliacoes
+        return medida
+    
+    def relatar(self, evento, mensagem, *args, detalhe=1, nivel=logging.INFO, **dados):
+        """
+        Relata um evento do otimizador: guarda o registro {'evento': evento, **dados} em self.eventos,
+        repassa-o à instrumentação e, se verbosidade >= detalhe, emite a mensagem no logger do módulo.
+        A mensagem (formato %, com args) só é formatada se o logger a emitir.
+        """
+        self.eventos.append({'evento': evento, **dados})
+        self.instrumentacao.evento(evento, **dados)
+        if self.verbosidade >= detalhe and logger.isEnabledFor(nivel):
+            logger.log(nivel, mensagem, *args)
+    
+    def trocar_capacitores(self, idx1, idx2):
+        """Permuta os capacitores das linhas idx1 e idx2 do DataFrame e atualiza os parâmetros do circuito."""
+        temp = self.result_df.loc[idx1, ['perna', 'ramo', 'posicao']]
+        self.result_df.loc[idx1, ['perna', 'ramo', 'posicao']] = self.result_df.loc[idx2, ['perna', 'ramo', 'posicao']]
+        self.result_df.loc[idx2, ['perna', 'ramo', 'posicao']] = temp
+        self.avaliador.trocar(self.result_df.index.get_loc(idx1), self.result_df.index.get_loc(idx2))
+        self.calcular_parametros()
+    
+    def salvar_estado(self, permutacao=None, troca=None):
+        """
+        Salvar o estado atual do sistema após uma permutação.
+
+        Apenas a permutação aplicada (troca, linhas posicionais) e as métricas principais são guardadas;
+        os estados completos são reconstruídos sob demanda por estados_por_permutacao.
+        """
+        self.estados_por_permutacao.registrar(permutacao, troca, self._metricas)
+        if self.callback_progresso is not None:
+            self.callback_progresso(permutacao, self.unbalanced_current)
+    
+    def cancelar_solicitado(self):
+        """Indica se o cancelamento da otimização foi solicitado."""
+        return self.cancelamento is not None and self.cancelamento.is_set()
     
     def get_results(self):
+        """
+        Resultados do estado atual como um dicionário preguiçoso (ResultadosOtimizacao).
+
+        As grandezas do circuito (GRANDEZAS_DERIVADAS), a ordem de execução e o custo de manuseio só são
+        calculados quando consultados, e uma única vez, sobre o estado do momento desta chamada.
+        """
         results = {}
         # results = super().get_results()
         results['is_balanced'] = self.unbalanced_current <= self.constraints['tolerancia_diferenca']
         results['unbalanced_current'] = self.unbalanced_current
         results['permutations'] = self.permutacoes_feitas
-        results['capacitancias_ramos'] = self.capacitancias_ramos
-        results['capacitancias_pernas'] = self.capacitancias_pernas
-        results['capacitancias_racks'] = self.capacitancias_racks
-        results['capacitancia_fase'] = self.capacitancia_fase
-        results['reatancias_ramos'] = self.reatancias_ramos
-        results['reatancias_pernas'] = self.reatancias_pernas
-        results['reatancias_racks'] = self.reatancias_racks
-        results['reatancia_fase'] = self.reatancia_fase
-        results['V_fase'] = self.V_fase
-        results['I_fase'] = self.I_fase
-        results['V_racks'] = self.V_racks
-        results['I_pernas'] = self.I_pernas
         results['updated_dataframe'] = self.result_df
         results['estados_por_permutacao'] = self.estados_por_permutacao
-        return results
+        results['instrumentacao'] = self.instrumentacao.resumo()
+        results['eventos'] = self.eventos
+        
+        # Cópias do estado atual, para que os valores calculados depois não dependam de novas permutações
+        soma_inversos, atuais = self.avaliador.soma_inversos.copy(), self._parametros
+        permutacoes = list(self.permutacoes_feitas)
+        parametros = functools.cache(lambda: self.avaliador.parametros(soma_inversos) if atuais is None else atuais)
+        ordem = functools.cache(lambda: self.ordem_execucao(permutacoes))
+        calculos = {
+            chave: lambda chave=chave: _grandeza(self.topologia, parametros(), chave) for chave in GRANDEZAS_DERIVADAS
+        }
+        calculos['ordem_execucao'] = lambda: ordem()[0]
+        calculos['custo_manuseio'] = lambda: ordem()[1]
+        return ResultadosOtimizacao(results, calculos)
     
     
@@ -1,5 +1,114 @@
+import os
 import pandas as pd
 import numpy as np
+from cache_colunar import carregar_colunas, chave_conteudo, salvar_colunas
+from topologia import TOPOLOGIA_PADRAO, TopologiaBanco
+
+# Colunas do arquivo TXT do medidor de capacitância e nomes usados no pré-processamento
+COLUNAS_MEDIDOR = {
+    'Serial': 'serial',
+    'Date Time': 'date_time',
+    'ref(uF)': 'referencia_uF',
+    '(C)': 'temperatura_capacitor_C'
+}
+
+# Coeficiente de temperatura da capacitância (1/°C), se config['constants'] não definir coef_temperatura
+COEF_TEMPERATURA_PADRAO = -0.0004
+
+COLUNAS_PREPROCESSADAS = [
+    'date_time',
+    'rack',
+    'ramo',
+    'perna',
+    'posicao',
+    'num_serie',
+    'capacitancia_fabrica_uF',
+    'delta_capacitancia_fabrica_%',
+    'capacitancia_campo_uF',
+    'num_leituras',
+    'desvio_leituras_uF',
+    'delta_capacitancia_campo_%',
+    'temperatura_capacitor_C',
+    'capacitancia_campo_ajustada_uF',
+    'conformidade'
+]
+
+def parametros_pre_processamento(config: dict):
+    """
+    Parâmetros do config dos quais o pré-processamento depende (constantes, limites de conformidade e
+    topologia), usados na chave do cache; alterar outras seções (ex.: do otimizador) não invalida o cache.
+    """
+    return {
+        'capacit_nom_capacitor_uF': config['constants']['capacit_nom_capacitor_uF'],
+        'coef_temperatura': config['constants'].get('coef_temperatura', COEF_TEMPERATURA_PADRAO),
+        'temp_ref_C': config['constants']['temp_ref_C'],
+        'val_admit_capacit_capacitor_uF': config['constraints']['val_admit_capacit_capacitor_uF'],
+        'topologia': config.get('topologia', TOPOLOGIA_PADRAO)
+    }
+
+def ler_medidas_medidor(fonte, tamanho_bloco: int = 10000):
+    """
+    Lê o arquivo TXT do medidor (separado por tabulação, vírgula decimal) em blocos de tamanho fixo.
+
+    O cabeçalho é lido uma única vez para identificar as colunas de leitura '(uF)', cuja quantidade
+    varia entre exportações. Todas as colunas têm tipos explícitos: a coluna 'Serial', preenchida com
+    espaços, é lida como texto e substituída pelo número da linha; temperaturas com sinal ('+25') ou
+    decimais ('25,5') são lidas como float, e temperaturas em branco ficam NaN (ver processar_medidas);
+    leituras iguais a zero (colunas não usadas, preenchidas com zeros) são ignoradas na média.
+
+    Args:
+        fonte (str or file-like): Caminho do arquivo ou arquivo aberto em modo binário (ex.: upload do Streamlit).
+        tamanho_bloco (int): Número de linhas por bloco.
+
+    Yields:
+        pd.DataFrame: Blocos com as colunas serial, date_time, temperatura_capacitor_C, capacitancia_campo_uF
+            (média das leituras), num_leituras e desvio_leituras_uF (desvio padrão amostral das leituras).
+    """
+    arquivo = open(fonte, 'rb') if isinstance(fonte, (str, os.PathLike)) else fonte
+    try:
+        if hasattr(arquivo, 'seek'):
+            arquivo.seek(0)
+        cabecalho = arquivo.readline().decode('utf-8').rstrip('\r\n').split('\t')
+        leituras = [f'leitura_{k}' for k in range(1, cabecalho.count('(uF)') + 1)]
+        nomes, k = [], 0
+        for coluna in cabecalho:
+            if coluna == '(uF)':
+                nomes.append(leituras[k])
+                k += 1
+            else:
+                nomes.append(COLUNAS_MEDIDOR.get(coluna, coluna))
+        tipos = {'serial': str, 'date_time': str, 'temperatura_capacitor_C': np.float64}
+        tipos.update({leitura: np.float64 for leitura in leituras})
+
+        blocos = pd.read_csv(
+            arquivo, delimiter='\t', decimal=',', header=None, names=nomes,
+            usecols=['serial', 'date_time', 'temperatura_capacitor_C', *leituras],
+            dtype=tipos, chunksize=tamanho_bloco
+        )
+        inicio = 0
+        for bloco in blocos:
+            valores = bloco[leituras].to_numpy()
+            validas = (valores != 0).sum(axis=1)
+            capacitancia = np.divide(
+                valores.sum(axis=1), validas, out=np.full(len(bloco), np.nan), where=validas > 0
+            )
+            # Desvio padrão amostral das leituras válidas (NaN com menos de duas leituras)
+            quadrados = np.where(valores != 0, (valores - capacitancia[:, None]) ** 2, 0).sum(axis=1)
+            desvio = np.sqrt(np.divide(
+                quadrados, validas - 1, out=np.full(len(bloco), np.nan), where=validas > 1
+            ))
+            yield pd.DataFrame({
+                'serial': np.arange(inicio + 1, inicio + len(bloco) + 1),
+                'date_time': bloco['date_time'].values,
+                'temperatura_capacitor_C': bloco['temperatura_capacitor_C'].values,
+                'capacitancia_campo_uF': capacitancia,
+                'num_leituras': validas,
+                'desvio_leituras_uF': desvio
+            })
+            inicio += len(bloco)
+    finally:
+        if arquivo is not fonte:
+            arquivo.close()
 
 class PreProcessamentoBancoCapacitores:
     def __init__(self, measures_path, series_and_position_path, config):
@@ -18,46 +127,44 @@ class PreProcessamentoBancoCapacitores:
 
     def load_data(self):
         """
-        Carrega os dados brutos dos arquivos especificados.
+        Carrega o arquivo de série e posição. As medidas de campo são lidas em blocos por process_data.
         """
-        self.raw_data = pd.read_csv(self.measures_path, delimiter='\t', decimal=',')
         self.serie_position = pd.read_csv(self.series_and_position_path, delimiter=',')
 
+        # Mapeamento das pernas baseado nos ramos, conforme a topologia do banco
+        pernas = TopologiaBanco.from_config(self.config).perna_do_ramo
+        self.serie_position['perna'] = self.serie_position['ramo'].map(pernas)
+
+    def iterar_dados_processados(self, tamanho_bloco: int = 10000):
+        """
+        Pré-processa as medidas de campo bloco a bloco, com memória limitada ao tamanho do bloco.
+
+        Yields:
+            pd.DataFrame: Blocos do dataset de entrada, com as colunas de COLUNAS_PREPROCESSADAS.
+        """
+        for medidas in ler_medidas_medidor(self.measures_path, tamanho_bloco):
+            yield self.processar_medidas(medidas)
+
     def process_data(self):
         """
         Realiza o pré-processamento dos dados brutos para gerar o dataset de entrada.
         """
-        # Mapeamento das pernas baseado nos ramos
-        pernas = {
-            'A1': 'P1',
-            'A2': 'P1',
-            'B1': 'P2',
-            'B2': 'P2',
-            'A3': 'P3',
-            'A4': 'P3',
-            'B3': 'P4',
-            'B4': 'P4'
-        }
-        self.serie_position['perna'] = self.serie_position['ramo'].map(pernas)
-
-        # Cálculo da capacitância média das três medições
-        self.raw_data['capacitancia_campo_uF'] = self.raw_data[['(uF)', '(uF).1', '(uF).2']].mean(axis=1)
-
-        # Criação do DataFrame com as medições de campo
-        field_measurements = self.raw_data[['Serial', 'Date Time', '(C)', 'capacitancia_campo_uF']].copy()
+        blocos = list(self.iterar_dados_processados())
+        self.df = pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame(columns=COLUNAS_PREPROCESSADAS)
 
-        # Renomeando as colunas
-        field_measurements.rename(columns={
-            'Serial': 'serial',
-            'Date Time': 'date_time',
-            '(C)': 'temperatura_capacitor_C'
-        }, inplace=True)
+    def processar_medidas(self, field_measurements):
+        """
+        Junta um bloco de medidas de campo às séries e posições e calcula deltas, ajuste de temperatura
+        e conformidade.
 
-        # Ajuste do índice do serial
-        field_measurements['serial'] = field_measurements.index + 1
+        Args:
+            field_measurements (pd.DataFrame): Bloco de ler_medidas_medidor.
 
+        Returns:
+            pd.DataFrame: Bloco pré-processado, com as colunas de COLUNAS_PREPROCESSADAS.
+        """
         # Junção dos DataFrames
-        self.field_measurements_merged = pd.merge(
+        field_measurements_merged = pd.merge(
             field_measurements,
             self.serie_position,
             left_on='serial',
@@ -67,49 +174,60 @@ class PreProcessamentoBancoCapacitores:
 
         # Cálculo dos deltas de capacitância em relação ao valor de referência
         capacit_nom_capacitor_uF = self.config['constants']['capacit_nom_capacitor_uF']
-        self.field_measurements_merged['delta_capacitancia_fabrica_%'] = 100 * (
-            self.field_measurements_merged['capacitancia_fabrica_uF'] - capacit_nom_capacitor_uF
+        field_measurements_merged['delta_capacitancia_fabrica_%'] = 100 * (
+            field_measurements_merged['capacitancia_fabrica_uF'] - capacit_nom_capacitor_uF
         ) / capacit_nom_capacitor_uF
 
-        self.field_measurements_merged['delta_capacitancia_campo_%'] = 100 * (
-            self.field_measurements_merged['capacitancia_campo_uF'] - capacit_nom_capacitor_uF
+        field_measurements_merged['delta_capacitancia_campo_%'] = 100 * (
+            field_measurements_merged['capacitancia_campo_uF'] - capacit_nom_capacitor_uF
         ) / capacit_nom_capacitor_uF
 
-        # Ajuste da capacitância de campo devido à temperatura
-        alpha = -0.0004  # Coeficiente de temperatura
+        # Ajuste da capacitância de campo devido à temperatura; unidades sem temperatura registrada (NaN na
+        # coluna temperatura_capacitor_C) não são corrigidas, como se medidas na temperatura de referência
+        alpha = self.config['constants'].get('coef_temperatura', COEF_TEMPERATURA_PADRAO)  # Coeficiente de temperatura
         temp_ref_C = self.config['constants']['temp_ref_C']
-        self.field_measurements_merged['capacitancia_campo_ajustada_uF'] = (
-            self.field_measurements_merged['capacitancia_campo_uF'] /
-            (1 + alpha * (self.field_measurements_merged['temperatura_capacitor_C'] - temp_ref_C))
+        field_measurements_merged['capacitancia_campo_ajustada_uF'] = (
+            field_measurements_merged['capacitancia_campo_uF'] /
+            (1 + alpha * (field_measurements_merged['temperatura_capacitor_C'].fillna(temp_ref_C) - temp_ref_C))
         )
 
         # Verificação de conformidade
         val_admit_capacit_capacitor_uF = self.config['constraints']['val_admit_capacit_capacitor_uF']
-        self.field_measurements_merged['conformidade'] = np.where(
-            (self.field_measurements_merged['capacitancia_campo_ajustada_uF'] >= val_admit_capacit_capacitor_uF[0]) &
-            (self.field_measurements_merged['capacitancia_campo_ajustada_uF'] <= val_admit_capacit_capacitor_uF[1]),
+        field_measurements_merged['conformidade'] = np.where(
+            (field_measurements_merged['capacitancia_campo_ajustada_uF'] >= val_admit_capacit_capacitor_uF[0]) &
+            (field_measurements_merged['capacitancia_campo_ajustada_uF'] <= val_admit_capacit_capacitor_uF[1]),
             "C",
             "NC"
         )
 
         # Reordenamento das colunas
-        self.df = self.field_measurements_merged[
-            [
-                'date_time',
-                'rack',
-                'ramo',
-                'perna',
-                'posicao',
-                'num_serie',
-                'capacitancia_fabrica_uF',
-                'delta_capacitancia_fabrica_%',
-                'capacitancia_campo_uF',
-                'delta_capacitancia_campo_%',
-                'temperatura_capacitor_C',
-                'capacitancia_campo_ajustada_uF',
-                'conformidade'
-            ]
-        ].copy()
+        return field_measurements_merged[COLUNAS_PREPROCESSADAS].copy()
+
+    def load_or_process(self, cache_dir='.cache_preprocessamento'):
+        """
+        Carrega o dataset pré-processado do cache em disco ou, se ausente, pré-processa e grava no cache.
+
+        A chave é o hash do conteúdo dos dois arquivos de entrada e de parametros_pre_processamento, de
+        modo que análises repetidas da mesma campanha não refazem o pré-processamento, mesmo com outros
+        parâmetros do otimizador.
+
+        Args:
+            cache_dir (str): Pasta do cache; cada entrada é uma subpasta com o nome da chave.
+
+        Returns:
+            bool: True se o dataset foi lido do cache.
+        """
+        pasta = os.path.join(cache_dir, chave_conteudo(
+            [self.measures_path, self.series_and_position_path], parametros_pre_processamento(self.config)
+        ))
+        if os.path.isdir(pasta):
+            self.df = carregar_colunas(pasta)
+            return True
+        self.load_data()
+        self.process_data()
+        if not os.path.isdir(pasta):
+            salvar_colunas(self.df, pasta)
+        return False
 
     def save_preprocessed_data(self, output_path):
         """
@@ -0,0 +1,202 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from instrumentacao import Instrumentacao, gravar_eventos
+from otimizador import OtimizadorBancoCapacitores
+from pre_processamento import PreProcessamentoBancoCapacitores
+from topologia import TopologiaBanco
+
+COLUNAS_RESULTADO = [
+    'banco',
+    'measures',
+    'positions',
+    'rack',
+    'estrategia',
+    'corrente_inicial_A',
+    'corrente_final_A',
+    'balanceado',
+    'num_permutacoes',
+    'permutacoes',
+    'capacitancia_fase_uF',
+    'erro'
+]
+
+# Máximo de permutações quando não informado nem definido em constraints.max_permutacoes do config
+MAX_PERMUTACOES_PADRAO = 10
+
+def ler_manifesto(manifest_path):
+    """
+    Lê o manifesto de bancos de forma incremental.
+
+    O manifesto é um CSV com as colunas 'measures', 'positions', 'config' e, opcionalmente, 'banco',
+    ou um arquivo JSON Lines com as mesmas chaves. Caminhos relativos são resolvidos a partir da
+    pasta do manifesto.
+
+    Yields:
+        dict: Uma entrada do manifesto por banco/fase.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, 'r', encoding='utf-8') as file:
+        if manifest_path.endswith('.jsonl'):
+            entradas = (json.loads(linha) for linha in file if linha.strip())
+        else:
+            entradas = csv.DictReader(file)
+        for numero, entrada in enumerate(entradas, start=1):
+            for chave in ('measures', 'positions', 'config'):
+                entrada[chave] = os.path.join(base, entrada[chave])
+            entrada.setdefault('banco', None)
+            entrada['banco'] = entrada['banco'] or str(numero)
+            yield entrada
+
+def processar_banco(entrada, racks=None, estrategia='heuristica', max_permutacoes=None, eventos_path=None):
+    """
+    Pré-processa e otimiza um banco do manifesto.
+
+    O máximo de permutações é max_permutacoes, se informado; senão, constraints.max_permutacoes do config
+    do banco, ou MAX_PERMUTACOES_PADRAO.
+
+    Com eventos_path, os eventos de instrumentação de cada otimização (Instrumentacao, com os campos
+    banco e rack) são acrescentados a eventos_path, em JSON Lines.
+
+    Returns:
+        list: Uma linha de resultado (dict com COLUNAS_RESULTADO) por rack otimizado.
+    """
+    linhas, eventos = _processar_banco(entrada, racks, estrategia, max_permutacoes, eventos_path is not None)
+    if eventos_path is not None:
+        with open(eventos_path, 'a', encoding='utf-8') as arquivo:
+            gravar_eventos(arquivo, eventos)
+    return linhas
+
+def _processar_banco(entrada, racks, estrategia, max_permutacoes, coletar_eventos):
+    """
+    Executa processar_banco sem gravar eventos.
+
+    Returns:
+        tuple: (linhas de resultado, eventos de instrumentação das otimizações; vazio sem coletar_eventos).
+    """
+    linha_base = {'banco': entrada['banco'], 'measures': entrada['measures'], 'positions': entrada['positions']}
+    try:
+        with open(entrada['config'], 'r') as file:
+            config = json.load(file)
+        preprocessador = PreProcessamentoBancoCapacitores(
+            measures_path=entrada['measures'],
+            series_and_position_path=entrada['positions'],
+            config=config
+        )
+        preprocessador.load_data()
+        preprocessador.process_data()
+    except Exception as erro:
+        return [dict(linha_base, erro=f'{type(erro).__name__}: {erro}')], []
+
+    if max_permutacoes is None:
+        max_permutacoes = config['constraints'].get('max_permutacoes', MAX_PERMUTACOES_PADRAO)
+    linhas, eventos = [], []
+    for rack in racks or TopologiaBanco.from_config(config).racks:
+        linha = dict(linha_base, rack=rack, estrategia=estrategia)
+        instrumentacao = None
+        if coletar_eventos:
+            # Eventos mantidos em memória; quem chama grava no arquivo
+            instrumentacao = Instrumentacao(contexto={'banco': entrada['banco'], 'rack': rack})
+        try:
+            otimizador = OtimizadorBancoCapacitores(
+                preprocessador.df, config, rack, max_permutacoes, estrategia=estrategia,
+                instrumentacao=instrumentacao, verbosidade=0
+            )
+            results = otimizador.get_results()
+            estados = otimizador.estados_por_permutacao
+            linha.update({
+                'corrente_inicial_A': estados[0]['unbalanced_current'] if estados else results['unbalanced_current'],
+                'corrente_final_A': results['unbalanced_current'],
+                'balanceado': results['is_balanced'],
+                'num_permutacoes': len(results['permutations']),
+                'permutacoes': '; '.join(
+                    f"{p['posicao_origem']}<->{p['posicao_destino']}" for p in results['permutations']
+                ),
+                'capacitancia_fase_uF': results['capacitancia_fase']
+            })
+        except Exception as erro:
+            linha['erro'] = f'{type(erro).__name__}: {erro}'
+        finally:
+            if instrumentacao is not None:
+                eventos += instrumentacao.eventos
+        linhas.append(linha)
+    return linhas, eventos
+
+def processar_lote(manifest_path, output_path, racks=None, estrategia='heuristica',
+                   max_permutacoes=None, max_workers=None, max_pendentes=None, eventos_path=None):
+    """
+    Processa todos os bancos de um manifesto em paralelo e grava uma tabela consolidada em CSV.
+
+    O manifesto é lido como fluxo e no máximo `max_pendentes` bancos ficam em processamento ao mesmo
+    tempo; cada resultado é gravado assim que fica pronto. Assim, a memória não cresce com o
+    número de bancos do manifesto. Os eventos de instrumentação voltam com o resultado de cada banco
+    e são gravados pelo processo principal, de modo que os processos de trabalho nunca escrevem no
+    mesmo arquivo.
+
+    Args:
+        manifest_path (str): Caminho do manifesto (CSV ou JSON Lines).
+        output_path (str): Caminho do CSV consolidado.
+        racks (iterable): Racks a otimizar em cada banco; todos os racks da topologia do banco se None.
+        estrategia (str): Estratégia do otimizador.
+        max_permutacoes (int): Máximo de permutações de todos os bancos; se None, constraints.max_permutacoes
+            do config de cada banco, ou MAX_PERMUTACOES_PADRAO.
+        max_workers (int): Número de processos; número de CPUs se None.
+        max_pendentes (int): Máximo de bancos em processamento simultâneo; padrão 2 x processos.
+        eventos_path (str): Arquivo JSON Lines de eventos de instrumentação de todas as otimizações.
+
+    Returns:
+        int: Número de linhas gravadas.
+    """
+    linhas_gravadas = 0
+    max_workers = max_workers or os.cpu_count()
+    max_pendentes = max_pendentes or 2 * max_workers
+    with ProcessPoolExecutor(max_workers=max_workers) as executor, \
+            open(output_path, 'w', newline='', encoding='utf-8') as saida, \
+            contextlib.ExitStack() as pilha:
+        arquivo_eventos = None
+        if eventos_path is not None:
+            arquivo_eventos = pilha.enter_context(open(eventos_path, 'a', encoding='utf-8'))
+        escritor = csv.DictWriter(saida, fieldnames=COLUNAS_RESULTADO)
+        escritor.writeheader()
+
+        def gravar(concluidos):
+            nonlocal linhas_gravadas
+            for futuro in concluidos:
+                linhas, eventos = futuro.result()
+                escritor.writerows(linhas)
+                linhas_gravadas += len(linhas)
+                if arquivo_eventos is not None:
+                    gravar_eventos(arquivo_eventos, eventos)
+            saida.flush()
+
+        pendentes = set()
+        for entrada in ler_manifesto(manifest_path):
+            if len(pendentes) >= max_pendentes:
+                concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                gravar(concluidos)
+            pendentes.add(executor.submit(
+                _processar_banco, entrada, racks, estrategia, max_permutacoes, eventos_path is not None
+            ))
+        gravar(wait(pendentes).done)
+    return linhas_gravadas
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Otimização em lote de bancos de capacitores.')
+    parser.add_argument('manifest', help='Manifesto CSV/JSONL com as colunas measures, positions e config.')
+    parser.add_argument('output', help='CSV consolidado de saída.')
+    parser.add_argument('--racks', nargs='+', default=None)
+    parser.add_argument('--estrategia', default='heuristica')
+    parser.add_argument('--max-permutacoes', type=int, default=None,
+                        help=f'Padrão: constraints.max_permutacoes do config de cada banco, ou {MAX_PERMUTACOES_PADRAO}.')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--eventos', default=None, help='Arquivo JSON Lines de eventos de instrumentação.')
+    args = parser.parse_args()
+
+    total = processar_lote(
+        args.manifest, args.output, racks=args.racks, estrategia=args.estrategia,
+        max_permutacoes=args.max_permutacoes, max_workers=args.workers, eventos_path=args.eventos
+    )
+    print(f"{total} linhas gravadas em {args.output}.")
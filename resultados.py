@@ -0,0 +1,60 @@
+from collections.abc import MutableMapping
+
+class ResultadosOtimizacao(MutableMapping):
+    def __init__(self, valores: dict, calculos: dict):
+        """
+        Resultados do otimizador como um dicionário com entradas calculadas sob demanda.
+
+        As entradas de `valores` estão prontas; as de `calculos` são funções sem argumentos, chamadas
+        apenas na primeira consulta da chave, cujo resultado fica guardado. A iteração, len() e `in`
+        incluem as chaves ainda não calculadas (primeiro as de `valores`, depois as de `calculos`).
+        Atribuições e remoções funcionam como em um dict. Ao serializar (pickle, copy), todas as
+        entradas são calculadas e o objeto vira um dict comum.
+
+        Args:
+            valores (dict): Entradas já calculadas.
+            calculos (dict): Funções que calculam as demais entradas, por chave.
+        """
+        self._valores = dict(valores)
+        self._calculos = {chave: calculo for chave, calculo in calculos.items() if chave not in self._valores}
+        self._ordem = list(self._valores) + list(self._calculos)
+
+    def __getitem__(self, chave):
+        if chave not in self._valores:
+            if chave not in self._calculos:
+                raise KeyError(chave)
+            self._valores[chave] = self._calculos.pop(chave)()
+        return self._valores[chave]
+
+    def __setitem__(self, chave, valor):
+        if chave not in self:
+            self._ordem.append(chave)
+        self._calculos.pop(chave, None)
+        self._valores[chave] = valor
+
+    def __delitem__(self, chave):
+        if chave in self._calculos:
+            del self._calculos[chave]
+        else:
+            del self._valores[chave]
+        self._ordem.remove(chave)
+
+    def __iter__(self):
+        return iter(list(self._ordem))
+
+    def __len__(self):
+        return len(self._ordem)
+
+    def __contains__(self, chave):
+        return chave in self._valores or chave in self._calculos
+
+    def calculadas(self):
+        """Chaves cujos valores já foram calculados."""
+        return list(self._valores)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+    def __repr__(self):
+        pendentes = ', '.join(repr(chave) for chave in self._calculos)
+        return f'{type(self).__name__}({self._valores!r}, pendentes=[{pendentes}])'
@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+from itertools import combinations
+import numpy as np
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from avaliador_circuito import AvaliadorCircuito
+from gerador_bancos import GeradorBancos
+
+with open(os.path.join(RAIZ, 'data', 'config.json'), 'r') as file:
+    CONFIG = json.load(file)
+
+# Sementes dos bancos pequenos comparados com a força bruta
+SEMENTES = (0, 1, 2, 3)
+
+@pytest.fixture(params=SEMENTES)
+def banco(request):
+    """
+    Banco sintético pequeno (3 unidades por ramo) com a perna P1 desbalanceada.
+
+    Returns:
+        tuple: (AvaliadorCircuito, linhas da perna P1, linhas da perna P2).
+    """
+    gerador = GeradorBancos(CONFIG, unidades_por_ramo=3, vies_pernas_pct={'P1': -0.5}, semente=request.param)
+    unidades = gerador.sortear()
+    avaliador = AvaliadorCircuito(
+        unidades['capacitancia_real_uF'].values, unidades['ramo'].values, CONFIG['constants'], gerador.topologia
+    )
+    perna = unidades['ramo'].map(gerador.topologia.perna_do_ramo).values
+    return avaliador, np.flatnonzero(perna == 'P1'), np.flatnonzero(perna == 'P2')
+
+def melhores_por_num_trocas(avaliador, pares, max_trocas):
+    """
+    Força bruta: para k = 1..max_trocas, o conjunto de k permutações de `pares` sem unidades em comum
+    com a menor corrente de desbalanceamento.
+
+    Returns:
+        dict: k -> (corrente de desbalanceamento, lista de pares (i, j)).
+    """
+    pares = np.asarray(pares)
+    melhores = {}
+    for k in range(1, max_trocas + 1):
+        conjuntos = np.array([
+            conjunto for conjunto in combinations(range(len(pares)), k)
+            if len(np.unique(pares[list(conjunto)])) == 2 * k
+        ])
+        planos = pares[conjuntos]
+        correntes = avaliador.corrente_desbalanceamento(avaliador.soma_inversos_planos(planos[..., 0], planos[..., 1]))
+        melhor = int(np.argmin(correntes))
+        melhores[k] = (float(correntes[melhor]), [tuple(map(int, par)) for par in planos[melhor]])
+    return melhores
+
+def corrente_apos(avaliador, trocas):
+    """Corrente de desbalanceamento após aplicar `trocas` em sequência, sem alterar `avaliador`."""
+    avaliador = avaliador.copiar()
+    for i, j in trocas:
+        avaliador.trocar(i, j)
+    return float(avaliador.corrente_desbalanceamento())
@@ -0,0 +1,84 @@
+import threading
+from itertools import product
+import numpy as np
+import pytest
+from busca_exata import BuscaExataTrocas
+from conftest import corrente_apos, melhores_por_num_trocas
+
+MAX_TROCAS = 3
+
+def _pares_entre_pernas(linhas_1, linhas_2):
+    return list(product(linhas_1, linhas_2))
+
+def _verificar_trocas(avaliador, linhas_1, linhas_2, trocas, corrente):
+    unidades = [unidade for par in trocas for unidade in par]
+    assert len(set(unidades)) == len(unidades), 'cada unidade é movida no máximo uma vez'
+    assert all(i in linhas_1 and j in linhas_2 for i, j in trocas)
+    assert corrente == pytest.approx(corrente_apos(avaliador, trocas), rel=1e-9)
+
+@pytest.mark.parametrize('k', range(1, MAX_TROCAS + 1))
+def test_menor_numero_de_trocas_igual_a_forca_bruta(banco, k):
+    avaliador, linhas_1, linhas_2 = banco
+    melhores = melhores_por_num_trocas(avaliador, _pares_entre_pernas(linhas_1, linhas_2), MAX_TROCAS)
+    # Tolerância atingível com k permutações; o mínimo pode ser menor, se menos permutações bastarem
+    tolerancia = melhores[k][0] * (1 + 1e-9)
+    if tolerancia >= avaliador.corrente_desbalanceamento():
+        pytest.skip('banco já dentro da tolerância')
+    minimo = min(n for n, (corrente, _) in melhores.items() if corrente <= tolerancia)
+
+    trocas, corrente, atingiu = BuscaExataTrocas(avaliador, linhas_1, linhas_2, tolerancia).buscar(MAX_TROCAS)
+
+    assert atingiu
+    assert len(trocas) == minimo
+    # Entre os conjuntos com o número mínimo de permutações, o de menor corrente
+    assert corrente == pytest.approx(melhores[minimo][0], rel=1e-9)
+    _verificar_trocas(avaliador, linhas_1, linhas_2, trocas, corrente)
+
+def test_tolerancia_inatingivel_retorna_menor_corrente(banco):
+    avaliador, linhas_1, linhas_2 = banco
+    melhores = melhores_por_num_trocas(avaliador, _pares_entre_pernas(linhas_1, linhas_2), MAX_TROCAS)
+    menor = min(corrente for corrente, _ in melhores.values())
+
+    trocas, corrente, atingiu = BuscaExataTrocas(avaliador, linhas_1, linhas_2, menor / 2).buscar(MAX_TROCAS)
+
+    assert not atingiu
+    assert len(trocas) <= MAX_TROCAS
+    assert corrente == pytest.approx(menor, rel=1e-9)
+    _verificar_trocas(avaliador, linhas_1, linhas_2, trocas, corrente)
+
+def test_lotes_pequenos_nao_alteram_o_resultado(banco):
+    avaliador, linhas_1, linhas_2 = banco
+    melhores = melhores_por_num_trocas(avaliador, _pares_entre_pernas(linhas_1, linhas_2), MAX_TROCAS)
+    tolerancia = melhores[MAX_TROCAS][0] * (1 + 1e-9)
+
+    padrao = BuscaExataTrocas(avaliador, linhas_1, linhas_2, tolerancia).buscar(MAX_TROCAS)
+    # Um elemento por bloco: limites inferiores e folhas avaliados um nó por vez
+    em_lotes = BuscaExataTrocas(avaliador, linhas_1, linhas_2, tolerancia, max_elementos=1).buscar(MAX_TROCAS)
+
+    assert em_lotes[0] == padrao[0]
+    assert em_lotes[1] == pytest.approx(padrao[1], rel=1e-12)
+    assert em_lotes[2] == padrao[2]
+
+def test_banco_dentro_da_tolerancia_nao_troca(banco):
+    avaliador, linhas_1, linhas_2 = banco
+    tolerancia = float(avaliador.corrente_desbalanceamento())
+
+    trocas, corrente, atingiu = BuscaExataTrocas(avaliador, linhas_1, linhas_2, tolerancia).buscar(MAX_TROCAS)
+
+    assert (trocas, atingiu) == ([], True)
+    assert corrente == tolerancia
+    assert np.isfinite(corrente)
+
+def test_busca_cancelada_retorna_estado_valido(banco):
+    avaliador, linhas_1, linhas_2 = banco
+    inicial = float(avaliador.corrente_desbalanceamento())
+    cancelamento = threading.Event()
+    cancelamento.set()
+
+    trocas, corrente, atingiu = BuscaExataTrocas(
+        avaliador, linhas_1, linhas_2, inicial / 100, cancelamento=cancelamento
+    ).buscar(MAX_TROCAS)
+
+    assert not atingiu
+    assert corrente <= inicial
+    _verificar_trocas(avaliador, linhas_1, linhas_2, trocas, corrente)
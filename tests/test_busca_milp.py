@@ -0,0 +1,51 @@
+from itertools import combinations
+import numpy as np
+import pytest
+from conftest import corrente_apos, melhores_por_num_trocas
+
+pytest.importorskip('pulp')
+from busca_milp import BuscaMILP
+
+MAX_TROCAS = 2
+
+def _pares_entre_ramos(avaliador, linhas):
+    # O modelo permite permutações entre quaisquer ramos das unidades, inclusive da mesma perna
+    return [(i, j) for i, j in combinations(linhas, 2) if avaliador.indice_ramo[i] != avaliador.indice_ramo[j]]
+
+def _verificar_trocas(avaliador, linhas, trocas, corrente):
+    unidades = [unidade for par in trocas for unidade in par]
+    assert len(set(unidades)) == len(unidades), 'cada unidade é movida no máximo uma vez'
+    assert set(unidades) <= set(linhas)
+    assert all(avaliador.indice_ramo[i] != avaliador.indice_ramo[j] for i, j in trocas)
+    assert len(trocas) <= MAX_TROCAS
+    assert corrente == pytest.approx(corrente_apos(avaliador, trocas), rel=1e-9)
+
+def test_corrente_nunca_abaixo_da_forca_bruta(banco):
+    avaliador, linhas_1, linhas_2 = banco
+    linhas = np.concatenate([linhas_1, linhas_2])
+    melhores = melhores_por_num_trocas(avaliador, _pares_entre_ramos(avaliador, linhas), MAX_TROCAS)
+    menor = min(corrente for corrente, _ in melhores.values())
+
+    # Tolerância inatingível: a segunda etapa minimiza a corrente com até MAX_TROCAS permutações
+    trocas, corrente, atingiu = BuscaMILP(avaliador, linhas, menor / 2, MAX_TROCAS).buscar()
+
+    assert not atingiu
+    assert corrente >= menor * (1 - 1e-9)
+    assert corrente < avaliador.corrente_desbalanceamento()
+    _verificar_trocas(avaliador, linhas, trocas, corrente)
+
+def test_atinge_tolerancia_quando_uma_permutacao_basta(banco):
+    avaliador, linhas_1, linhas_2 = banco
+    linhas = np.concatenate([linhas_1, linhas_2])
+    melhores = melhores_por_num_trocas(avaliador, _pares_entre_ramos(avaliador, linhas), MAX_TROCAS)
+    # Folga sobre o ótimo de uma permutação para absorver o erro da linearização
+    tolerancia = 1.5 * melhores[1][0]
+    if tolerancia >= avaliador.corrente_desbalanceamento():
+        pytest.skip('banco já dentro da tolerância')
+
+    trocas, corrente, atingiu = BuscaMILP(avaliador, linhas, tolerancia, MAX_TROCAS).buscar()
+
+    assert atingiu
+    assert len(trocas) == 1
+    assert corrente <= tolerancia
+    _verificar_trocas(avaliador, linhas, trocas, corrente)
@@ -0,0 +1,64 @@
+from itertools import product
+import numpy as np
+import pytest
+from conftest import corrente_apos, melhores_por_num_trocas
+from metaheuristicas import BuscaMetaheuristica, ciclos_transferencias
+
+MAX_TROCAS = 3
+LIMITE_TEMPO_S = 0.2
+
+def _buscar(avaliador, linhas_1, linhas_2, tolerancia, metodo, semente):
+    busca = BuscaMetaheuristica(
+        avaliador, linhas_1, linhas_2, tolerancia, MAX_TROCAS, limite_tempo_s=LIMITE_TEMPO_S, semente=semente
+    )
+    return busca.recozimento_simulado() if metodo == 'recozimento' else busca.busca_tabu()
+
+def test_ciclos_transferencias():
+    transferencias = np.zeros((4, 4), dtype=int)
+    # Troca direta entre os ramos 0 e 1 e rotação 0 -> 2 -> 3 -> 0
+    transferencias[0, 1] = transferencias[1, 0] = 1
+    transferencias[0, 2] = transferencias[2, 3] = transferencias[3, 0] = 1
+
+    assert ciclos_transferencias(transferencias) == [[0, 1], [0, 2, 3]]
+    assert ciclos_transferencias(np.zeros((4, 4), dtype=int)) == []
+
+@pytest.mark.parametrize('metodo', ['recozimento', 'tabu'])
+def test_trocas_reproduzem_a_corrente(banco, metodo):
+    avaliador, linhas_1, linhas_2 = banco
+    inicial = float(avaliador.corrente_desbalanceamento())
+    melhores = melhores_por_num_trocas(avaliador, list(product(linhas_1, linhas_2)), 1)
+
+    trocas, corrente = _buscar(avaliador, linhas_1, linhas_2, melhores[1][0] / 2, metodo, semente=0)
+
+    assert len(trocas) <= MAX_TROCAS
+    assert all(avaliador.indice_ramo[i] != avaliador.indice_ramo[j] for i, j in trocas)
+    assert corrente < inicial
+    assert corrente == pytest.approx(corrente_apos(avaliador, trocas), rel=1e-9)
+
+def test_tabu_encontra_a_melhor_permutacao(banco):
+    avaliador, linhas_1, linhas_2 = banco
+    melhores = melhores_por_num_trocas(avaliador, list(product(linhas_1, linhas_2)), 1)
+    # Só a melhor permutação atinge a tolerância; a busca tabu avalia todos os pares a cada iteração
+    tolerancia = melhores[1][0] * (1 + 1e-9)
+    if tolerancia >= avaliador.corrente_desbalanceamento():
+        pytest.skip('banco já dentro da tolerância')
+
+    trocas, corrente = _buscar(avaliador, linhas_1, linhas_2, tolerancia, 'tabu', semente=0)
+
+    assert trocas == melhores[1][1]
+    assert corrente == pytest.approx(melhores[1][0], rel=1e-9)
+
+def test_recozimento_para_na_primeira_fase_que_atinge_a_tolerancia(banco):
+    avaliador, linhas_1, linhas_2 = banco
+    # Tolerância atingida por um quarto das permutações simples: a fase de uma permutação, que sorteia os
+    # pares, a encontra dentro do orçamento de tempo
+    correntes = avaliador.avaliar_trocas(linhas_1[:, None], linhas_2[None, :])
+    tolerancia = float(np.quantile(correntes, 0.25))
+    if tolerancia >= avaliador.corrente_desbalanceamento():
+        pytest.skip('banco já dentro da tolerância')
+
+    trocas, corrente = _buscar(avaliador, linhas_1, linhas_2, tolerancia, 'recozimento', semente=0)
+
+    assert corrente <= tolerancia
+    assert len(trocas) == 1
+    assert corrente == pytest.approx(corrente_apos(avaliador, trocas), rel=1e-9)
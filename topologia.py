@@ -0,0 +1,74 @@
+import numpy as np
+
+# Topologia do banco de fase A: dois racks em série, cada um com duas pernas em paralelo,
+# cada perna com dois ramos em paralelo de capacitores em série.
+TOPOLOGIA_PADRAO = {
+    'racks': {
+        'R1': ['P1', 'P2'],
+        'R2': ['P3', 'P4']
+    },
+    'pernas': {
+        'P1': ['A1', 'A2'],
+        'P2': ['B1', 'B2'],
+        'P3': ['A3', 'A4'],
+        'P4': ['B3', 'B4']
+    },
+    'pares_desbalanco': [['P4', 'P2'], ['P3', 'P1']]
+}
+
+class TopologiaBanco:
+    def __init__(self, racks: dict, pernas: dict, pares_desbalanco: list):
+        """
+        Topologia do banco (rack -> pernas -> ramos) compilada em arrays de índices.
+
+        Racks estão em série; as pernas de um rack e os ramos de uma perna estão em paralelo; as
+        unidades de um ramo estão em série. A corrente de desbalanceamento é a maior diferença entre
+        as correntes dos pares de pernas em `pares_desbalanco`.
+
+        Args:
+            racks (dict): Pernas de cada rack, ex.: {'R1': ['P1', 'P2'], ...}.
+            pernas (dict): Ramos de cada perna, ex.: {'P1': ['A1', 'A2'], ...}.
+            pares_desbalanco (list): Pares de pernas cuja diferença de corrente é monitorada.
+        """
+        self.racks = list(racks)
+        self.pernas = [perna for rack in self.racks for perna in racks[rack]]
+        self.ramos = [ramo for perna in self.pernas for ramo in pernas[perna]]
+        self.pernas_rack = {rack: list(racks[rack]) for rack in self.racks}
+        self.ramos_perna = {perna: list(pernas[perna]) for perna in self.pernas}
+        self.perna_do_ramo = {ramo: perna for perna in self.pernas for ramo in pernas[perna]}
+        self.rack_da_perna = {perna: rack for rack in self.racks for perna in racks[rack]}
+
+        indice_perna = {perna: k for k, perna in enumerate(self.pernas)}
+        indice_rack = {rack: k for k, rack in enumerate(self.racks)}
+        # Índices ramo -> perna -> rack
+        self.indice_perna_ramo = np.array([indice_perna[self.perna_do_ramo[ramo]] for ramo in self.ramos])
+        self.indice_rack_perna = np.array([indice_rack[self.rack_da_perna[perna]] for perna in self.pernas])
+        self.indice_ramos_perna = [
+            np.array([self.ramos.index(ramo) for ramo in pernas[perna]]) for perna in self.pernas
+        ]
+        self.pares_desbalanco = np.array(
+            [[indice_perna[a], indice_perna[b]] for a, b in pares_desbalanco], dtype=int
+        ).reshape(-1, 2)
+
+        # Matrizes de incidência para reduções vetorizadas (soma de ramos por perna e de pernas por rack)
+        self.incidencia_ramo_perna = np.zeros((len(self.ramos), len(self.pernas)))
+        self.incidencia_ramo_perna[np.arange(len(self.ramos)), self.indice_perna_ramo] = 1
+        self.incidencia_perna_rack = np.zeros((len(self.pernas), len(self.racks)))
+        self.incidencia_perna_rack[np.arange(len(self.pernas)), self.indice_rack_perna] = 1
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Cria a topologia a partir de config['topologia'], ou usa TOPOLOGIA_PADRAO se ausente."""
+        topologia = config.get('topologia', TOPOLOGIA_PADRAO)
+        return cls(topologia['racks'], topologia['pernas'], topologia['pares_desbalanco'])
+
+    def indices_ramos(self, ramos):
+        """Converte rótulos de ramos em índices da topologia."""
+        ramos = np.asarray(ramos)
+        ordem = np.argsort(self.ramos)
+        nomes = np.asarray(self.ramos)[ordem]
+        posicoes = np.minimum(np.searchsorted(nomes, ramos), len(nomes) - 1)
+        desconhecidos = nomes[posicoes] != ramos
+        if np.any(desconhecidos):
+            raise ValueError(f"Ramos fora da topologia: {sorted(set(ramos[desconhecidos]))}")
+        return ordem[posicoes]
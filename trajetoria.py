@@ -0,0 +1,113 @@
+from collections.abc import Sequence
+import numpy as np
+
+class TrajetoriaOtimizacao(Sequence):
+    # Métricas guardadas por passo, em float32
+    METRICAS = ('unbalanced_current', 'capacitancia_fase', 'I_fase')
+
+    def __init__(self, avaliador, capacidade: int = 8):
+        """
+        Histórico compacto dos estados do banco ao longo das permutações.
+
+        Guarda apenas as somas de inversos dos ramos do estado inicial e, por passo, a permutação
+        aplicada (linhas, ramos e variação da soma de inversos) e um vetor float32 com as métricas
+        principais. Os estados completos (no formato de salvar_estado) são reconstruídos sob demanda
+        reaplicando as variações, na mesma ordem do avaliador, de modo que os valores são idênticos.
+
+        Comporta-se como uma sequência somente leitura de dicts: len(), índices, fatias e iteração.
+
+        Args:
+            avaliador (AvaliadorCircuito): Avaliador do otimizador; usado para registrar e reconstruir estados.
+            capacidade (int): Número inicial de passos alocados (cresce por duplicação).
+        """
+        self.avaliador = avaliador
+        self.soma_inversos_inicial = None
+        self.tamanho = 0
+        self.permutacoes = np.zeros(capacidade, dtype=np.int32)
+        self.linhas = np.zeros((capacidade, 2), dtype=np.int32)
+        self.ramos = np.zeros((capacidade, 2), dtype=np.int16)
+        self.variacoes = np.zeros(capacidade)
+        self.metricas = np.zeros((capacidade, len(self.METRICAS)), dtype=np.float32)
+
+    def registrar(self, permutacao, troca=None, metricas=None):
+        """
+        Registra o estado atual do avaliador.
+
+        Args:
+            permutacao (int): Número da permutação.
+            troca (tuple): Linhas (posicionais) da permutação que acabou de ser aplicada; None para
+                registrar o estado inicial (descarta o histórico anterior).
+            metricas (dict): Valores das METRICAS no estado atual, se já calculados (ex.: pelo otimizador);
+                calculados com AvaliadorCircuito.metricas_fase se None.
+        """
+        avaliador = self.avaliador
+        if troca is None:
+            self.soma_inversos_inicial = avaliador.soma_inversos.copy()
+            self.tamanho = 0
+        if self.tamanho == len(self.permutacoes):
+            self._crescer()
+
+        k = self.tamanho
+        self.permutacoes[k] = -1 if permutacao is None else permutacao
+        if troca is not None:
+            i, j = troca
+            # Após a troca, cada unidade está no ramo de origem da outra
+            self.linhas[k] = i, j
+            self.ramos[k] = avaliador.indice_ramo[j], avaliador.indice_ramo[i]
+            self.variacoes[k] = avaliador.inversos[j] - avaliador.inversos[i]
+        if metricas is None:
+            metricas = avaliador.metricas_fase()
+        self.metricas[k] = [metricas[nome] for nome in self.METRICAS]
+        self.tamanho += 1
+
+    def metrica(self, nome):
+        """Série float32 de uma das METRICAS ao longo dos passos, sem reconstruir os estados."""
+        return self.metricas[:self.tamanho, self.METRICAS.index(nome)]
+
+    def somas_inversos(self):
+        """Somas de inversos dos ramos de todos os passos, formato (passos, n_ramos)."""
+        somas = np.empty((self.tamanho, len(self.soma_inversos_inicial)))
+        soma = self.soma_inversos_inicial.copy()
+        for k in range(self.tamanho):
+            if k > 0:
+                ramo_i, ramo_j = self.ramos[k]
+                soma[ramo_i] += self.variacoes[k]
+                soma[ramo_j] -= self.variacoes[k]
+            somas[k] = soma
+        return somas
+
+    def __len__(self):
+        return self.tamanho
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[k] for k in range(*indice.indices(self.tamanho))]
+        if indice < 0:
+            indice += self.tamanho
+        if not 0 <= indice < self.tamanho:
+            raise IndexError('índice fora da trajetória')
+        return self._estado(indice, self.somas_inversos()[indice])
+
+    def __iter__(self):
+        # Reconstrói todos os estados de uma vez
+        for k, soma_inversos in enumerate(self.somas_inversos()):
+            yield self._estado(k, soma_inversos)
+
+    def _estado(self, k, soma_inversos):
+        topologia = self.avaliador.topologia
+        parametros = self.avaliador.parametros(soma_inversos)
+        permutacao = int(self.permutacoes[k])
+        return {
+            'permutacao': None if permutacao < 0 else permutacao,
+            'unbalanced_current': parametros['unbalanced_current'],
+            'capacitancias_ramos': dict(zip(topologia.ramos, parametros['capacitancias_ramos'])),
+            'capacitancias_racks': dict(zip(topologia.racks, parametros['capacitancias_racks'])),
+            'capacitancia_fase': parametros['capacitancia_fase'],
+        }
+
+    def _crescer(self):
+        for nome in ('permutacoes', 'linhas', 'ramos', 'variacoes', 'metricas'):
+            array = getattr(self, nome)
+            novo = np.zeros((2 * len(array),) + array.shape[1:], dtype=array.dtype)
+            novo[:len(array)] = array
+            setattr(self, nome, novo)
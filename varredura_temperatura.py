@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from pre_processamento import COEF_TEMPERATURA_PADRAO
+
+class VarreduraTemperatura:
+    def __init__(self, capacitancias_ref, temperaturas, deslocamentos=None,
+                 coef_temperatura: float = COEF_TEMPERATURA_PADRAO, temp_ref_C: float = 20):
+        """
+        Grade de condições de operação (temperatura ambiente x perfil de deslocamentos por unidade).
+
+        As capacitâncias ajustadas para temp_ref_C são levadas à temperatura de operação com o mesmo
+        modelo linear de process_data: C(T) = C_ref * (1 + coef_temperatura * (T + deslocamento - temp_ref_C)).
+        Os inversos de toda a grade ficam em um único array (n_temperaturas, n_perfis, n_unidades),
+        avaliado de uma vez pelo AvaliadorCircuito.
+
+        Args:
+            capacitancias_ref (array-like): Capacitância ajustada de cada unidade (uF), na ordem das linhas.
+            temperaturas (array-like): Temperaturas de operação (°C).
+            deslocamentos (array-like): Diferença de temperatura (°C) de cada unidade em relação ao ambiente,
+                com formato (n_unidades,) ou (n_perfis, n_unidades); sem deslocamentos se None.
+            coef_temperatura (float): Coeficiente de temperatura da capacitância (1/°C).
+            temp_ref_C (float): Temperatura de referência das capacitâncias ajustadas (°C).
+        """
+        capacitancias_ref = np.asarray(capacitancias_ref, dtype=float)
+        self.temperaturas = np.atleast_1d(np.asarray(temperaturas, dtype=float))
+        if deslocamentos is None:
+            deslocamentos = np.zeros(len(capacitancias_ref))
+        self.deslocamentos = np.atleast_2d(np.asarray(deslocamentos, dtype=float))
+        if self.deslocamentos.shape[1] != len(capacitancias_ref):
+            raise ValueError(
+                f"Os deslocamentos têm {self.deslocamentos.shape[1]} unidades; esperado {len(capacitancias_ref)}."
+            )
+        elevacao = self.temperaturas[:, None, None] + self.deslocamentos[None, :, :] - temp_ref_C
+        self.inversos = 1 / (capacitancias_ref * (1 + coef_temperatura * elevacao))
+
+    def grade(self):
+        """DataFrame com a temperatura e o perfil de cada ponto da grade, na ordem de inversos.reshape(-1, n)."""
+        temperaturas, perfis = np.meshgrid(self.temperaturas, np.arange(len(self.deslocamentos)), indexing='ij')
+        return pd.DataFrame({'temperatura_C': temperaturas.ravel(), 'perfil': perfis.ravel()})
+
+    def somas_inversos(self, avaliador):
+        """Somas de inversos dos ramos no estado do avaliador, formato (n_temperaturas, n_perfis, n_ramos)."""
+        return avaliador.soma_inversos_capacitancias(1 / self.inversos)
+
+    def somas_inversos_planos(self, avaliador, linhas_a, linhas_b):
+        """
+        Somas de inversos após cada plano (ver AvaliadorCircuito.soma_inversos_planos) em cada ponto da grade.
+
+        Returns:
+            np.ndarray: Formato (n_planos, n_temperaturas, n_perfis, n_ramos).
+        """
+        return np.moveaxis(avaliador.soma_inversos_planos(linhas_a, linhas_b, self.inversos), 2, 0)